@@ -1,20 +1,66 @@
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+import time
 
-db = SQLAlchemy()
-migrate = Migrate()
+_import_started = time.perf_counter()
 
+from flask import Flask  # noqa: E402
+from flask_sqlalchemy import SQLAlchemy  # noqa: E402
 
-def create_app():
+from .config import load_config  # noqa: E402
+from .database import RoutingSession, configure_engines  # noqa: E402
+from .json_provider import JSONProvider  # noqa: E402
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def create_app(config=None):
+    """Build the app; see ``config.load_config`` for what ``config`` may be."""
+    started = time.perf_counter()
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///lateshow.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    load_config(app, config)
+    app.json = JSONProvider(app)
 
     db.init_app(app)
-    migrate.init_app(app, db)
+    configure_engines(app, db)
+
+    # Flask-Migrate loads on first use; see startup.py
+    from .startup import init_migrate, startup_cli
+    init_migrate(app, db)
+    app.cli.add_command(startup_cli)
+
+    from .cache import init_cache
+    init_cache(app)
+
+    from .metrics import init_metrics
+    init_metrics(app, db)
+
+    # registered after metrics, so metrics record the compressed size
+    from .compression import init_compression
+    init_compression(app)
+
+    from .write_queue import init_write_queue
+    init_write_queue(app)
+
+    from .stats import stats_cli
+    app.cli.add_command(stats_cli)
+
+    from .search import search_cli
+    app.cli.add_command(search_cli)
+
+    from .changelog import changes_cli
+    app.cli.add_command(changes_cli)
+
+    from .transfer import export_command, import_command
+    app.cli.add_command(export_command)
+    app.cli.add_command(import_command)
 
     from .routes import bp as routes_bp
     app.register_blueprint(routes_bp)
 
+    app.extensions['startup'] = {
+        'import_seconds': _import_finished - _import_started,
+        'create_app_seconds': time.perf_counter() - started,
+    }
     return app
+
+
+_import_finished = time.perf_counter()
@@ -0,0 +1,291 @@
+"""ASGI variant of the API on Quart and SQLAlchemy's async engine.
+
+Serves the core routes of ``app.routes``, with the same validation and
+response shapes, without tying up a worker per database round trip: the
+collection lists (with ``?ids=``), episode and restaurant details,
+``POST``/``PUT`` of appearances and menu entries, and ``DELETE`` of
+episodes, guests and restaurants. Run it with ``hypercorn asgi:app``. The
+response cache, ETags, bulk endpoints, stats and leaderboards, the change
+feed, ``/batch``, ``/writes/<id>`` and ``/metrics`` are only on the WSGI
+app; writes made here still bump the version counters the WSGI app's
+ETags are built from.
+"""
+import os
+from functools import wraps
+
+from quart import Blueprint, Quart, current_app, jsonify, request
+from sqlalchemy import delete
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from .config import load_config
+from .database import apply_pragmas
+from .fieldsets import parse_fieldset
+from .json_provider import JSONProvider
+from .models import Episode, Guest, Pizza, Restaurant
+from .pagination import (
+    STREAM_MIMETYPES, keyset_select, multi_get_payload, multi_get_select, next_page_headers, page_limit,
+    parse_ids, parse_page_args, parse_sort,
+)
+from .search import episode_filters, guest_filters, pizza_filters
+from .serializers import EPISODE_DETAIL, RESTAURANT_DETAIL, projected_select, row_serializer
+from .versioning import track_versions
+from .writes import APPEARANCES, MENU_ITEMS, violation
+
+bp = Blueprint('api', __name__)
+
+
+class AsyncWriteSession(Session):
+    """Sync session class behind the ``AsyncSession``s, so events can target it."""
+
+
+track_versions(AsyncWriteSession)
+
+
+def async_database_url(app):
+    """``SQLALCHEMY_DATABASE_URI`` with an async driver, resolved like Flask-SQLAlchemy."""
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'sqlite':
+        return url
+    url = url.set(drivername='sqlite+aiosqlite')
+    database = url.database
+    if database and database != ':memory:' and not database.startswith('file:') and not os.path.isabs(database):
+        os.makedirs(app.instance_path, exist_ok=True)
+        url = url.set(database=os.path.join(app.instance_path, database))
+    return url
+
+
+def create_async_app(config=None):
+    """Build the Quart app; ``config`` is interpreted as in ``create_app``."""
+    app = Quart(__name__)
+    load_config(app, config)
+    app.json = JSONProvider(app)
+
+    url = async_database_url(app)
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    if url.database in (None, '', ':memory:'):
+        options = {'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}}
+    engine = create_async_engine(url, **options)
+    apply_pragmas(engine.sync_engine, app.config.get('SQLITE_PRAGMAS') or {})
+    app.extensions['async_engine'] = engine
+    app.extensions['async_session'] = async_sessionmaker(
+        engine, expire_on_commit=False, sync_session_class=AsyncWriteSession
+    )
+
+    app.register_blueprint(bp)
+    return app
+
+
+def with_session(view):
+    """Open an ``AsyncSession`` for the request and pass it as the first argument."""
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        async with current_app.extensions['async_session']() as session:
+            return await view(session, *args, **kwargs)
+    return wrapper
+
+
+async def list_response(session, model, filters=None):
+    """Async counterpart of ``pagination.list_response``."""
+    if 'ids' in request.args:
+        return await multi_get_response(session, model)
+    try:
+        after_id, limit, stream = parse_page_args(request.args)
+        sort = parse_sort(request.args, model)
+        fieldset = parse_fieldset(request.args, model, default_include=())
+        clauses = filters(request.args) if filters else ()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    stmt = keyset_select(model, after_id, sort, fieldset.select()).where(*clauses)
+    serialize = fieldset.row_serializer()
+
+    if stream:
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return stream_response(stmt, serialize, stream), {'Content-Type': STREAM_MIMETYPES[stream]}
+
+    if after_id is None and limit is None:
+        result = await session.execute(stmt)
+        return jsonify([serialize(row) for row in result])
+
+    limit = page_limit(limit, current_app.config)
+    rows = (await session.execute(stmt.limit(limit + 1))).all()
+    page = rows[:limit]
+    resp = jsonify([serialize(row) for row in page])
+    if len(rows) > limit:
+        resp.headers.update(next_page_headers(request.path, request.args.to_dict(), page[-1].id, limit))
+    return resp
+
+
+async def multi_get_response(session, model):
+    """Async ``pagination.multi_get_response``."""
+    try:
+        ids = parse_ids(request.args, current_app.config['MULTI_GET_MAX_IDS'])
+        fieldset = parse_fieldset(request.args, model)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    found = {obj.id: obj for obj in await session.scalars(multi_get_select(model, ids, fieldset))}
+    return jsonify(multi_get_payload(model, ids, found, fieldset.serialize))
+
+
+def stream_response(stmt, serialize, fmt='json'):
+    """Async generator streaming ``stmt`` rows; it owns its session."""
+    factory = current_app.extensions['async_session']
+    chunk_size = current_app.config['STREAM_CHUNK_SIZE']
+    dumps = current_app.json.dumps_bytes
+
+    async def generate():
+        async with factory() as session:
+            result = await session.stream(stmt.execution_options(yield_per=chunk_size))
+            if fmt == 'ndjson':
+                async for partition in result.partitions():
+                    yield b''.join(dumps(serialize(row)) + b'\n' for row in partition)
+                return
+            yield b'['
+            sep = b''
+            async for partition in result.partitions():
+                yield sep + b','.join(dumps(serialize(row)) for row in partition)
+                sep = b','
+            yield b']'
+
+    return generate()
+
+
+@bp.route('/', methods=['GET'])
+async def index():
+    return jsonify({'message': 'Late Show API', 'routes': ['/episodes', '/guests', '/appearances']}), 200
+
+
+@bp.route('/favicon.ico')
+async def favicon():
+    return ('', 204)
+
+
+@bp.route('/episodes', methods=['GET'])
+@with_session
+async def get_episodes(session):
+    return await list_response(session, Episode, episode_filters)
+
+
+@bp.route('/episodes/<int:episode_id>', methods=['GET'])
+@with_session
+async def get_episode(session, episode_id):
+    return await detail_response(session, Episode, episode_id, 'Episode not found')
+
+
+@bp.route('/episodes/<int:episode_id>', methods=['DELETE'])
+@with_session
+async def delete_episode(session, episode_id):
+    return await delete_response(session, Episode, EPISODE_DETAIL, episode_id, 'Episode not found')
+
+
+async def delete_response(session, model, shape, obj_id, not_found):
+    """Async ``routes._delete_response``: one projected read, then one cascading DELETE."""
+    if shape is None:
+        row = (await session.execute(projected_select(model).where(model.id == obj_id))).first()
+        data = row and row_serializer(model)(row)
+    else:
+        data = shape.assemble((await session.execute(shape.select(obj_id))).all())
+    if not data:
+        return jsonify({'error': not_found}), 404
+    await session.execute(delete(model).where(model.id == obj_id))
+    await session.commit()
+    return jsonify(data)
+
+
+async def detail_response(session, model, obj_id, not_found):
+    """Async ``routes._detail_response``."""
+    try:
+        fieldset = parse_fieldset(request.args, model)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    obj = await session.get(model, obj_id, options=fieldset.loader_options())
+    if not obj:
+        return jsonify({'error': not_found}), 404
+    return jsonify(fieldset.serialize(obj))
+
+
+@bp.route('/guests', methods=['GET'])
+@with_session
+async def get_guests(session):
+    return await list_response(session, Guest, guest_filters)
+
+
+@bp.route('/guests/<int:guest_id>', methods=['DELETE'])
+@with_session
+async def delete_guest(session, guest_id):
+    return await delete_response(session, Guest, None, guest_id, 'Guest not found')
+
+
+@bp.route('/appearances', methods=['POST'])
+@with_session
+async def create_appearance(session):
+    return await write_response(session, APPEARANCES)
+
+
+@bp.route('/appearances', methods=['PUT'])
+@with_session
+async def upsert_appearance(session):
+    return await write_response(session, APPEARANCES, upsert=True)
+
+
+async def write_response(session, target, upsert=False):
+    """Async ``routes._write_response``: one INSERT (or upsert), errors from the constraints."""
+    data = await request.get_json() or {}
+    values, errors = target.validate(data)
+    if errors:
+        return jsonify({'errors': errors}), 422
+
+    try:
+        obj_id = await session.scalar(target.upsert(values) if upsert else target.insert(values))
+    except IntegrityError as e:
+        await session.rollback()
+        found = None
+        if violation(e) == 'foreign_key':
+            found = (await session.execute(target.reference_check(values))).one()
+        return jsonify({'errors': target.errors(e, found)}), 422
+
+    obj = (await session.execute(target.detail(obj_id))).scalar_one()
+    body = obj.to_dict(include=target.include, depth=1)
+    await session.commit()
+    return jsonify(body), 200 if upsert else 201
+
+
+@bp.route('/restaurants', methods=['GET'])
+@with_session
+async def get_restaurants(session):
+    return await list_response(session, Restaurant)
+
+
+@bp.route('/restaurants/<int:restaurant_id>', methods=['GET'])
+@with_session
+async def get_restaurant(session, restaurant_id):
+    return await detail_response(session, Restaurant, restaurant_id, 'Restaurant not found')
+
+
+@bp.route('/pizzas', methods=['GET'])
+@with_session
+async def get_pizzas(session):
+    return await list_response(session, Pizza, pizza_filters)
+
+
+@bp.route('/restaurants/<int:restaurant_id>', methods=['DELETE'])
+@with_session
+async def delete_restaurant(session, restaurant_id):
+    return await delete_response(session, Restaurant, RESTAURANT_DETAIL, restaurant_id, 'Restaurant not found')
+
+
+@bp.route('/restaurant_pizzas', methods=['POST'])
+@with_session
+async def create_restaurant_pizza(session):
+    return await write_response(session, MENU_ITEMS)
+
+
+@bp.route('/restaurant_pizzas', methods=['PUT'])
+@with_session
+async def upsert_restaurant_pizza(session):
+    return await write_response(session, MENU_ITEMS, upsert=True)
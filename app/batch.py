@@ -0,0 +1,74 @@
+"""``POST /batch``: several GETs answered in one request.
+
+The body is a JSON array of paths (``"/episodes/1?fields=number"``) or of
+``{"path": ..., "headers": {...}}`` objects, at most
+``BATCH_MAX_REQUESTS`` of them. Each runs through the app's normal request
+handling (ETags, cache, metrics) in the batch request's app context, so
+they share its database session, and the response lists
+``{"path", "status", "body"}`` in request order. JSON bodies are embedded
+as ``Fragment``s, i.e. spliced in without being decoded and re-encoded.
+Streamed responses (``?stream=``, ``/changes/stream``) would hold the
+batch until they end, so they are closed unread and answered ``400``.
+"""
+import contextvars
+from types import GeneratorType
+
+from flask import current_app, jsonify, request
+
+from .json_provider import Fragment
+
+
+def parse_batch(body, maximum):
+    """``[(path, headers)]`` from the request body; raises ``ValueError``."""
+    if not isinstance(body, list):
+        raise ValueError('body must be a JSON array of paths or {"path", "headers"} objects')
+    if not body:
+        raise ValueError('batch must contain at least one request')
+    if len(body) > maximum:
+        raise ValueError(f'batch may contain at most {maximum} requests')
+    requests = []
+    for index, entry in enumerate(body):
+        if isinstance(entry, str):
+            entry = {'path': entry}
+        if not isinstance(entry, dict):
+            raise ValueError(f'request {index} must be a path or an object')
+        path, headers = entry.get('path'), entry.get('headers') or {}
+        if entry.get('method', 'GET').upper() != 'GET':
+            raise ValueError(f'request {index}: only GET is supported')
+        if not isinstance(path, str) or not path.startswith('/'):
+            raise ValueError(f'request {index}: path must start with /')
+        if not isinstance(headers, dict) or not all(isinstance(v, str) for v in headers.values()):
+            raise ValueError(f'request {index}: headers must map names to strings')
+        requests.append((path, headers))
+    return requests
+
+
+def dispatch(path, headers):
+    """``{"path", "status", "body"}`` for a GET of ``path`` through the current app."""
+    app = current_app._get_current_object()
+    # bodies are embedded in the batch response, which is compressed as a whole
+    headers = {name: value for name, value in headers.items() if name.lower() != 'accept-encoding'}
+    with app.test_request_context(path, method='GET', headers=headers):
+        # a copied context keeps the sub-request's metrics out of the batch's
+        response = contextvars.copy_context().run(app.full_dispatch_request)
+        # a generator body is a stream; werkzeug's error pages are iterators
+        # too (``is_streamed``), but over a body that is already built
+        if isinstance(response.response, GeneratorType):
+            response.close()
+            return {'path': path, 'status': 400, 'body': {'error': 'streamed responses cannot be batched'}}
+        data = response.get_data()
+    if not data:
+        body = None
+    elif response.is_json:
+        body = Fragment(data)
+    else:
+        body = data.decode('utf-8', 'replace')
+    return {'path': path, 'status': response.status_code, 'body': body}
+
+
+def batch_response():
+    try:
+        requests = parse_batch(request.get_json(silent=True), current_app.config['BATCH_MAX_REQUESTS'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify([dispatch(path, headers) for path, headers in requests])
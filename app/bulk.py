@@ -0,0 +1,109 @@
+"""Helpers for the bulk ingestion endpoints."""
+from flask import current_app, jsonify, request
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+
+
+def read_rows():
+    """Return the request body as a list of rows.
+
+    Accepts a JSON array, or NDJSON (one object per line) when the content
+    type is ``application/x-ndjson``. Raises ``ValueError`` on malformed input.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        loads = current_app.json.loads
+        rows = []
+        for lineno, line in enumerate(request.stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(loads(line))
+            except ValueError:
+                raise ValueError(f'line {lineno} is not valid JSON')
+        return rows
+    rows = request.get_json(silent=True)
+    if not isinstance(rows, list):
+        raise ValueError('body must be a JSON array')
+    return rows
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def existing_ids(model, ids):
+    """Return the subset of ``ids`` present in ``model``'s table."""
+    found = set()
+    ids = list(ids)
+    for chunk in chunks(ids, current_app.config['BULK_CHUNK_SIZE']):
+        found.update(db.session.scalars(select(model.id).where(model.id.in_(chunk))))
+    return found
+
+
+def insert_rows(model, rows):
+    """Insert ``rows`` in executemany chunks and return the new ids in order."""
+    ids = []
+    stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+    for chunk in chunks(rows, current_app.config['BULK_CHUNK_SIZE']):
+        ids.extend(db.session.scalars(stmt, chunk))
+    return ids
+
+
+def duplicate_rows(model, key, rows):
+    """Indexes of ``rows`` whose ``key`` columns repeat an earlier row or a stored one."""
+    columns = [getattr(model, c) for c in key]
+    pairs = [tuple(row[c] for c in key) for row in rows]
+    stored = set()
+    for chunk in chunks(sorted(set(pairs)), current_app.config['BULK_CHUNK_SIZE']):
+        stored.update(tuple(r) for r in db.session.execute(select(*columns).where(tuple_(*columns).in_(chunk))))
+    seen = set()
+    duplicates = []
+    for index, pair in enumerate(pairs):
+        if pair in stored or pair in seen:
+            duplicates.append(index)
+        seen.add(pair)
+    return duplicates
+
+
+def bulk_create(target):
+    """Validate every row, check references set-wise, then insert in one transaction.
+
+    ``target`` is an ``app.writes.WriteTarget``. Any error rejects the whole
+    batch with per-row ``{'index', 'errors'}``. Duplicate pairs are left to
+    the unique index and only looked for once the insert has failed.
+    """
+    try:
+        rows = read_rows()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    values, errors = [], {}
+    for index, data in enumerate(rows):
+        row, row_errors = target.validate(data)
+        values.append(row)
+        if row_errors:
+            errors[index] = row_errors
+
+    for column, (ref_model, message) in target.references.items():
+        wanted = {row[column] for row in values if row and row[column] is not None}
+        found = existing_ids(ref_model, wanted)
+        for index, row in enumerate(values):
+            if row and row[column] is not None and row[column] not in found:
+                errors.setdefault(index, []).append(message)
+
+    if errors:
+        return jsonify({'errors': [{'index': i, 'errors': errors[i]} for i in sorted(errors)]}), 422
+
+    try:
+        ids = insert_rows(target.model, values)
+    except IntegrityError:
+        db.session.rollback()
+        duplicates = duplicate_rows(target.model, target.key, values)
+        if not duplicates:
+            raise
+        return jsonify({'errors': [{'index': i, 'errors': [target.duplicate]} for i in duplicates]}), 422
+    db.session.commit()
+    return jsonify({'created': len(ids), 'ids': ids}), 201
@@ -0,0 +1,248 @@
+"""Response cache for the detail read endpoints.
+
+Entries are keyed ``<namespace>:<id>`` (e.g. ``episode:3``) and hold the
+rendered JSON body. Invalidation is driven by SQLAlchemy session events:
+``after_flush`` and ``do_orm_execute`` work out which keys a write touches,
+and ``after_commit`` drops them, so write paths never invalidate by hand.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import event, inspect
+
+from . import db
+from .versioning import request_etag
+
+# table -> (cache namespace embedding its rows, column naming the entry id);
+# a None column means the rows are embedded in many entries, so the whole
+# namespace is dropped
+DEPENDENCIES = {
+    'episodes': ('episode', 'id'),
+    'appearances': ('episode', 'episode_id'),
+    'guests': ('episode', None),
+    'restaurants': ('restaurant', 'id'),
+    'restaurant_pizzas': ('restaurant', 'restaurant_id'),
+    'pizzas': ('restaurant', None),
+}
+
+
+class BaseCache:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+
+    def get(self, key, tag=''):
+        """The value stored under ``key`` with ``tag``; a different tag is a miss."""
+        value = self._get(key)
+        prefix = tag.encode() + b'\n'
+        if value is None or not value.startswith(prefix):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value[len(prefix):]
+
+    def set(self, key, value, tag=''):
+        self._set(key, tag.encode() + b'\n' + value)
+
+    def invalidate(self, keys=(), namespaces=()):
+        self.generation += 1
+        for key in keys:
+            self.delete(key)
+        for namespace in namespaces:
+            self.delete_prefix(f'{namespace}:')
+
+    def stats(self):
+        return {'backend': type(self).__name__, 'hits': self.hits, 'misses': self.misses}
+
+
+class NullCache(BaseCache):
+    def _get(self, key):
+        return None
+
+    def _set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def delete_prefix(self, prefix):
+        pass
+
+
+class MemoryCache(BaseCache):
+    """Bounded in-process LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def stats(self):
+        data = super().stats()
+        data['size'] = len(self._data)
+        return data
+
+
+class RedisCache(BaseCache):
+    """Backend for any client exposing redis-py's get/set/delete/scan_iter."""
+
+    def __init__(self, client, ttl=60, prefix='lateshow:'):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def _set(self, key, value):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=f'{self.prefix}{prefix}*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+def init_cache(app):
+    backend = app.config.get('RESPONSE_CACHE_BACKEND', 'memory')
+    ttl = app.config.get('RESPONSE_CACHE_TTL', 60)
+    if isinstance(backend, BaseCache):
+        cache = backend
+    elif backend == 'memory':
+        cache = MemoryCache(maxsize=app.config.get('RESPONSE_CACHE_MAXSIZE', 1024), ttl=ttl)
+    elif backend == 'redis':
+        import redis
+        cache = RedisCache(redis.Redis.from_url(app.config['RESPONSE_CACHE_REDIS_URL']), ttl=ttl)
+    elif backend in (None, 'null'):
+        cache = NullCache()
+    else:
+        raise ValueError(f'unknown RESPONSE_CACHE_BACKEND: {backend!r}')
+    app.extensions['response_cache'] = cache
+    return cache
+
+
+def cached(namespace, id_arg):
+    """Cache a detail view's 200 JSON body under ``<namespace>:<id>``.
+
+    Requests with a query string bypass the cache. Under ``@conditional``
+    each body is stored with the ETag it was rendered for, and an entry
+    whose ETag no longer matches is a miss: commits from other processes
+    never reach this process's invalidation hooks, but they do bump the
+    table versions the ETag is built from.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            cache = current_app.extensions.get('response_cache')
+            if cache is None or request.args:
+                return view(**kwargs)
+            key = f'{namespace}:{kwargs[id_arg]}'
+            tag = request_etag() or ''
+            body = cache.get(key, tag)
+            if body is not None:
+                return current_app.response_class(body, mimetype='application/json')
+            generation = cache.generation
+            resp = current_app.make_response(view(**kwargs))
+            # skip the store if a commit invalidated while we were rendering
+            if resp.status_code == 200 and cache.generation == generation:
+                cache.set(key, resp.get_data(), tag)
+            return resp
+        return wrapper
+    return decorator
+
+
+def _pending(session):
+    return session.info.setdefault('cache_invalidations', (set(), set()))
+
+
+def _row_values(obj, column):
+    state = inspect(obj)
+    history = state.attrs[column].history
+    return [v for v in (*history.unchanged, *history.added, *history.deleted) if v is not None]
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_flushed(session, flush_context):
+    keys, namespaces = _pending(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        dependency = DEPENDENCIES.get(getattr(obj, '__tablename__', None))
+        if dependency is None:
+            continue
+        namespace, column = dependency
+        if column is None:
+            namespaces.add(namespace)
+            continue
+        keys.update(f'{namespace}:{value}' for value in _row_values(obj, column))
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _collect_bulk(orm_execute_state):
+    # bulk/Core-style DML bypasses the unit of work, so drop the namespace;
+    # single-row writes pass their values as the ``row_values`` execution
+    # option, which names the one entry they touch
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    dependency = mapper is not None and DEPENDENCIES.get(mapper.local_table.name)
+    if not dependency:
+        return
+    namespace, column = dependency
+    keys, namespaces = _pending(orm_execute_state.session)
+    row = orm_execute_state.execution_options.get('row_values')
+    if row is not None and column is not None and row.get(column) is not None:
+        keys.add(f'{namespace}:{row[column]}')
+    else:
+        namespaces.add(namespace)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_invalidations(session):
+    keys, namespaces = session.info.pop('cache_invalidations', (set(), set()))
+    if not (keys or namespaces):
+        return
+    cache = current_app.extensions.get('response_cache')
+    if cache is not None:
+        cache.invalidate(keys, namespaces)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_invalidations(session):
+    session.info.pop('cache_invalidations', None)
@@ -0,0 +1,245 @@
+"""Append-only change feed for incremental sync.
+
+Every insert, update and delete on the six data tables appends
+``(seq, table_name, row_id, op)`` to ``changes``. As with the summary and
+search tables, SQLite triggers do the appending inside the writing
+statement, so ORM flushes, bulk DML, upserts, write-queue batches, the
+async app and ON DELETE CASCADE child deletes are all recorded, in the same
+transaction as the write.
+
+``GET /changes?since=<seq>`` pages through the feed in ``seq`` order and
+``GET /changes/stream`` pushes it as Server-Sent Events. Entries carry ids,
+not rows: a consumer fetches what changed with ``?ids=`` multi-gets and
+treats ``insert`` and ``update`` alike.
+
+``flask changes compact`` keeps the feed small. Collapsing keeps only the
+newest entry per row, which is still correct for every cursor. Truncating
+drops entries older than ``CHANGELOG_RETENTION_DAYS`` and raises the
+horizon in ``changes_horizon``; feeds that start below it answer 410 Gone
+and the consumer resyncs from the list endpoints.
+"""
+import time
+
+import click
+from flask import Response, current_app, jsonify, request, stream_with_context
+from flask.cli import AppGroup
+from sqlalchemy import event, func, select, text
+
+from . import db
+from .models import Change, ChangeHorizon
+from .pagination import page_limit
+from .validation import MAX_ID
+
+TABLES = ('episodes', 'guests', 'appearances', 'restaurants', 'pizzas', 'restaurant_pizzas')
+
+# (op, trigger event, row reference)
+OPS = (('insert', 'INSERT', 'NEW'), ('update', 'UPDATE', 'NEW'), ('delete', 'DELETE', 'OLD'))
+
+_COLUMNS = (Change.seq, Change.table_name, Change.row_id, Change.op, Change.changed_at)
+
+
+def trigger_ddl():
+    """CREATE TRIGGER statements appending to ``changes`` for every table and op."""
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS {table}_changelog_{op} AFTER {trigger_event} ON {table} '
+        f"BEGIN INSERT INTO changes (table_name, row_id, op) VALUES ('{table}', {ref}.id, '{op}'); END"
+        for table in TABLES for op, trigger_event, ref in OPS
+    ]
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_triggers(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in trigger_ddl():
+        connection.execute(text(statement))
+
+
+def horizon(connection):
+    """The highest seq compaction has discarded (0 if none)."""
+    return connection.scalar(select(ChangeHorizon.seq).where(ChangeHorizon.id == 1)) or 0
+
+
+def latest(connection):
+    """The highest seq written so far (0 if none), even if compaction dropped it."""
+    return connection.scalar(select(func.max(Change.seq))) or horizon(connection)
+
+
+def truncate(connection, through):
+    """Drop the entries up to seq ``through`` and raise the horizon to it; returns the count."""
+    deleted = connection.execute(text('DELETE FROM changes WHERE seq <= :through'), {'through': through}).rowcount
+    connection.execute(text(
+        'INSERT INTO changes_horizon (id, seq) VALUES (1, :through) '
+        'ON CONFLICT(id) DO UPDATE SET seq = max(seq, excluded.seq)'
+    ), {'through': through})
+    return deleted
+
+
+def collapse(connection):
+    """Keep only the newest entry per row; returns the count dropped."""
+    return connection.execute(text(
+        'DELETE FROM changes WHERE seq NOT IN (SELECT max(seq) FROM changes GROUP BY table_name, row_id)'
+    )).rowcount
+
+
+def compact(connection, retention_days=None, collapse_rows=True):
+    """Collapse the feed and truncate what is older than ``retention_days``."""
+    collapsed = collapse(connection) if collapse_rows else 0
+    truncated = 0
+    if retention_days is not None:
+        through = connection.scalar(text(
+            "SELECT max(seq) FROM changes WHERE changed_at < datetime('now', :age)"
+        ), {'age': f'-{retention_days} days'})
+        if through is not None:
+            truncated = truncate(connection, through)
+    return {'collapsed': collapsed, 'truncated': truncated, 'horizon': horizon(connection)}
+
+
+def _int(raw, name):
+    try:
+        value = int(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be an integer')
+    if value < 0:
+        raise ValueError(f'{name} must be at least 0')
+    # larger ints overflow when SQLite binds them
+    if value > MAX_ID:
+        raise ValueError(f'{name} must be at most {MAX_ID}')
+    return value
+
+
+def parse_changes_args(args, headers=None):
+    """``(since, limit, tables)`` from the query (or ``Last-Event-ID``); raises ``ValueError``."""
+    raw = args.get('since')
+    if raw is None and headers is not None:
+        raw = headers.get('Last-Event-ID')
+    since = _int(raw, 'since') if raw is not None else 0
+    limit = _int(args['limit'], 'limit') if 'limit' in args else None
+    if limit == 0:
+        raise ValueError('limit must be at least 1')
+    tables = None
+    if args.get('tables'):
+        tables = tuple(args['tables'].split(','))
+        unknown = [t for t in tables if t not in TABLES]
+        if unknown:
+            raise ValueError(f"unknown tables: {', '.join(unknown)}")
+    return since, limit, tables
+
+
+def changes_select(since, limit, tables=None, through=None):
+    """Entries after ``since`` and, if given, up to ``through``, in seq order."""
+    stmt = select(*_COLUMNS).where(Change.seq > since).order_by(Change.seq).limit(limit)
+    if through is not None:
+        stmt = stmt.where(Change.seq <= through)
+    if tables:
+        stmt = stmt.where(Change.table_name.in_(tables))
+    return stmt
+
+
+def change_dict(row):
+    return {'seq': row.seq, 'table': row.table_name, 'id': row.row_id, 'op': row.op, 'at': row.changed_at}
+
+
+def _gone(floor):
+    return {'error': f'changes up to seq {floor} were compacted; resync and resume from a later seq',
+            'horizon': floor}
+
+
+def changes_response():
+    """``{"changes", "next", "more"}`` for the entries after ``since``."""
+    try:
+        since, limit, tables = parse_changes_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = page_limit(limit, current_app.config)
+    session = db.session
+    floor = horizon(session)
+    if since < floor:
+        return jsonify(_gone(floor)), 410
+    # pysqlite runs each SELECT on its own, with no snapshot across them: read
+    # the end of the feed first and page only up to it, so an entry committed
+    # between the two reads is left for the next request instead of skipped
+    through = latest(session)
+    rows = session.execute(changes_select(since, limit + 1, tables, through)).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    # with nothing more to read, skip past entries the table filter left out
+    cursor = rows[-1].seq if more else max(through, since)
+    return jsonify({'changes': [change_dict(row) for row in rows], 'next': cursor, 'more': more})
+
+
+def _event(row, dumps):
+    return b'id: %d\nevent: change\ndata: %s\n\n' % (row.seq, dumps(change_dict(row)))
+
+
+def stream_changes_response():
+    """Server-Sent Events for the entries after ``since``/``Last-Event-ID``, polled until the stream expires.
+
+    Each poll reads in a fresh transaction. The stream ends after
+    ``CHANGES_STREAM_MAX_SECONDS``; ``EventSource`` reconnects on its own and
+    resumes from the ``Last-Event-ID`` it sends back.
+    """
+    try:
+        since, limit, tables = parse_changes_args(request.args, request.headers)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    config = current_app.config
+    limit = page_limit(limit, config)
+    floor = horizon(db.session)
+    if since < floor:
+        return jsonify(_gone(floor)), 410
+    poll = config['CHANGES_POLL_INTERVAL']
+    heartbeat = config['CHANGES_HEARTBEAT']
+    max_seconds = config['CHANGES_STREAM_MAX_SECONDS']
+    dumps = current_app.json.dumps_bytes
+
+    def generate():
+        session = db.session
+        cursor = since
+        yield b'retry: %d\n\n' % int(poll * 1000)
+        started = last_sent = time.monotonic()
+        while True:
+            floor = horizon(session)
+            if cursor < floor:
+                yield b'event: gone\ndata: %s\n\n' % dumps(_gone(floor))
+                return
+            # bounded by the end of the feed read first, as in changes_response
+            through = latest(session)
+            rows = session.execute(changes_select(cursor, limit, tables, through)).all()
+            cursor = rows[-1].seq if len(rows) == limit else max(cursor, through)
+            # hand the connection back to the pool between polls
+            session.rollback()
+            now = time.monotonic()
+            if rows:
+                yield b''.join(_event(row, dumps) for row in rows)
+                last_sent = now
+                if len(rows) == limit:
+                    continue
+            if now - started >= max_seconds:
+                return
+            if now - last_sent >= heartbeat:
+                yield b': keep-alive\n\n'
+                last_sent = now
+            time.sleep(poll)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # nginx would otherwise buffer the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+changes_cli = AppGroup('changes', help='Change feed maintenance.')
+
+
+@changes_cli.command('compact')
+@click.option('--retention-days', type=float, default=None,
+              help='Drop entries older than this (default CHANGELOG_RETENTION_DAYS).')
+@click.option('--no-collapse', is_flag=True, help='Keep every entry, not just the newest per row.')
+def compact_command(retention_days, no_collapse):
+    """Collapse the change feed and truncate entries past retention."""
+    if retention_days is None:
+        retention_days = current_app.config['CHANGELOG_RETENTION_DAYS']
+    with db.engine.begin() as connection:
+        result = compact(connection, retention_days, collapse_rows=not no_collapse)
+    click.echo(f"Collapsed {result['collapsed']}, truncated {result['truncated']}; horizon is seq {result['horizon']}")
@@ -0,0 +1,61 @@
+"""gzip/brotli response compression negotiated from ``Accept-Encoding``.
+
+Buffered responses of a ``COMPRESS_MIMETYPES`` type and at least
+``COMPRESS_MIN_SIZE`` bytes are compressed with the client's preferred
+encoding (brotli only when the ``brotli`` package is installed). Streamed
+bodies pass through untouched. A compressed response's strong ETag gets an
+``-<encoding>`` suffix, since its bytes differ from the identity response;
+``versioning.conditional`` accepts either form in ``If-None-Match``.
+"""
+import gzip
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+# every encoding an ETag may be suffixed with, best first
+ENCODINGS = ('br', 'gzip')
+
+
+def available_encodings():
+    return ENCODINGS if brotli is not None else ('gzip',)
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        # brotli's quality scale is 0-11; keep the same relative effort
+        return brotli.compress(data, quality=min(11, round(level * 11 / 9)))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_response(response):
+    config = current_app.config
+    minimum = config.get('COMPRESS_MIN_SIZE')
+    if (
+        minimum is None
+        or response.is_streamed
+        or response.direct_passthrough
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in config['COMPRESS_MIMETYPES']
+    ):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None or response.content_length < minimum:
+        return response
+
+    response.set_data(compress(response.get_data(), encoding, config['COMPRESS_LEVEL']))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -0,0 +1,121 @@
+"""Configuration profiles, selected with ``LATESHOW_CONFIG``.
+
+Database URLs come from the environment: ``DATABASE_URL`` for the primary
+(writer) engine and, optionally, ``DATABASE_READ_URL`` for a read-only engine
+that GET requests use. For SQLite, a read-only URL looks like
+``sqlite:///file:/path/lateshow.db?mode=ro&uri=true``.
+"""
+import os
+from collections.abc import Mapping
+
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///lateshow.db')
+    SQLALCHEMY_READ_URI = os.environ.get('DATABASE_READ_URL')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+
+    # applied to every new SQLite connection; values are passed verbatim
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -64000,  # negative means KiB, i.e. 64 MiB
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        # ON DELETE CASCADE does the child-row deletes for the delete routes
+        'foreign_keys': 'ON',
+    }
+
+    PAGE_DEFAULT_LIMIT = 100
+    PAGE_MAX_LIMIT = 1000
+    STREAM_CHUNK_SIZE = 1000
+    # most ids one ?ids= multi-get may name, and most GETs in one POST /batch
+    MULTI_GET_MAX_IDS = 100
+    BATCH_MAX_REQUESTS = 50
+    BULK_CHUNK_SIZE = 500
+    # default k for /leaderboards/guests and /pizzas/<id>/cheapest
+    LEADERBOARD_LIMIT = 10
+
+    # orjson, msgspec, stdlib, or auto (the first of those importable)
+    JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto')
+    # gzip/br responses whose body is at least this many bytes (None disables)
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_LEVEL = 6
+    COMPRESS_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/plain')
+
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_REDIS_URL = os.environ.get('RESPONSE_CACHE_REDIS_URL')
+    RESPONSE_CACHE_MAXSIZE = 1024
+    RESPONSE_CACHE_TTL = 60
+
+    # None (inline writes), 'prefer' (queue requests sending Prefer: respond-async)
+    # or 'always'; see write_queue.py
+    WRITE_QUEUE = None
+    WRITE_QUEUE_MAX_ROWS = 500
+    WRITE_QUEUE_MAX_DELAY_MS = 10
+    WRITE_QUEUE_MAXSIZE = 10000
+    # 'queued' answers 202 at once; 'committed' waits for the group commit
+    WRITE_QUEUE_ACK = 'queued'
+    WRITE_QUEUE_TIMEOUT = 5
+    # PRAGMA synchronous for group commits (None keeps SQLITE_PRAGMAS')
+    WRITE_QUEUE_SYNCHRONOUS = None
+    WRITE_QUEUE_STATUS_LIMIT = 10000
+
+    # GET /changes/stream: seconds between polls, between keep-alive comments
+    # when idle, and before the stream ends (EventSource then reconnects)
+    CHANGES_POLL_INTERVAL = 1.0
+    CHANGES_HEARTBEAT = 15
+    CHANGES_STREAM_MAX_SECONDS = 300
+    # flask changes compact drops entries older than this
+    CHANGELOG_RETENTION_DAYS = 7
+
+    # ?_profile=1 / X-Profile: 1 returns a profile instead of the response
+    PROFILING_ENABLED = False
+    PROFILE_LIMIT = 40
+
+
+class DevelopmentConfig(Config):
+    PROFILING_ENABLED = True
+
+
+class ProductionConfig(Config):
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_timeout': 10,
+        'pool_recycle': 3600,
+        'pool_pre_ping': True,
+    }
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_READ_URI = None
+    PROFILING_ENABLED = True
+
+
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
+
+
+def load_config(app, config=None):
+    """Populate ``app.config``.
+
+    ``config`` may be a profile name from ``CONFIGS``, a config class or
+    object, or a mapping of overrides applied on top of the profile named by
+    ``LATESHOW_CONFIG`` (default ``development``).
+    """
+    if isinstance(config, str):
+        app.config.from_object(CONFIGS[config])
+    elif config is not None and not isinstance(config, Mapping):
+        app.config.from_object(config)
+    else:
+        app.config.from_object(CONFIGS[os.environ.get('LATESHOW_CONFIG', 'development')])
+        if config:
+            # overrides must land before init_app, which builds the engine
+            app.config.update(config)
@@ -0,0 +1,57 @@
+"""Engine tuning and read/write routing for the SQLAlchemy session."""
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+class RoutingSession(Session):
+    """Send GET/HEAD request reads to the read-only engine when one is configured.
+
+    Flushes and anything outside a read request go to the primary engine.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and has_request_context()
+            and request.method in READ_METHODS
+        ):
+            engine = current_app.extensions.get('read_engine')
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _pragma_listener(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return set_pragmas
+
+
+def apply_pragmas(engine, pragmas):
+    if engine.dialect.name == 'sqlite' and pragmas:
+        event.listen(engine, 'connect', _pragma_listener(pragmas))
+
+
+def configure_engines(app, db):
+    """Attach SQLite pragmas to the app's engines and build the read engine.
+
+    The read engine comes from ``SQLALCHEMY_READ_URI`` and is stored as
+    ``app.extensions['read_engine']``; it is opened with ``query_only``.
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_pragmas(engine, pragmas)
+
+    read_uri = app.config.get('SQLALCHEMY_READ_URI')
+    if read_uri:
+        engine = create_engine(read_uri, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        apply_pragmas(engine, {**pragmas, 'query_only': 'ON'})
+        app.extensions['read_engine'] = engine
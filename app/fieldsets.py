@@ -0,0 +1,131 @@
+"""``?fields=`` and ``?include=`` for the read endpoints.
+
+``include`` lists dotted paths through a model's ``relations``
+(``/episodes?include=appearances.guest``). ``fields`` keeps only the named
+payload keys; a dotted name (``appearances.guest.name``) narrows a nested
+object and includes the relations on its way. A level that no field
+names keeps all its keys. Unknown names raise ``ValueError`` (a 400).
+
+The parsed ``FieldSet`` gives ``to_dict``'s ``include``/``exclude``, the
+matching eager loads and deferred columns, and for payloads without
+relations a column projection that skips the ORM entirely.
+"""
+from sqlalchemy import select
+
+from .models import include_paths
+from .serializers import projected_select, row_serializer
+
+# deepest include path accepted, e.g. appearances.episode.appearances
+MAX_INCLUDE_DEPTH = 3
+
+
+def _names(raw):
+    return [name.strip() for name in raw.split(',') if name.strip()]
+
+
+def payload_fields(model):
+    """The plain keys of ``model``'s payload (summaries name theirs separately)."""
+    return getattr(model, 'summary_fields', None) or model.serializable_fields
+
+
+def _walk(model, relations, tree, label):
+    """Follow ``relations`` from ``model``, adding them to ``tree``; returns ``(node, model)``."""
+    if len(relations) > MAX_INCLUDE_DEPTH:
+        raise ValueError(f'{label} {".".join(relations)!r} is nested more than {MAX_INCLUDE_DEPTH} deep')
+    node = tree
+    for index, name in enumerate(relations):
+        if name not in getattr(model, 'relations', {}):
+            raise ValueError(f'unknown {label} {".".join(relations[:index + 1])!r}')
+        node = node.setdefault(name, {})
+        model = model.related_model(name)
+    return node, model
+
+
+class FieldSet:
+    """A requested payload shape: the relation paths to include and the keys to leave out."""
+
+    def __init__(self, model, include=(), exclude=()):
+        self.model = model
+        self.include = include
+        self.exclude = exclude
+
+    @property
+    def fields(self):
+        """Top-level plain keys in the payload."""
+        return tuple(f for f in payload_fields(self.model) if f not in self.exclude)
+
+    @property
+    def projected(self):
+        """Whether the payload is plain columns, servable without ORM instances."""
+        return not self.include
+
+    def loader_options(self):
+        return self.model.loader_options(include=self.include, exclude=self.exclude)
+
+    def serialize(self, obj):
+        return obj.to_dict(include=self.include, exclude=self.exclude)
+
+    def select(self):
+        """Select for list rows; each row also has an ``id`` for the page cursor."""
+        model = self.model
+        if self.projected:
+            stmt = projected_select(model, self.fields)
+            return stmt if 'id' in self.fields else stmt.add_columns(model.id)
+        return select(model, model.id).options(*self.loader_options())
+
+    def row_serializer(self):
+        """Maps a ``select()`` row to its payload."""
+        if self.projected:
+            return row_serializer(self.model, self.fields)
+        serialize = self.serialize
+        return lambda row: serialize(row[0])
+
+
+def parse_fieldset(args, model, default_include=None):
+    """The ``FieldSet`` asked for by ``args``; raises ``ValueError`` for unknown names.
+
+    Without ``include`` the relations in ``default_include`` (None means the
+    model's ``default_include``) are used.
+    """
+    if default_include is None:
+        default_include = getattr(model, 'default_include', ())
+    raw_include = args.get('include')
+    tree = {}
+    for path in default_include if raw_include is None else _names(raw_include):
+        _walk(model, path.split('.'), tree, 'include')
+
+    raw_fields = args.get('fields')
+    if raw_fields is None:
+        return FieldSet(model, include_paths(tree), ())
+    requested = _names(raw_fields)
+    if not requested:
+        raise ValueError('fields must name at least one field')
+
+    # level prefix -> keys named at that level / relations a dotted name passes through
+    named, through = {}, {}
+    for entry in requested:
+        *relations, name = entry.split('.')
+        node, level = _walk(model, relations, tree, 'field')
+        if name in getattr(level, 'relations', {}):
+            _walk(level, [name], node, 'field')
+        elif name not in payload_fields(level):
+            raise ValueError(f'unknown field {entry!r}')
+        named.setdefault('.'.join(relations), set()).add(name)
+        for index, relation in enumerate(relations):
+            through.setdefault('.'.join(relations[:index]), set()).add(relation)
+
+    exclude = []
+
+    def prune(level, node, prefix):
+        keep = named.get(prefix)
+        dotted = f'{prefix}.' if prefix else ''
+        for name in list(node):
+            if keep is not None and name not in keep and name not in through.get(prefix, ()):
+                del node[name]
+            else:
+                prune(level.related_model(name), node[name], f'{dotted}{name}')
+        if keep is not None:
+            exclude.extend(f'{dotted}{f}' for f in payload_fields(level) if f not in keep)
+
+    prune(model, tree, '')
+    return FieldSet(model, include_paths(tree), tuple(exclude))
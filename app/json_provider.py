@@ -0,0 +1,115 @@
+"""JSON provider shared by the Flask and Quart apps.
+
+Encoding goes through the fastest available backend (``JSON_BACKEND``:
+``auto`` picks orjson, then msgspec, then the stdlib) and always produces
+compact output without key sorting. Dates render as ISO 8601 with every
+backend.
+
+``Fragment`` wraps JSON that is already encoded, such as a cached body;
+it is spliced into the output verbatim instead of being decoded and
+re-encoded.
+"""
+import json
+import re
+import uuid
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+BACKENDS = ('orjson', 'msgspec', 'stdlib')
+
+
+class Fragment:
+    """Pre-encoded JSON to embed as-is; the caller guarantees it is valid."""
+
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data.encode() if isinstance(data, str) else bytes(data)
+
+    def __repr__(self):
+        return f'Fragment({self.data!r})'
+
+
+def _stdlib_encode(obj, default):
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def _orjson_encode(obj, default):
+    import orjson
+    return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _msgspec_encode(obj, default):
+    import msgspec
+    return msgspec.json.encode(obj, enc_hook=default)
+
+
+ENCODERS = {'orjson': _orjson_encode, 'msgspec': _msgspec_encode, 'stdlib': _stdlib_encode}
+
+
+def resolve_backend(name='auto'):
+    """The backend ``name`` refers to; ``auto`` is the first importable one."""
+    if name != 'auto':
+        if name not in BACKENDS:
+            raise ValueError(f'unknown JSON_BACKEND: {name!r}')
+        return name
+    for backend in BACKENDS[:-1]:
+        try:
+            __import__(backend)
+        except ImportError:
+            continue
+        return backend
+    return 'stdlib'
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask's provider on a faster encoder, compact, with ISO dates and fragments."""
+
+    sort_keys = False
+    compact = True
+
+    def __init__(self, app, backend=None):
+        super().__init__(app)
+        self.backend = resolve_backend(backend or app.config.get('JSON_BACKEND', 'auto'))
+        self._encode = ENCODERS[self.backend]
+        # a per-provider nonce, so encoded user data cannot pose as a fragment
+        self._marker = f'__json_fragment_{uuid.uuid4().hex}_'
+        self._placeholder = re.compile(rb'"' + self._marker.encode() + rb'(\d+)"')
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, date):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def dumps_bytes(self, obj):
+        """``obj`` encoded to UTF-8 JSON bytes, with any ``Fragment`` spliced in."""
+        fragments = []
+
+        def default(o):
+            if isinstance(o, Fragment):
+                fragments.append(o.data)
+                return f'{self._marker}{len(fragments) - 1}'
+            return self.default(o)
+
+        body = self._encode(obj, default)
+        if fragments:
+            body = self._placeholder.sub(lambda m: fragments[int(m[1])], body)
+        return body
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            kwargs.setdefault('default', self.default)
+            return json.dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if self.backend == 'orjson' and not kwargs:
+            import orjson
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
@@ -0,0 +1,95 @@
+"""Top-k rankings read straight off indexed, trigger-maintained tables.
+
+``GET /leaderboards/guests`` ranks guests by average appearance rating.
+The averages already live in ``guest_stats``, which the app.stats
+triggers update on every appearance write (inline, bulk, queued or
+cascaded). Its ``(value_avg, row_count)`` index is the ranking: a top-k
+read walks k index entries from the high end, with no aggregation or sort.
+Ties go to the guest with more appearances.
+
+``GET /pizzas/<id>/cheapest`` lists the restaurants selling a pizza,
+cheapest first, off the ``(pizza_id, price, restaurant_id)`` index on
+``restaurant_pizzas``. That is a range scan of k entries under one prefix.
+
+Both take ``limit`` (default ``LEADERBOARD_LIMIT``, capped at
+``PAGE_MAX_LIMIT``), so a read costs O(k) however big the tables grow.
+"""
+from flask import current_app, jsonify, request
+from sqlalchemy import select
+
+from . import db
+from .models import Guest, GuestStats, Pizza, Restaurant, RestaurantPizza
+
+
+def _positive_int(args, name, default):
+    raw = args.get(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+    if value < 1:
+        raise ValueError(f'{name} must be at least 1')
+    return value
+
+
+def _limit(args):
+    config = current_app.config
+    return min(_positive_int(args, 'limit', config['LEADERBOARD_LIMIT']), config['PAGE_MAX_LIMIT'])
+
+
+def guest_ranking_select(limit, min_appearances=1):
+    """The top ``limit`` guests by average rating, in index order."""
+    return (
+        select(Guest.id, Guest.name, Guest.occupation, GuestStats.row_count, GuestStats.value_avg)
+        .join(Guest, Guest.id == GuestStats.guest_id)
+        .where(GuestStats.row_count >= min_appearances)
+        .order_by(GuestStats.value_avg.desc(), GuestStats.row_count.desc(), GuestStats.guest_id.desc())
+        .limit(limit)
+    )
+
+
+def cheapest_select(pizza_id, limit):
+    """The ``limit`` cheapest menu entries for ``pizza_id``, in index order."""
+    return (
+        select(RestaurantPizza.price, Restaurant.id, Restaurant.name, Restaurant.capacity)
+        .join(Restaurant, Restaurant.id == RestaurantPizza.restaurant_id)
+        .where(RestaurantPizza.pizza_id == pizza_id)
+        .order_by(RestaurantPizza.price, RestaurantPizza.restaurant_id)
+        .limit(limit)
+    )
+
+
+def guest_leaderboard_response():
+    try:
+        limit = _limit(request.args)
+        min_appearances = _positive_int(request.args, 'min_appearances', 1)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    rows = db.session.execute(guest_ranking_select(limit, min_appearances)).all()
+    return jsonify([
+        {'rank': rank, 'id': row.id, 'name': row.name, 'occupation': row.occupation,
+         'appearance_count': row.row_count, 'average_rating': round(row.value_avg, 2)}
+        for rank, row in enumerate(rows, 1)
+    ])
+
+
+def cheapest_response(pizza_id):
+    try:
+        limit = _limit(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    pizza = db.session.execute(
+        select(Pizza.id, Pizza.name, Pizza.ingredients).where(Pizza.id == pizza_id)
+    ).first()
+    if pizza is None:
+        return jsonify({'error': 'Pizza not found'}), 404
+    rows = db.session.execute(cheapest_select(pizza_id, limit)).all()
+    return jsonify({
+        'pizza': {'id': pizza.id, 'name': pizza.name, 'ingredients': pizza.ingredients},
+        'cheapest': [
+            {'price': row.price, 'restaurant': {'id': row.id, 'name': row.name, 'capacity': row.capacity}}
+            for row in rows
+        ],
+    })
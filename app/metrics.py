@@ -0,0 +1,244 @@
+"""Per-request metrics for the ``api`` blueprint, served at ``/metrics``.
+
+For every API request this records latency, response size, the number of
+SQL statements and the time spent in them (from the engines' cursor
+events), and the time spent building response dicts (``to_dict`` and the
+projected serializers). Each is a histogram labelled by endpoint, rendered
+in the Prometheus text format. A ``lateshow_startup_seconds`` gauge
+reports the import and ``create_app`` times the factory recorded.
+
+Outside production, ``?_profile=1`` (or ``X-Profile: 1``) returns a cProfile
+listing for the request instead of its body; ``?_profile=pyinstrument``
+uses pyinstrument when it is installed.
+"""
+import cProfile
+import io
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import Blueprint, current_app, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# (name, help, buckets)
+HISTOGRAMS = (
+    ('lateshow_request_duration_seconds', 'Time to handle an API request.', LATENCY_BUCKETS),
+    ('lateshow_response_size_bytes', 'Size of API response bodies (streamed bodies excluded).', SIZE_BUCKETS),
+    ('lateshow_sql_queries_per_request', 'SQL statements executed per API request.', QUERY_BUCKETS),
+    ('lateshow_sql_duration_seconds', 'Time spent executing SQL per API request.', LATENCY_BUCKETS),
+    ('lateshow_serialization_duration_seconds', 'Time spent building response dicts per API request.',
+     LATENCY_BUCKETS),
+)
+
+_BUCKETS = {name: buckets for name, _, buckets in HISTOGRAMS}
+
+metrics_bp = Blueprint('metrics', __name__)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Histograms keyed by ``(name, labels)``; safe to share between threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(_BUCKETS[name])
+            histogram.observe(value)
+
+    def render(self):
+        """The registry in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, help_text, _ in HISTOGRAMS:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (key_name, labels), histogram in sorted(self._histograms.items()):
+                    if key_name != name:
+                        continue
+                    label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+                    sep = ',' if label_text else ''
+                    cumulative = 0
+                    for bound, count in zip((*histogram.buckets, '+Inf'), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{label_text}{sep}le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{{label_text}}} {histogram.sum!r}')
+                    lines.append(f'{name}_count{{{label_text}}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+class RequestStats:
+    __slots__ = ('start', 'queries', 'sql_time', 'serialize_time', 'serialize_depth', 'profiler')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+        self.serialize_depth = 0
+        self.profiler = None
+
+
+def timed_serialization(fn):
+    """Count the time spent in ``fn`` (outermost call only) as serialization."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return fn(*args, **kwargs)
+        stats.serialize_depth += 1
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            stats.serialize_depth -= 1
+            if not stats.serialize_depth:
+                stats.serialize_time += time.perf_counter() - start
+    return wrapper
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    starts = conn.info.get('metrics_query_start')
+    if stats is None or not starts:
+        return
+    stats.queries += 1
+    stats.sql_time += time.perf_counter() - starts.pop()
+
+
+def instrument_engine(engine):
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _profile_mode():
+    mode = request.args.get('_profile') or request.headers.get('X-Profile')
+    if not mode or mode in ('0', 'false'):
+        return None
+    return 'pyinstrument' if mode == 'pyinstrument' else 'cprofile'
+
+
+def _start_request():
+    if request.blueprint != 'api':
+        return None
+    stats = RequestStats()
+    _current.set(stats)
+    mode = _profile_mode()
+    if mode and current_app.config.get('PROFILING_ENABLED'):
+        if mode == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                return current_app.response_class('pyinstrument is not installed\n', 400, mimetype='text/plain')
+            stats.profiler = Profiler()
+            stats.profiler.start()
+        else:
+            stats.profiler = cProfile.Profile()
+            stats.profiler.enable()
+    return None
+
+
+def _profile_report(profiler, response):
+    head = f'{request.method} {request.full_path.rstrip("?")} -> {response.status}\n\n'
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(current_app.config['PROFILE_LIMIT'])
+        body = out.getvalue()
+    else:
+        profiler.stop()
+        body = profiler.output_text()
+    return current_app.response_class(head + body, mimetype='text/plain')
+
+
+def _finish_request(response):
+    stats = _current.get()
+    if stats is None:
+        return response
+    record = (current_app.extensions['metrics'], stats, request.endpoint, request.method, response.status_code)
+    if stats.profiler is not None:
+        response = _profile_report(stats.profiler, response)
+        stats.profiler = None
+    if response.is_streamed:
+        # the rows are read and serialized while the body is sent, so the
+        # request stays current until the server closes the response
+        def close():
+            _record(*record, None)
+            _current.set(None)
+        response.call_on_close(close)
+    else:
+        _record(*record, response.content_length)
+        _current.set(None)
+    return response
+
+
+def _record(registry, stats, endpoint, method, status, size):
+    labels = {'endpoint': endpoint}
+    registry.observe('lateshow_request_duration_seconds',
+                     {**labels, 'method': method, 'status': str(status)}, time.perf_counter() - stats.start)
+    if size is not None:
+        registry.observe('lateshow_response_size_bytes', labels, size)
+    registry.observe('lateshow_sql_queries_per_request', labels, stats.queries)
+    registry.observe('lateshow_sql_duration_seconds', labels, stats.sql_time)
+    registry.observe('lateshow_serialization_duration_seconds', labels, stats.serialize_time)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    body = current_app.extensions['metrics'].render() + _render_startup(current_app.extensions.get('startup'))
+    return current_app.response_class(body, mimetype='text/plain; version=0.0.4')
+
+
+def _render_startup(startup):
+    """Gauges for the timings ``create_app`` recorded."""
+    if not startup:
+        return ''
+    name = 'lateshow_startup_seconds'
+    lines = [f'# HELP {name} Time spent importing the app package and in create_app().', f'# TYPE {name} gauge']
+    for phase in ('import', 'create_app'):
+        lines.append(f'{name}{{phase="{phase}"}} {startup[f"{phase}_seconds"]!r}')
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app, db):
+    """Attach the request hooks, cursor listeners and ``/metrics`` to ``app``."""
+    app.extensions['metrics'] = Registry()
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+    read_engine = app.extensions.get('read_engine')
+    if read_engine is not None:
+        instrument_engine(read_engine)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.register_blueprint(metrics_bp)
@@ -1,158 +1,336 @@
+from datetime import date, datetime
+from functools import lru_cache
+
 from . import db
-from sqlalchemy.orm import validates
+from .metrics import timed_serialization
+from .validation import APPEARANCE, PIZZA, RESTAURANT, RESTAURANT_PIZZA
+from sqlalchemy.orm import Load, validates
+
+# accepted spellings of an episode date, ISO first; '%y' maps 69-99 to 19xx
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%y', '%m/%d/%Y')
 
 
+def parse_date(value):
+    """A ``date`` from a ``date`` or a string in one of ``DATE_FORMATS``."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(value.strip(), fmt).date()
+            except ValueError:
+                pass
+    raise ValueError(f'date must be YYYY-MM-DD or M/D/YY, got {value!r}')
+
+
+@lru_cache(maxsize=256)
+def include_tree(include):
+    """``('appearances.guest', 'x')`` as ``{'appearances': {'guest': {}}, 'x': {}}``."""
+    tree = {}
+    for path in include:
+        node = tree
+        for name in path.split('.'):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def include_paths(tree, prefix=''):
+    """Inverse of ``include_tree``: the dotted path of every leaf."""
+    paths = []
+    for name, subtree in tree.items():
+        path = f'{prefix}{name}'
+        paths.extend(include_paths(subtree, f'{path}.') if subtree else [path])
+    return tuple(paths)
+
+
+def nested_exclude(exclude, name):
+    """The entries of ``exclude`` under relation ``name``, with the prefix dropped."""
+    prefix = f'{name}.'
+    return tuple(e[len(prefix):] for e in exclude if e.startswith(prefix))
+
+
+class SerializerMixin:
+    """``to_dict`` and matching eager-load options driven by ``include``/``exclude``.
+
+    ``include`` is a sequence of dotted paths through ``relations`` (payload
+    name -> relationship attribute); None means ``default_include``.
+    ``exclude`` names payload keys to leave out, dotted for nested ones.
+    ``serializable_fields`` is shared with the column-projected serializers.
+    """
+
+    relations = {}
+    default_include = ()
+
+    @classmethod
+    def related_model(cls, name):
+        return getattr(cls, cls.relations[name]).property.mapper.class_
+
+    @classmethod
+    def loader_options(cls, include=None, depth=1, exclude=()):
+        """Options loading exactly what ``to_dict`` with the same arguments reads.
+
+        Collections are select-in loaded and single parents joined; excluded
+        fields are deferred, keeping the keys relationships are loaded by.
+        """
+        include = cls.default_include if include is None else include
+        tree = include_tree(tuple(include)) if depth else {}
+        return cls._options(tree, tuple(exclude or ()), Load(cls))
+
+    @classmethod
+    def _options(cls, tree, exclude, path):
+        options = []
+        excluded = {e for e in exclude if '.' not in e}
+        if excluded & set(cls.serializable_fields):
+            kept = [
+                attr.class_attribute for attr in cls.__mapper__.column_attrs
+                if attr.key in cls.serializable_fields and attr.key not in excluded
+                or any(c.primary_key or c.foreign_keys for c in attr.columns)
+            ]
+            options.append(path.load_only(*kept))
+        for name, subtree in tree.items():
+            if name in excluded:
+                continue
+            attr = getattr(cls, cls.relations[name])
+            child = path.selectinload(attr) if attr.property.uselist else path.joinedload(attr)
+            options.append(child)
+            options.extend(cls.related_model(name)._options(subtree, nested_exclude(exclude, name), child))
+        return options
+
+    @timed_serialization
+    def to_dict(self, include=None, exclude=None, depth=1):
+        exclude = tuple(exclude or ())
+        data = {f: getattr(self, f) for f in self.serializable_fields if f not in exclude}
+        include = self.default_include if include is None else include
+        if not depth or not include:
+            return data
+        for name, subtree in include_tree(tuple(include)).items():
+            if name in exclude:
+                continue
+            value = getattr(self, self.relations[name])
+            options = {'include': include_paths(subtree), 'exclude': nested_exclude(exclude, name), 'depth': depth}
+            if isinstance(value, list):
+                data[name] = [child.to_dict(**options) for child in value]
+            else:
+                data[name] = value and value.to_dict(**options)
+        return data
+
 
-class Episode(db.Model):
+class Episode(SerializerMixin, db.Model):
     __tablename__ = 'episodes'
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.String, nullable=False)
+    date = db.Column(db.Date, nullable=False)
     number = db.Column(db.Integer, nullable=False)
 
+    serializable_fields = ('id', 'date', 'number')
+    relations = {'appearances': 'appearances'}
+    default_include = ('appearances.guest',)
+    # ?sort= name -> columns, each backed by an index
+    sort_orders = {'date': ('date', 'number')}
+
     appearances = db.relationship(
-        'Appearance', back_populates='episode', cascade='all, delete-orphan'
+        'Appearance', back_populates='episode', cascade='all, delete-orphan', passive_deletes=True
     )
 
-    def to_dict(self, include=None, exclude=None, depth=1):
-        data = {'id': self.id, 'date': self.date, 'number': self.number}
-        if depth and (include is None or 'appearances' in include):
-            # include guest details for each appearance (limit recursion)
-            data['appearances'] = [a.to_dict(include=('guest',), depth=1) for a in self.appearances]
-        return data
+    __table_args__ = (db.Index('ix_episodes_date_number', 'date', 'number'),)
+
+    @validates('date')
+    def validate_date(self, key, value):
+        return parse_date(value)
 
 
-class Guest(db.Model):
+
+class Guest(SerializerMixin, db.Model):
     __tablename__ = 'guests'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     occupation = db.Column(db.String, nullable=False)
 
+    serializable_fields = ('id', 'name', 'occupation')
+    relations = {'appearances': 'appearances'}
+
     appearances = db.relationship(
-        'Appearance', back_populates='guest', cascade='all, delete-orphan'
+        'Appearance', back_populates='guest', cascade='all, delete-orphan', passive_deletes=True
     )
 
-    def to_dict(self, include=None, exclude=None, depth=1):
-        return {'id': self.id, 'name': self.name, 'occupation': self.occupation}
+
+db.Index('ix_guests_occupation_nocase', Guest.occupation.collate('NOCASE'))
 
 
-class Appearance(db.Model):
+class Appearance(SerializerMixin, db.Model):
     __tablename__ = 'appearances'
     id = db.Column(db.Integer, primary_key=True)
     rating = db.Column(db.Integer, nullable=False)
-    guest_id = db.Column(db.Integer, db.ForeignKey('guests.id'), nullable=False)
-    episode_id = db.Column(db.Integer, db.ForeignKey('episodes.id'), nullable=False)
+    guest_id = db.Column(db.Integer, db.ForeignKey('guests.id', ondelete='CASCADE'), nullable=False)
+    episode_id = db.Column(db.Integer, db.ForeignKey('episodes.id', ondelete='CASCADE'), nullable=False)
+
+    serializable_fields = ('id', 'rating', 'guest_id', 'episode_id')
+    relations = {'guest': 'guest', 'episode': 'episode'}
 
     guest = db.relationship('Guest', back_populates='appearances')
     episode = db.relationship('Episode', back_populates='appearances')
 
     __table_args__ = (
         db.CheckConstraint('rating >= 1 AND rating <= 5', name='rating_range'),
+        db.Index('uq_appearances_episode_id_guest_id', 'episode_id', 'guest_id', unique=True),
+        db.Index('ix_appearances_guest_id', 'guest_id'),
     )
 
-    def to_dict(self, include=None, exclude=None, depth=1):
-        data = {
-            'id': self.id,
-            'rating': self.rating,
-            'guest_id': self.guest_id,
-            'episode_id': self.episode_id,
-        }
-        if depth and include and 'guest' in include:
-            data['guest'] = self.guest.to_dict()
-        if depth and include and 'episode' in include:
-            # return episode base fields only
-            data['episode'] = {'id': self.episode.id, 'date': self.episode.date, 'number': self.episode.number}
-        return data
+    @validates('rating')
+    def validate_rating(self, key, value):
+        return APPEARANCE.check(key, value)
 
 
-class Restaurant(db.Model):
+
+class Restaurant(SerializerMixin, db.Model):
     __tablename__ = 'restaurants'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), nullable=False)
     capacity = db.Column(db.Integer, nullable=False)
 
+    serializable_fields = ('id', 'name', 'capacity')
+    relations = {'pizzas': 'restaurant_pizzas'}
+    default_include = ('pizzas.pizza',)
+
     restaurant_pizzas = db.relationship(
-        'RestaurantPizza', back_populates='restaurant', cascade='all, delete-orphan'
+        'RestaurantPizza', back_populates='restaurant', cascade='all, delete-orphan', passive_deletes=True
     )
 
-    @validates('name')
-    def validate_name(self, key, value):
-        if not value or not value.strip():
-            raise ValueError('name must be present')
-        if len(value) > 80:
-            raise ValueError('name too long')
-        return value
+    @validates('name', 'capacity')
+    def validate_field(self, key, value):
+        return RESTAURANT.check(key, value)
 
-    @validates('capacity')
-    def validate_capacity(self, key, value):
-        if value is None:
-            raise ValueError('capacity must be present')
-        if not isinstance(value, int) or value < 0:
-            raise ValueError('capacity must be a non-negative integer')
-        return value
 
-    def to_dict(self, include=None, exclude=None, depth=1):
-        data = {'id': self.id, 'name': self.name, 'capacity': self.capacity}
-        if depth and (include is None or 'pizzas' in include):
-            data['pizzas'] = [rp.to_dict(include=('pizza',), depth=1) for rp in self.restaurant_pizzas]
-        return data
 
-
-class Pizza(db.Model):
+class Pizza(SerializerMixin, db.Model):
     __tablename__ = 'pizzas'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), nullable=False)
     ingredients = db.Column(db.String, nullable=False)
 
-    restaurant_pizzas = db.relationship('RestaurantPizza', back_populates='pizza', cascade='all, delete-orphan')
+    serializable_fields = ('id', 'name', 'ingredients')
 
-    @validates('name')
-    def validate_name(self, key, value):
-        if not value or not value.strip():
-            raise ValueError('name must be present')
-        if len(value) > 80:
-            raise ValueError('name too long')
-        return value
+    restaurant_pizzas = db.relationship(
+        'RestaurantPizza', back_populates='pizza', cascade='all, delete-orphan', passive_deletes=True
+    )
+
+    @validates('name', 'ingredients')
+    def validate_field(self, key, value):
+        return PIZZA.check(key, value)
 
-    @validates('ingredients')
-    def validate_ingredients(self, key, value):
-        if not value or not value.strip():
-            raise ValueError('ingredients must be present')
-        return value
 
-    def to_dict(self, include=None, exclude=None, depth=1):
-        return {'id': self.id, 'name': self.name, 'ingredients': self.ingredients}
 
+class PizzaIngredient(db.Model):
+    """Normalized (lowercased, trimmed) ingredients, kept in sync by app.search triggers."""
+    __tablename__ = 'pizza_ingredients'
+    ingredient = db.Column(db.String, primary_key=True)
+    pizza_id = db.Column(db.Integer, db.ForeignKey('pizzas.id', ondelete='CASCADE'), primary_key=True)
 
-class RestaurantPizza(db.Model):
+    __table_args__ = (db.Index('ix_pizza_ingredients_pizza_id', 'pizza_id'),)
+
+
+class RestaurantPizza(SerializerMixin, db.Model):
     __tablename__ = 'restaurant_pizzas'
     id = db.Column(db.Integer, primary_key=True)
     price = db.Column(db.Integer, nullable=False)
-    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), nullable=False)
-    pizza_id = db.Column(db.Integer, db.ForeignKey('pizzas.id'), nullable=False)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id', ondelete='CASCADE'), nullable=False)
+    pizza_id = db.Column(db.Integer, db.ForeignKey('pizzas.id', ondelete='CASCADE'), nullable=False)
+
+    serializable_fields = ('id', 'price', 'restaurant_id', 'pizza_id')
+    relations = {'pizza': 'pizza', 'restaurant': 'restaurant'}
 
     restaurant = db.relationship('Restaurant', back_populates='restaurant_pizzas')
     pizza = db.relationship('Pizza', back_populates='restaurant_pizzas')
 
     __table_args__ = (
         db.CheckConstraint('price > 0 AND price <= 1000', name='price_range'),
+        db.Index('uq_restaurant_pizzas_restaurant_id_pizza_id', 'restaurant_id', 'pizza_id', unique=True),
+        # /pizzas/<id>/cheapest reads a pizza's restaurants in price order from here
+        db.Index('ix_restaurant_pizzas_pizza_id_price_restaurant_id', 'pizza_id', 'price', 'restaurant_id'),
     )
 
     @validates('price')
     def validate_price(self, key, value):
-        if value is None:
-            raise ValueError('price must be present')
-        try:
-            iv = int(value)
-        except Exception:
-            raise ValueError('price must be integer')
-        if iv <= 0 or iv > 1000:
-            raise ValueError('price out of allowed range')
-        return iv
+        return RESTAURANT_PIZZA.check(key, value)
+
+
+
+class TableVersion(db.Model):
+    """Write counter per table, bumped by app.versioning on every flush."""
+    __tablename__ = 'table_versions'
+    name = db.Column(db.String, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Change(db.Model):
+    """One insert/update/delete of a data row, appended by app.changelog triggers."""
+    __tablename__ = 'changes'
+    seq = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String, nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String, nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, server_default=db.func.current_timestamp())
+
+    # AUTOINCREMENT so a seq is never reused once compaction deleted its row
+    __table_args__ = (
+        db.Index('ix_changes_table_name_row_id', 'table_name', 'row_id'),
+        {'sqlite_autoincrement': True},
+    )
+
+
+class ChangeHorizon(db.Model):
+    """The last seq compaction discarded; feeds starting before it answer 410."""
+    __tablename__ = 'changes_horizon'
+    id = db.Column(db.Integer, primary_key=True)
+    seq = db.Column(db.Integer, nullable=False, default=0)
+
 
+class SummaryMixin:
+    """count/sum/min/max of one source column, kept current by app.stats triggers."""
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    value_sum = db.Column(db.Integer, nullable=False, default=0)
+    value_min = db.Column(db.Integer)
+    value_max = db.Column(db.Integer)
+    # generated so it can be indexed for average-based filters
+    value_avg = db.Column(db.Float, db.Computed('CAST(value_sum AS REAL) / NULLIF(row_count, 0)', persisted=False))
+
+    # payload names for (parent id, row_count, average, value_min, value_max)
+    summary_fields = ()
+
+    @property
+    def average(self):
+        return round(self.value_sum / self.row_count, 2) if self.row_count else None
+
+    @timed_serialization
     def to_dict(self, include=None, exclude=None, depth=1):
-        data = {'id': self.id, 'price': self.price, 'restaurant_id': self.restaurant_id, 'pizza_id': self.pizza_id}
-        if depth and include and 'pizza' in include:
-            data['pizza'] = self.pizza.to_dict()
-        if depth and include and 'restaurant' in include:
-            data['restaurant'] = {'id': self.restaurant.id, 'name': self.restaurant.name, 'capacity': self.restaurant.capacity}
-        return data
+        parent_id = getattr(self, self.__mapper__.primary_key[0].key)
+        values = (parent_id, self.row_count, self.average, self.value_min, self.value_max)
+        exclude = tuple(exclude or ())
+        return {name: value for name, value in zip(self.summary_fields, values) if name not in exclude}
+
+
+class EpisodeStats(SummaryMixin, db.Model):
+    __tablename__ = 'episode_stats'
+    episode_id = db.Column(db.Integer, db.ForeignKey('episodes.id', ondelete='CASCADE'), primary_key=True)
+
+    summary_fields = ('episode_id', 'appearance_count', 'average_rating', 'min_rating', 'max_rating')
+
+    __table_args__ = (db.Index('ix_episode_stats_value_avg', 'value_avg'),)
+
+
+class GuestStats(SummaryMixin, db.Model):
+    __tablename__ = 'guest_stats'
+    guest_id = db.Column(db.Integer, db.ForeignKey('guests.id', ondelete='CASCADE'), primary_key=True)
+
+    summary_fields = ('guest_id', 'appearance_count', 'average_rating', 'min_rating', 'max_rating')
+
+    # the leaderboard order; also serves value_avg filters
+    __table_args__ = (db.Index('ix_guest_stats_value_avg_row_count', 'value_avg', 'row_count'),)
+
+
+class RestaurantStats(SummaryMixin, db.Model):
+    __tablename__ = 'restaurant_stats'
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id', ondelete='CASCADE'), primary_key=True)
+
+    summary_fields = ('restaurant_id', 'pizza_count', 'average_price', 'min_price', 'max_price')
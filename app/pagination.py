@@ -0,0 +1,208 @@
+"""Keyset pagination and streaming helpers for the list endpoints."""
+from urllib.parse import urlencode
+
+from flask import Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import select, tuple_
+
+from . import db
+from .fieldsets import parse_fieldset
+from .serializers import projected_select, serialize_rows
+from .validation import MAX_ID
+
+STREAM_MIMETYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _int_arg(args, name, minimum):
+    raw = args.get(name)
+    if raw is None:
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+    if value < minimum:
+        raise ValueError(f'{name} must be at least {minimum}')
+    # larger ints overflow when SQLite binds them
+    if value > MAX_ID:
+        raise ValueError(f'{name} must be at most {MAX_ID}')
+    return value
+
+
+def _stream_arg(args):
+    raw = args.get('stream')
+    if raw is None:
+        return None
+    fmt = 'json' if raw in ('1', 'true') else raw
+    if fmt not in STREAM_MIMETYPES:
+        raise ValueError(f"stream must be one of: 1, {', '.join(STREAM_MIMETYPES)}")
+    return fmt
+
+
+def parse_page_args(args):
+    """Return ``(after_id, limit, stream)`` from query ``args``; raises ``ValueError``."""
+    return _int_arg(args, 'after_id', 0), _int_arg(args, 'limit', 1), _stream_arg(args)
+
+
+def parse_sort(args, model):
+    """The ``sort`` arg, checked against ``model.sort_orders``; raises ``ValueError``."""
+    sort = args.get('sort')
+    orders = getattr(model, 'sort_orders', {})
+    if sort is None or sort == 'id':
+        return None
+    if sort not in orders:
+        raise ValueError(f"sort must be one of: {', '.join(['id', *orders])}")
+    return sort
+
+
+def keyset_select(model, after_id=None, sort=None, stmt=None):
+    """``stmt`` (default: the projected select of ``model``) in ``sort`` order
+    (default id), starting after ``after_id``.
+
+    Named sorts order by ``model.sort_orders[sort]`` then id, backed by an
+    index on those columns; the cursor is still the last row's id, resolved
+    to its sort key by primary key.
+    """
+    columns = [getattr(model, c) for c in model.sort_orders[sort]] if sort else []
+    stmt = (projected_select(model) if stmt is None else stmt).order_by(*columns, model.id)
+    if after_id is None:
+        return stmt
+    if not columns:
+        return stmt.where(model.id > after_id)
+    cursor = [select(c).where(model.id == after_id).scalar_subquery() for c in columns]
+    return stmt.where(tuple_(*columns, model.id) > tuple_(*cursor, after_id))
+
+
+def parse_ids(args, maximum):
+    """The ``ids`` arg as ints in request order; raises ``ValueError``.
+
+    ``ids`` only combines with ``fields`` and ``include``.
+    """
+    try:
+        ids = [int(part) for part in args['ids'].split(',') if part.strip()]
+    except ValueError:
+        raise ValueError('ids must be comma-separated integers')
+    if not ids:
+        raise ValueError('ids must name at least one id')
+    if not all(1 <= obj_id <= MAX_ID for obj_id in ids):
+        raise ValueError(f'ids must be between 1 and {MAX_ID}')
+    if len(ids) > maximum:
+        raise ValueError(f'ids may name at most {maximum} ids')
+    others = sorted(a for a in args if a not in ('ids', 'fields', 'include') and not a.startswith('_'))
+    if others:
+        raise ValueError(f"ids cannot be combined with {', '.join(others)}")
+    return ids
+
+
+def multi_get_select(model, ids, fieldset):
+    """One ``IN`` select of the ``ids`` rows, with the eager loads ``fieldset`` needs."""
+    return select(model).where(model.id.in_(set(ids))).options(*fieldset.loader_options())
+
+
+def multi_get_payload(model, ids, found, serialize):
+    """Payloads for ``ids`` in request order; a missing id gets a 404 marker.
+
+    ``found`` maps id -> instance; repeated ids are serialized once.
+    """
+    not_found = f'{model.__name__} not found'
+    payloads = {}
+    items = []
+    for obj_id in ids:
+        obj = found.get(obj_id)
+        if obj is None:
+            items.append({'id': obj_id, 'status': 404, 'error': not_found})
+            continue
+        if obj_id not in payloads:
+            payloads[obj_id] = serialize(obj)
+        items.append(payloads[obj_id])
+    return items
+
+
+def multi_get_response(model):
+    """Serve ``?ids=``: the detail payloads of those rows, as ``GET /<model>/<id>`` shapes them."""
+    try:
+        ids = parse_ids(request.args, current_app.config['MULTI_GET_MAX_IDS'])
+        fieldset = parse_fieldset(request.args, model)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    found = {obj.id: obj for obj in db.session.scalars(multi_get_select(model, ids, fieldset))}
+    return jsonify(multi_get_payload(model, ids, found, fieldset.serialize))
+
+
+def page_limit(limit, config):
+    return min(limit or config['PAGE_DEFAULT_LIMIT'], config['PAGE_MAX_LIMIT'])
+
+
+def next_page_headers(path, args, cursor, limit):
+    """``Link``/``X-Next-Cursor`` headers pointing past ``cursor``."""
+    args = {**args, 'after_id': cursor, 'limit': limit}
+    return {
+        'X-Next-Cursor': str(cursor),
+        'Link': f'<{path}?{urlencode(args)}>; rel="next"',
+    }
+
+
+def list_response(model, filters=None):
+    """Render ``model`` rows ordered by id, projected to its serializable fields.
+
+    Without query args the whole table is returned, as before. ``after_id``
+    and ``limit`` switch to keyset pagination: the body is still a JSON array
+    and the next page is advertised via a ``Link: rel="next"`` header and
+    ``X-Next-Cursor``. ``stream=1|json|ndjson`` streams rows from a
+    ``yield_per`` cursor instead of building the list in memory.
+    ``filters(args)`` returns extra WHERE clauses (see ``app.search``),
+    ``sort`` picks one of ``model.sort_orders`` and ``fields``/``include``
+    shape the rows (see ``app.fieldsets``). ``ids`` fetches those rows in
+    their detail shape instead (see ``multi_get_response``).
+    """
+    if 'ids' in request.args:
+        return multi_get_response(model)
+    try:
+        after_id, limit, stream = parse_page_args(request.args)
+        sort = parse_sort(request.args, model)
+        fieldset = parse_fieldset(request.args, model, default_include=())
+        clauses = filters(request.args) if filters else ()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    stmt = keyset_select(model, after_id, sort, fieldset.select()).where(*clauses)
+    serialize = fieldset.row_serializer()
+
+    if stream:
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return stream_response(stmt, serialize, stream)
+
+    if after_id is None and limit is None:
+        return jsonify(serialize_rows(serialize, db.session.execute(stmt).all()))
+
+    limit = page_limit(limit, current_app.config)
+    rows = db.session.execute(stmt.limit(limit + 1)).all()
+    page = rows[:limit]
+    resp = jsonify(serialize_rows(serialize, page))
+    if len(rows) > limit:
+        resp.headers.update(next_page_headers(request.path, request.args.to_dict(), page[-1].id, limit))
+    return resp
+
+
+def stream_response(stmt, serialize, fmt='json'):
+    """Stream the rows of ``stmt`` as a JSON array or NDJSON, chunk by chunk."""
+    chunk_size = current_app.config['STREAM_CHUNK_SIZE']
+    dumps = current_app.json.dumps_bytes
+
+    def generate():
+        result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+        if fmt == 'ndjson':
+            for partition in result.partitions():
+                yield b''.join(dumps(serialize(row)) + b'\n' for row in partition)
+            return
+        yield b'['
+        sep = b''
+        for partition in result.partitions():
+            yield sep + b','.join(dumps(serialize(row)) for row in partition)
+            sep = b','
+        yield b']'
+
+    return Response(stream_with_context(generate()), mimetype=STREAM_MIMETYPES[fmt])
@@ -1,11 +1,27 @@
-from flask import Blueprint, jsonify, request
-from .models import Episode, Guest, Appearance
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from .models import Episode, EpisodeStats, Guest, GuestStats, Pizza, Restaurant, RestaurantStats
 from . import db
+from .batch import batch_response
+from .bulk import bulk_create
+from .cache import cached
+from .changelog import changes_response, stream_changes_response
+from .fieldsets import parse_fieldset
+from .leaderboards import cheapest_response, guest_leaderboard_response
+from .pagination import list_response
+from .search import episode_filters, guest_filters, pizza_filters
+from .serializers import EPISODE_DETAIL, RESTAURANT_DETAIL, projected_select, row_serializer
+from .versioning import conditional
+from .write_queue import queued_response, wants_queue
+from .writes import APPEARANCES, MENU_ITEMS, violation
 
 bp = Blueprint('api', __name__)
 
 
 @bp.route('/', methods=['GET'])
+@conditional()
 def index():
     return jsonify({'message': 'Late Show API', 'routes': ['/episodes', '/guests', '/appearances']}), 200
 
@@ -16,136 +32,223 @@ def favicon():
 
 
 @bp.route('/episodes', methods=['GET'])
+@conditional('episodes', 'appearances', 'guests')
 def get_episodes():
-    episodes = Episode.query.all()
-    return jsonify([e.to_dict(depth=0) for e in episodes])
+    return list_response(Episode, episode_filters)
 
 
 @bp.route('/episodes/<int:episode_id>', methods=['GET'])
+@conditional('episodes', 'appearances', 'guests')
+@cached('episode', 'episode_id')
 def get_episode(episode_id):
-    ep = Episode.query.get(episode_id)
-    if not ep:
-        return jsonify({'error': 'Episode not found'}), 404
-    return jsonify(ep.to_dict())
+    return _detail_response(Episode, episode_id, 'Episode not found')
+
+
+def _detail_response(model, obj_id, not_found):
+    """Serve one row shaped by ``?fields=``/``?include=``, loading only what that shape reads."""
+    try:
+        fieldset = parse_fieldset(request.args, model)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    obj = db.session.get(model, obj_id, options=fieldset.loader_options())
+    if not obj:
+        return jsonify({'error': not_found}), 404
+    return jsonify(fieldset.serialize(obj))
+
+
+@bp.route('/episodes/<int:episode_id>/stats', methods=['GET'])
+@conditional('episodes', 'appearances')
+def get_episode_stats(episode_id):
+    return _stats_response(Episode, EpisodeStats, episode_id, 'Episode not found')
+
+
+@bp.route('/leaderboards/guests', methods=['GET'])
+@conditional('guests', 'appearances')
+def get_guest_leaderboard():
+    return guest_leaderboard_response()
+
+
+@bp.route('/guests/<int:guest_id>/stats', methods=['GET'])
+@conditional('guests', 'appearances')
+def get_guest_stats(guest_id):
+    return _stats_response(Guest, GuestStats, guest_id, 'Guest not found')
+
+
+def _stats_response(model, stats_model, obj_id, not_found):
+    """Serve a summary row, with an empty summary for parents without children."""
+    try:
+        fieldset = parse_fieldset(request.args, stats_model)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    key = stats_model.__mapper__.primary_key[0]
+    row = db.session.execute(
+        select(model.id, stats_model).outerjoin(stats_model, key == model.id).where(model.id == obj_id)
+    ).first()
+    if row is None:
+        return jsonify({'error': not_found}), 404
+    stats = row[1] or stats_model(**{key.key: obj_id, 'row_count': 0, 'value_sum': 0})
+    return jsonify(stats.to_dict(exclude=fieldset.exclude))
+
+
+@bp.route('/batch', methods=['POST'])
+def batch():
+    return batch_response()
+
+
+@bp.route('/changes', methods=['GET'])
+def get_changes():
+    return changes_response()
+
+
+@bp.route('/changes/stream', methods=['GET'])
+def stream_changes():
+    return stream_changes_response()
+
+
+@bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(current_app.extensions['response_cache'].stats())
+
+
+@bp.route('/episodes/<int:episode_id>', methods=['DELETE'])
+def delete_episode(episode_id):
+    return _delete_response(Episode, EPISODE_DETAIL, episode_id, 'Episode not found')
+
+
+def _delete_response(model, shape, obj_id, not_found):
+    """Delete a row and everything cascading from it with one DELETE.
+
+    The payload (the row's detail shape, or ``to_dict()`` when ``shape`` is
+    None) is read with one projected query first; child rows go via the
+    foreign keys' ON DELETE CASCADE rather than being loaded.
+    """
+    if shape is None:
+        row = db.session.execute(projected_select(model).where(model.id == obj_id)).first()
+        data = row and row_serializer(model)(row)
+    else:
+        data = shape.assemble(db.session.execute(shape.select(obj_id)).all())
+    if not data:
+        return jsonify({'error': not_found}), 404
+    db.session.execute(delete(model).where(model.id == obj_id))
+    db.session.commit()
+    return jsonify(data)
 
 
 @bp.route('/guests', methods=['GET'])
+@conditional('guests', 'appearances', 'episodes')
 def get_guests():
-    guests = Guest.query.all()
-    return jsonify([g.to_dict() for g in guests])
+    return list_response(Guest, guest_filters)
+
+
+@bp.route('/guests/<int:guest_id>', methods=['DELETE'])
+def delete_guest(guest_id):
+    return _delete_response(Guest, None, guest_id, 'Guest not found')
 
 
 @bp.route('/appearances', methods=['POST'])
 def create_appearance():
-    data = request.get_json() or {}
-    rating = data.get('rating')
-    episode_id = data.get('episode_id')
-    guest_id = data.get('guest_id')
+    return _write_response(APPEARANCES)
 
-    errors = []
-    if rating is None:
-        errors.append('rating is required')
-    else:
-        try:
-            rating = int(rating)
-            if rating < 1 or rating > 5:
-                errors.append('rating must be between 1 and 5')
-        except Exception:
-            errors.append('rating must be an integer')
-
-    if episode_id is None:
-        errors.append('episode_id is required')
-    if guest_id is None:
-        errors.append('guest_id is required')
 
+@bp.route('/appearances', methods=['PUT'])
+def upsert_appearance():
+    return _write_response(APPEARANCES, upsert=True)
+
+
+def _write_response(target, upsert=False):
+    """Insert (or with ``upsert``, insert-or-update) one row and return it with its parents.
+
+    The row goes in with a single statement; the database's foreign keys and
+    unique index do the checking, and their errors become 422s. With
+    ``WRITE_QUEUE`` on, the validated row may go to the write queue instead.
+    """
+    data = request.get_json() or {}
+    values, errors = target.validate(data)
     if errors:
         return jsonify({'errors': errors}), 422
 
-    episode = Episode.query.get(episode_id)
-    guest = Guest.query.get(guest_id)
-    if not episode:
-        return jsonify({'errors': ['episode not found']}), 422
-    if not guest:
-        return jsonify({'errors': ['guest not found']}), 422
+    write_queue = current_app.extensions.get('write_queue')
+    if write_queue is not None and wants_queue(current_app.config['WRITE_QUEUE']):
+        return queued_response(
+            write_queue, target, values, upsert,
+            ack=current_app.config['WRITE_QUEUE_ACK'], timeout=current_app.config['WRITE_QUEUE_TIMEOUT'],
+        )
 
-    appearance = Appearance(rating=rating, episode=episode, guest=guest)
-    db.session.add(appearance)
     try:
-        db.session.commit()
-    except Exception as e:
+        obj_id = db.session.scalar(target.upsert(values) if upsert else target.insert(values))
+    except IntegrityError as e:
         db.session.rollback()
-        return jsonify({'errors': [str(e)]}), 422
+        found = None
+        if violation(e) == 'foreign_key':
+            found = db.session.execute(target.reference_check(values)).one()
+        return jsonify({'errors': target.errors(e, found)}), 422
+
+    body = db.session.execute(target.detail(obj_id)).scalar_one().to_dict(include=target.include, depth=1)
+    db.session.commit()
+    return jsonify(body), 200 if upsert else 201
+
+
+@bp.route('/writes/<write_id>', methods=['GET'])
+def get_write(write_id):
+    write_queue = current_app.extensions.get('write_queue')
+    item = write_queue and write_queue.get(write_id)
+    if item is None:
+        return jsonify({'error': 'Write not found'}), 404
+    return jsonify(item.to_dict())
 
-    return jsonify(appearance.to_dict(include=('episode', 'guest'), depth=1)), 201
+
+@bp.route('/appearances/bulk', methods=['POST'])
+def create_appearances_bulk():
+    return bulk_create(APPEARANCES)
 
 
 # --- Restaurants / Pizzas endpoints ---
 @bp.route('/restaurants', methods=['GET'])
+@conditional('restaurants', 'restaurant_pizzas', 'pizzas')
 def get_restaurants():
-    from .models import Restaurant
-    restaurants = Restaurant.query.all()
-    return jsonify([r.to_dict(depth=0) for r in restaurants])
+    return list_response(Restaurant)
 
 
 @bp.route('/restaurants/<int:restaurant_id>', methods=['GET'])
+@conditional('restaurants', 'restaurant_pizzas', 'pizzas')
+@cached('restaurant', 'restaurant_id')
 def get_restaurant(restaurant_id):
-    from .models import Restaurant
-    r = Restaurant.query.get(restaurant_id)
-    if not r:
-        return jsonify({'error': 'Restaurant not found'}), 404
-    return jsonify(r.to_dict())
+    return _detail_response(Restaurant, restaurant_id, 'Restaurant not found')
+
+
+@bp.route('/restaurants/<int:restaurant_id>/stats', methods=['GET'])
+@conditional('restaurants', 'restaurant_pizzas')
+def get_restaurant_stats(restaurant_id):
+    return _stats_response(Restaurant, RestaurantStats, restaurant_id, 'Restaurant not found')
 
 
 @bp.route('/pizzas', methods=['GET'])
+@conditional('pizzas')
 def get_pizzas():
-    from .models import Pizza
-    pizzas = Pizza.query.all()
-    return jsonify([p.to_dict() for p in pizzas])
+    return list_response(Pizza, pizza_filters)
+
+
+@bp.route('/pizzas/<int:pizza_id>/cheapest', methods=['GET'])
+@conditional('pizzas', 'restaurants', 'restaurant_pizzas')
+def get_cheapest_restaurants(pizza_id):
+    return cheapest_response(pizza_id)
 
 
 @bp.route('/restaurants/<int:restaurant_id>', methods=['DELETE'])
 def delete_restaurant(restaurant_id):
-    from .models import Restaurant
-    r = Restaurant.query.get(restaurant_id)
-    if not r:
-        return jsonify({'error': 'Restaurant not found'}), 404
-    data = r.to_dict()
-    db.session.delete(r)
-    db.session.commit()
-    return jsonify(data)
+    return _delete_response(Restaurant, RESTAURANT_DETAIL, restaurant_id, 'Restaurant not found')
 
 
 @bp.route('/restaurant_pizzas', methods=['POST'])
 def create_restaurant_pizza():
-    from .models import RestaurantPizza, Restaurant, Pizza
-    data = request.get_json() or {}
-    price = data.get('price')
-    restaurant_id = data.get('restaurant_id')
-    pizza_id = data.get('pizza_id')
-
-    errors = []
-    if price is None:
-        errors.append('price is required')
-    if restaurant_id is None:
-        errors.append('restaurant_id is required')
-    if pizza_id is None:
-        errors.append('pizza_id is required')
-    if errors:
-        return jsonify({'errors': errors}), 422
+    return _write_response(MENU_ITEMS)
 
-    restaurant = Restaurant.query.get(restaurant_id)
-    pizza = Pizza.query.get(pizza_id)
-    if not restaurant:
-        return jsonify({'errors': ['restaurant not found']}), 422
-    if not pizza:
-        return jsonify({'errors': ['pizza not found']}), 422
 
-    rp = RestaurantPizza(price=price, restaurant=restaurant, pizza=pizza)
-    db.session.add(rp)
-    try:
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'errors': [str(e)]}), 422
+@bp.route('/restaurant_pizzas', methods=['PUT'])
+def upsert_restaurant_pizza():
+    return _write_response(MENU_ITEMS, upsert=True)
+
 
-    return jsonify(rp.to_dict(include=('restaurant','pizza'), depth=1)), 201
+@bp.route('/restaurant_pizzas/bulk', methods=['POST'])
+def create_restaurant_pizzas_bulk():
+    return bulk_create(MENU_ITEMS)
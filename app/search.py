@@ -0,0 +1,188 @@
+"""Full-text search and indexed filters for the list endpoints.
+
+``guests``, ``pizzas`` and ``episodes`` each get an external-content FTS5
+table (``<table>_fts``) kept in sync by SQLite triggers, so ORM flushes and
+bulk DML are both covered. ``pizza_ingredients`` holds one normalized row
+per comma-separated ingredient, also trigger-maintained, which turns
+"pizzas containing basil" into a primary-key lookup. ``flask search
+rebuild`` repopulates all of it after a backfill.
+
+The ``*_filters`` functions turn query args into WHERE clauses for
+``pagination.list_response``; they raise ``ValueError`` on bad input.
+"""
+import re
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import column, event, select, table, text
+
+from . import db
+from .models import Appearance, Episode, EpisodeStats, Guest, GuestStats, Pizza, PizzaIngredient, parse_date
+
+# source table -> indexed columns
+FTS_TABLES = {
+    'guests': ('name', 'occupation'),
+    'pizzas': ('name', 'ingredients'),
+    'episodes': ('date', 'number'),
+}
+
+# splits NEW.ingredients on commas by rewriting it as a JSON array
+_SPLIT_INGREDIENTS = (
+    """json_each('["' || replace(replace(replace(coalesce(NEW.ingredients, ''), '\\', '\\\\'), '"', '\\"'), ',', '","') || '"]')"""
+)
+
+
+def _fts_row(source, ref):
+    columns = FTS_TABLES[source]
+    return ', '.join(columns), ', '.join(f'{ref}.{c}' for c in columns)
+
+
+def fts_ddl():
+    """CREATE statements for the FTS tables and the triggers syncing them."""
+    statements = []
+    for source in FTS_TABLES:
+        fts = f'{source}_fts'
+        names, new = _fts_row(source, 'NEW')
+        _, old = _fts_row(source, 'OLD')
+        insert = f'\n        INSERT INTO {fts} (rowid, {names}) VALUES (NEW.id, {new});'
+        remove = f"\n        INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', OLD.id, {old});"
+        statements += [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{source}', content_rowid='id')",
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {source} BEGIN{insert}\nEND',
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {source} BEGIN{remove}\nEND',
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE ON {source} BEGIN{remove}{insert}\nEND',
+        ]
+    # deletes go through the pizza_id foreign key's ON DELETE CASCADE
+    add_ingredients = f"""
+        INSERT OR IGNORE INTO pizza_ingredients (ingredient, pizza_id)
+        SELECT lower(trim(value)), NEW.id FROM {_SPLIT_INGREDIENTS} WHERE trim(value) != '';"""
+    statements += [
+        f'CREATE TRIGGER IF NOT EXISTS pizza_ingredients_insert AFTER INSERT ON pizzas BEGIN{add_ingredients}\nEND',
+        f'CREATE TRIGGER IF NOT EXISTS pizza_ingredients_update AFTER UPDATE OF ingredients ON pizzas BEGIN'
+        f'\n        DELETE FROM pizza_ingredients WHERE pizza_id = OLD.id;{add_ingredients}\nEND',
+    ]
+    return statements
+
+
+def rebuild(connection):
+    """Repopulate the FTS indexes and ``pizza_ingredients`` from the source tables."""
+    for source in FTS_TABLES:
+        connection.execute(text(f"INSERT INTO {source}_fts ({source}_fts) VALUES ('rebuild')"))
+    connection.execute(text('DELETE FROM pizza_ingredients'))
+    connection.execute(text(
+        'INSERT OR IGNORE INTO pizza_ingredients (ingredient, pizza_id) '
+        'SELECT lower(trim(value)), pizzas.id FROM pizzas, '
+        + _SPLIT_INGREDIENTS.replace('NEW.', 'pizzas.') + " WHERE trim(value) != ''"
+    ))
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_fts(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in fts_ddl():
+        connection.execute(text(statement))
+
+
+@event.listens_for(db.metadata, 'after_drop')
+def _drop_fts(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    for source in FTS_TABLES:
+        connection.execute(text(f'DROP TABLE IF EXISTS {source}_fts'))
+
+
+def fts_query(raw):
+    """A safe FTS5 query matching every word of ``raw`` as a prefix."""
+    words = re.findall(r'\w+', raw)
+    if not words:
+        raise ValueError('q must contain at least one word')
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def fts_ids(source, raw):
+    """Select of the ids in ``source`` whose FTS row matches ``raw``."""
+    fts = table(f'{source}_fts', column('rowid'), column(f'{source}_fts'))
+    return select(fts.c.rowid).where(fts.c[f'{source}_fts'].op('MATCH')(fts_query(raw)))
+
+
+def _float_arg(args, name):
+    raw = args.get(name)
+    if raw is None:
+        return None
+    try:
+        return float(raw)
+    except ValueError:
+        raise ValueError(f'{name} must be a number')
+
+
+def _date_arg(args, name):
+    raw = args.get(name)
+    if raw is None:
+        return None
+    try:
+        return parse_date(raw)
+    except ValueError:
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+
+
+def _min_average(model, stats_model, args):
+    minimum = _float_arg(args, 'min_rating')
+    if minimum is None:
+        return None
+    key = stats_model.__mapper__.primary_key[0]
+    return model.id.in_(select(key).where(stats_model.value_avg >= minimum))
+
+
+def guest_filters(args):
+    """``q`` (name/occupation), ``occupation`` (case-insensitive) and ``min_rating``."""
+    clauses = []
+    if args.get('q') is not None:
+        clauses.append(Guest.id.in_(fts_ids('guests', args['q'])))
+    if args.get('occupation') is not None:
+        clauses.append(Guest.occupation.collate('NOCASE') == args['occupation'])
+    clauses.append(_min_average(Guest, GuestStats, args))
+    return [c for c in clauses if c is not None]
+
+
+def pizza_filters(args):
+    """``q`` (name/ingredients) and ``ingredient`` (comma-separated, all must match)."""
+    clauses = []
+    if args.get('q') is not None:
+        clauses.append(Pizza.id.in_(fts_ids('pizzas', args['q'])))
+    if args.get('ingredient') is not None:
+        ingredients = {i.strip().lower() for i in args['ingredient'].split(',') if i.strip()}
+        if not ingredients:
+            raise ValueError('ingredient must not be empty')
+        for ingredient in sorted(ingredients):
+            clauses.append(Pizza.id.in_(
+                select(PizzaIngredient.pizza_id).where(PizzaIngredient.ingredient == ingredient)
+            ))
+    return clauses
+
+
+def episode_filters(args):
+    """``q`` (date/number, or the name/occupation of a guest), ``min_rating``
+    and the inclusive ``date_from``/``date_to`` range."""
+    clauses = []
+    if args.get('q') is not None:
+        by_guest = select(Appearance.episode_id).where(Appearance.guest_id.in_(fts_ids('guests', args['q'])))
+        clauses.append(Episode.id.in_(fts_ids('episodes', args['q'])) | Episode.id.in_(by_guest))
+    date_from, date_to = _date_arg(args, 'date_from'), _date_arg(args, 'date_to')
+    if date_from is not None:
+        clauses.append(Episode.date >= date_from)
+    if date_to is not None:
+        clauses.append(Episode.date <= date_to)
+    clauses.append(_min_average(Episode, EpisodeStats, args))
+    return [c for c in clauses if c is not None]
+
+
+search_cli = AppGroup('search', help='Full-text and ingredient index maintenance.')
+
+
+@search_cli.command('rebuild')
+def rebuild_command():
+    """Repopulate the FTS tables and the normalized ingredient index."""
+    with db.engine.begin() as connection:
+        rebuild(connection)
+    click.echo('Rebuilt ' + ', '.join(f'{source}_fts' for source in FTS_TABLES) + ', pizza_ingredients')
@@ -0,0 +1,89 @@
+"""Column-projected serializers for read-only endpoints.
+
+These select only a model's ``serializable_fields`` and map the row tuples
+straight to dicts, skipping ORM instance hydration and the identity map.
+Output matches the corresponding ``to_dict(depth=0)``.
+"""
+from sqlalchemy import select
+
+from .metrics import timed_serialization
+from .models import Appearance, Episode, Guest, Pizza, Restaurant, RestaurantPizza
+
+
+def projected_select(model, fields=None):
+    """Return a ``select()`` of the columns backing ``fields``."""
+    fields = fields or model.serializable_fields
+    return select(*(getattr(model, f) for f in fields))
+
+
+def row_serializer(model, fields=None):
+    """Return a callable mapping a projected row to a dict."""
+    fields = tuple(fields or model.serializable_fields)
+
+    def serialize(row):
+        return dict(zip(fields, row))
+
+    return serialize
+
+
+@timed_serialization
+def serialize_rows(serialize, rows):
+    """``[serialize(row) for row in rows]``, timed as serialization."""
+    return [serialize(row) for row in rows]
+
+
+class NestedShape:
+    """A parent, one child collection and the row each child points at.
+
+    Builds the ``to_dict()`` payload of e.g. an episode with its appearances
+    and their guests from a single joined, projected query.
+    """
+
+    def __init__(self, parent, collection, child, child_key, nested, related, related_key):
+        self.parent = parent
+        self.collection = collection
+        self.child = child
+        self.child_key = child_key
+        self.nested = nested
+        self.related = related
+        self.related_key = related_key
+
+    def select(self, parent_id):
+        """Rows of ``(*parent, *child, *related)`` fields, one per child, by child id."""
+        columns = [getattr(m, f) for m in (self.parent, self.child, self.related) for f in m.serializable_fields]
+        return (
+            select(*columns)
+            .select_from(self.parent)
+            .outerjoin(self.child, self.child_key == self.parent.id)
+            .outerjoin(self.related, self.related.id == self.related_key)
+            .where(self.parent.id == parent_id)
+            .order_by(self.child.id)
+        )
+
+    @timed_serialization
+    def assemble(self, rows):
+        """The payload for ``select()``'s rows, or None when the parent is missing."""
+        if not rows:
+            return None
+        parent_fields = self.parent.serializable_fields
+        child_fields = self.child.serializable_fields
+        split = len(parent_fields) + len(child_fields)
+        data = dict(zip(parent_fields, rows[0][:len(parent_fields)]))
+        items = []
+        for row in rows:
+            child_values = row[len(parent_fields):split]
+            if child_values[0] is None:
+                continue
+            item = dict(zip(child_fields, child_values))
+            item[self.nested] = dict(zip(self.related.serializable_fields, row[split:]))
+            items.append(item)
+        data[self.collection] = items
+        return data
+
+
+EPISODE_DETAIL = NestedShape(
+    Episode, 'appearances', Appearance, Appearance.episode_id, 'guest', Guest, Appearance.guest_id
+)
+RESTAURANT_DETAIL = NestedShape(
+    Restaurant, 'pizzas', RestaurantPizza, RestaurantPizza.restaurant_id, 'pizza', Pizza, RestaurantPizza.pizza_id
+)
@@ -0,0 +1,137 @@
+"""Keeping ``create_app()`` cheap, and measuring what it costs.
+
+Serving a request needs Flask, SQLAlchemy and the app's own modules;
+Flask-Migrate (and, through it, Alembic) only matters to ``flask db`` and
+to migration scripts, yet importing it is about a fifth of the app's
+import time. ``init_migrate`` therefore registers a stand-in that sets
+Flask-Migrate up the first time anything reads
+``app.extensions['migrate']`` or runs a ``flask db`` command.
+
+``create_app`` records how long the ``app`` package took to import and how
+long the factory ran in ``app.extensions['startup']``; ``/metrics``
+reports both. ``flask startup report`` (or ``python manage.py
+import-report``) starts a fresh interpreter under ``python -X importtime``
+and lists where the time went.
+"""
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+import click
+from flask.cli import AppGroup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# import time: <self us> | <cumulative us> | <indent><module>
+_IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)$')
+
+_PROBE = (
+    'import time; started = time.perf_counter(); from app import create_app; '
+    'imported = time.perf_counter(); create_app(); '
+    'print(imported - started, time.perf_counter() - imported)'
+)
+
+
+class _LazyMigrate:
+    """Stands in for Flask-Migrate's ``app.extensions['migrate']`` until first use."""
+
+    def __init__(self, app, db, directory):
+        self._app = app
+        self._db = db
+        self._directory = directory
+
+    def load(self):
+        from flask_migrate import Migrate
+        # init_app replaces this stand-in and the lazy ``db`` command
+        Migrate(self._app, self._db, directory=self._directory)
+        return self._app.extensions['migrate']
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+
+class LazyGroup(click.Group):
+    """A CLI group whose real implementation is imported when it is invoked."""
+
+    def __init__(self, name, load, **kwargs):
+        super().__init__(name, **kwargs)
+        self._load = load
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        return self._load().make_context(info_name, args, parent=parent, **extra)
+
+
+def init_migrate(app, db, directory='migrations'):
+    """Register Flask-Migrate on ``app`` without importing it yet."""
+    app.extensions['migrate'] = lazy = _LazyMigrate(app, db, directory)
+
+    def load():
+        lazy.load()
+        from flask_migrate.cli import db as db_cli
+        return db_cli
+
+    app.cli.add_command(LazyGroup('db', load, help='Perform database migrations.'))
+
+
+def import_report(top=15, python=None):
+    """Import and ``create_app`` timings of a fresh interpreter.
+
+    Returns ``import_seconds`` and ``create_app_seconds`` as the probe saw
+    them, the ``top`` top-level packages by total import time, and the
+    ``top`` single modules by their own import time, as ``(name, seconds)``.
+    The probe runs with this process's environment, so ``LATESHOW_CONFIG``
+    picks the profile being measured.
+    """
+    result = subprocess.run(
+        [python or sys.executable, '-X', 'importtime', '-c', _PROBE],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(f'startup probe failed:\n{result.stderr[-2000:]}')
+    import_seconds, create_app_seconds = map(float, result.stdout.split()[-2:])
+
+    packages = defaultdict(int)
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match is None:
+            continue
+        own, name = match.groups()
+        packages[name.split('.')[0]] += int(own)
+        modules.append((name, int(own)))
+
+    def ranked(items):
+        return [(name, us / 1e6) for name, us in sorted(items, key=lambda item: -item[1])[:top]]
+
+    return {
+        'import_seconds': import_seconds,
+        'create_app_seconds': create_app_seconds,
+        'packages': ranked(packages.items()),
+        'modules': ranked(modules),
+    }
+
+
+def format_report(report):
+    lines = [
+        f"import app:   {report['import_seconds'] * 1000:8.1f} ms",
+        f"create_app(): {report['create_app_seconds'] * 1000:8.1f} ms",
+        '',
+        'by package (self time of all its modules):',
+        *(f'  {seconds * 1000:8.1f} ms  {name}' for name, seconds in report['packages']),
+        '',
+        'slowest modules (self time):',
+        *(f'  {seconds * 1000:8.1f} ms  {name}' for name, seconds in report['modules']),
+    ]
+    return '\n'.join(lines)
+
+
+startup_cli = AppGroup('startup', help='Startup time measurement.')
+
+
+@startup_cli.command('report')
+@click.option('--top', default=15, show_default=True, help='Rows per table.')
+def report_command(top):
+    """Time a cold import and create_app() in a fresh interpreter."""
+    click.echo(format_report(import_report(top)))
@@ -0,0 +1,94 @@
+"""Incrementally maintained summary tables behind the ``/<x>/<id>/stats`` routes.
+
+Each summary keeps count/sum/min/max of a source column per parent id.
+SQLite triggers on the source table update it in the same statement as the
+write, so ORM flushes, bulk inserts and cascaded deletes all stay in sync
+without full scans. Only removing the current min/max re-reads the parent's
+remaining rows. ``flask stats rebuild`` recomputes everything for backfills.
+"""
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, text
+
+from . import db
+
+# (summary table, source table, key column, value column)
+SUMMARIES = (
+    ('episode_stats', 'appearances', 'episode_id', 'rating'),
+    ('guest_stats', 'appearances', 'guest_id', 'rating'),
+    ('restaurant_stats', 'restaurant_pizzas', 'restaurant_id', 'price'),
+)
+
+
+def _add_row(summary, key, value):
+    return f"""
+        INSERT INTO {summary} ({key}, row_count, value_sum, value_min, value_max)
+        VALUES (NEW.{key}, 1, NEW.{value}, NEW.{value}, NEW.{value})
+        ON CONFLICT({key}) DO UPDATE SET
+            row_count = row_count + 1,
+            value_sum = value_sum + excluded.value_sum,
+            value_min = min(value_min, excluded.value_min),
+            value_max = max(value_max, excluded.value_max);"""
+
+
+def _remove_row(summary, source, key, value):
+    # the old row is already gone, so a re-read only sees the survivors
+    return f"""
+        UPDATE {summary} SET
+            row_count = row_count - 1,
+            value_sum = value_sum - OLD.{value},
+            value_min = CASE WHEN OLD.{value} > value_min THEN value_min
+                ELSE (SELECT min({value}) FROM {source} WHERE {key} = OLD.{key}) END,
+            value_max = CASE WHEN OLD.{value} < value_max THEN value_max
+                ELSE (SELECT max({value}) FROM {source} WHERE {key} = OLD.{key}) END
+        WHERE {key} = OLD.{key};
+        DELETE FROM {summary} WHERE {key} = OLD.{key} AND row_count <= 0;"""
+
+
+def trigger_ddl():
+    """CREATE TRIGGER statements for every summary."""
+    statements = []
+    for summary, source, key, value in SUMMARIES:
+        statements.append(
+            f'CREATE TRIGGER IF NOT EXISTS {summary}_insert AFTER INSERT ON {source} '
+            f'BEGIN{_add_row(summary, key, value)}\nEND'
+        )
+        statements.append(
+            f'CREATE TRIGGER IF NOT EXISTS {summary}_delete AFTER DELETE ON {source} '
+            f'BEGIN{_remove_row(summary, source, key, value)}\nEND'
+        )
+        statements.append(
+            f'CREATE TRIGGER IF NOT EXISTS {summary}_update AFTER UPDATE OF {key}, {value} ON {source} '
+            f'BEGIN{_remove_row(summary, source, key, value)}{_add_row(summary, key, value)}\nEND'
+        )
+    return statements
+
+
+def rebuild(connection):
+    """Recompute every summary table from its source rows."""
+    for summary, source, key, value in SUMMARIES:
+        connection.execute(text(f'DELETE FROM {summary}'))
+        connection.execute(text(
+            f'INSERT INTO {summary} ({key}, row_count, value_sum, value_min, value_max) '
+            f'SELECT {key}, count(*), sum({value}), min({value}), max({value}) '
+            f'FROM {source} GROUP BY {key}'
+        ))
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_triggers(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in trigger_ddl():
+        connection.execute(text(statement))
+
+
+stats_cli = AppGroup('stats', help='Summary table maintenance.')
+
+
+@stats_cli.command('rebuild')
+def rebuild_command():
+    """Recompute the episode, guest and restaurant summaries."""
+    with db.engine.begin() as connection:
+        rebuild(connection)
+    click.echo('Rebuilt ' + ', '.join(summary for summary, *_ in SUMMARIES))
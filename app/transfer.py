@@ -0,0 +1,243 @@
+"""Offline export and import of the whole dataset: ``flask export`` / ``flask import``.
+
+An export is a directory holding one file per data table plus
+``manifest.json`` (format and row counts). Tables go in foreign-key order,
+so an import never needs deferred constraints:
+
+- ``ndjson`` (default): ``<table>.ndjson``, one JSON object per row
+- ``parquet``: ``<table>.parquet``, needs ``pyarrow``
+
+Both directions work in ``chunk_size`` rows at a time, so memory stays flat
+however big the tables are. Exports read every table in one explicit read
+transaction, which gives a consistent snapshot (in WAL mode writers carry
+on meanwhile), and stream each one with ``yield_per``
+(SQLite fetches incrementally). Imports insert each chunk with one
+executemany. Firing the stats, search and change-feed triggers for every
+row would make an import several times slower. So an import drops the
+triggers on the data tables, loads the rows, puts the triggers back and
+rebuilds the summary and search tables with one set-based pass each, all
+in one transaction. The change feed is truncated afterwards, as after
+``seed.py``. The rows bypass the session, so the import bumps the data
+tables' versions itself and drops their response cache namespaces once it
+has committed; ETags and cached detail pages from before it no longer
+match.
+"""
+import json
+import os
+import time
+from datetime import date, datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import Date, DateTime, Float, Integer, bindparam, delete, func, insert, select, text
+
+from . import db, search, stats
+from .cache import DEPENDENCIES
+from .changelog import latest, truncate
+from .versioning import bump_versions
+
+# foreign-key order: parents before the rows that reference them
+TABLES = ('episodes', 'guests', 'appearances', 'restaurants', 'pizzas', 'restaurant_pizzas')
+FORMATS = ('ndjson', 'parquet')
+MANIFEST = 'manifest.json'
+
+
+def _log_rate(log, table, count, elapsed):
+    log(f'{table:>18}: {count:>9} rows in {elapsed:6.1f}s ({count / max(elapsed, 1e-9):,.0f} rows/s)')
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError('the parquet format needs pyarrow (pip install pyarrow)')
+    return pyarrow
+
+
+def _arrow_schema(pa, table):
+    types = {Integer: pa.int64(), Float: pa.float64(), Date: pa.date32(), DateTime: pa.timestamp('us')}
+
+    def arrow_type(column):
+        for sql_type, arrow in types.items():
+            if isinstance(column.type, sql_type):
+                return arrow
+        return pa.string()
+
+    return pa.schema([pa.field(c.name, arrow_type(c), nullable=c.nullable) for c in table.columns])
+
+
+def _write_ndjson(path, keys, partitions):
+    dumps = current_app.json.dumps_bytes
+    count = 0
+    with open(path, 'wb') as f:
+        for rows in partitions:
+            f.write(b''.join(dumps(dict(zip(keys, row))) + b'\n' for row in rows))
+            count += len(rows)
+    return count
+
+
+def _write_parquet(path, table, partitions):
+    pa = _pyarrow()
+    schema = _arrow_schema(pa, table)
+    count = 0
+    with pa.parquet.ParquetWriter(path, schema) as writer:
+        for rows in partitions:
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)], schema=schema
+            ))
+            count += len(rows)
+    return count
+
+
+def export_dataset(directory, fmt='ndjson', chunk_size=10000, log=print):
+    """Write every data table to ``directory``; needs an app context. Returns the row counts."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    if fmt == 'parquet':
+        _pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    counts = {}
+    with db.engine.connect() as connection, connection.begin():
+        # pysqlite only sends BEGIN before DML; without one each SELECT
+        # would read its own snapshot and a concurrent write could leave
+        # rows pointing at parents the dump does not have
+        connection.exec_driver_sql('BEGIN')
+        for name in TABLES:
+            table = db.metadata.tables[name]
+            started = time.perf_counter()
+            stmt = select(table).order_by(*table.primary_key)
+            result = connection.execution_options(yield_per=chunk_size).execute(stmt)
+            path = os.path.join(directory, f'{name}.{fmt}')
+            if fmt == 'ndjson':
+                counts[name] = _write_ndjson(path, list(result.keys()), result.partitions())
+            else:
+                counts[name] = _write_parquet(path, table, result.partitions())
+            _log_rate(log, name, counts[name], time.perf_counter() - started)
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump({'format': fmt, 'tables': counts}, f, indent=2)
+    return counts
+
+
+def _read_ndjson(path, table, chunk_size):
+    loads = current_app.json.loads
+    # JSON has no date type; the Core insert wants date/datetime objects back
+    parsers = {c.name: date.fromisoformat for c in table.columns if isinstance(c.type, Date)}
+    parsers.update({c.name: datetime.fromisoformat for c in table.columns if isinstance(c.type, DateTime)})
+    chunk = []
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = loads(line)
+            for name, parse in parsers.items():
+                if row.get(name) is not None:
+                    row[name] = parse(row[name])
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def _read_parquet(path, chunk_size):
+    pa = _pyarrow()
+    for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pylist()
+
+
+def _drop_triggers(connection):
+    """Drop the triggers on the data tables; returns their DDL for putting them back."""
+    stmt = text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN :tables")
+    triggers = connection.execute(stmt.bindparams(bindparam('tables', expanding=True)), {'tables': TABLES}).all()
+    for name, _ in triggers:
+        connection.execute(text(f'DROP TRIGGER {name}'))
+    return [sql for _, sql in triggers]
+
+
+def import_dataset(directory, chunk_size=10000, replace=False, log=print):
+    """Load an export from ``directory``; needs an app context. Returns the row counts.
+
+    The data tables must be empty unless ``replace`` is set, which deletes
+    their rows first. Everything happens in one transaction.
+    """
+    manifest_path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f'{directory} has no {MANIFEST}; is it an export?')
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    fmt = manifest.get('format')
+    if fmt not in FORMATS:
+        raise ValueError(f'unknown export format: {fmt!r}')
+    if fmt == 'parquet':
+        _pyarrow()
+    tables = [db.metadata.tables[name] for name in TABLES]
+    counts = {}
+    with db.engine.begin() as connection:
+        # pysqlite only opens a transaction before DML, and the DROP TRIGGERs
+        # must be rolled back too if the import fails
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+        triggers = _drop_triggers(connection)
+        if replace:
+            for table in reversed(tables):
+                connection.execute(delete(table))
+        else:
+            filled = [t.name for t in tables if connection.scalar(select(func.count()).select_from(t))]
+            if filled:
+                raise ValueError(f"tables already hold data: {', '.join(filled)}; import with --replace")
+        for table in tables:
+            path = os.path.join(directory, f'{table.name}.{fmt}')
+            started = time.perf_counter()
+            count = 0
+            chunks = _read_ndjson(path, table, chunk_size) if fmt == 'ndjson' else _read_parquet(path, chunk_size)
+            for chunk in chunks:
+                connection.execute(insert(table), chunk)
+                count += len(chunk)
+            expected = manifest['tables'].get(table.name)
+            if expected is not None and expected != count:
+                raise ValueError(f'{table.name}: read {count} rows, the manifest lists {expected}')
+            counts[table.name] = count
+            _log_rate(log, table.name, count, time.perf_counter() - started)
+        for statement in triggers:
+            connection.execute(text(statement))
+        stats.rebuild(connection)
+        search.rebuild(connection)
+        bump_versions(connection, TABLES)
+        # the imported rows are a new history; earlier feeds must resync
+        truncate(connection, latest(connection))
+    cache = current_app.extensions.get('response_cache')
+    if cache is not None:
+        cache.invalidate(namespaces={DEPENDENCIES[name][0] for name in TABLES})
+    return counts
+
+
+@click.command('export')
+@click.argument('directory', type=click.Path(file_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default='ndjson', show_default=True)
+@click.option('--chunk-size', type=int, default=10000, show_default=True, help='Rows fetched and written at a time.')
+@with_appcontext
+def export_command(directory, fmt, chunk_size):
+    """Export every data table to DIRECTORY."""
+    started = time.perf_counter()
+    try:
+        counts = export_dataset(directory, fmt, chunk_size, log=click.echo)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    _log_rate(click.echo, 'total', sum(counts.values()), time.perf_counter() - started)
+
+
+@click.command('import')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--chunk-size', type=int, default=10000, show_default=True, help='Rows inserted per statement.')
+@click.option('--replace', is_flag=True, help='Delete the existing rows first.')
+@with_appcontext
+def import_command(directory, chunk_size, replace):
+    """Import an export from DIRECTORY."""
+    started = time.perf_counter()
+    try:
+        counts = import_dataset(directory, chunk_size, replace, log=click.echo)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    _log_rate(click.echo, 'total', sum(counts.values()), time.perf_counter() - started)
@@ -0,0 +1,144 @@
+"""Declarative request-body schemas, shared by every write path.
+
+A ``Schema`` names its fields (``Int``, ``Str``) and compiles them, the way
+``dataclasses`` builds ``__init__``, into the source of one function that
+reads each field once and returns ``(values, errors)``: the clean column
+values and every 422 message for the body, all at once. Well-typed input
+passes an inline check with no per-field call. Anything else goes through
+the field's ``coerce``, which converts numeric strings and integral floats
+and words the error for the rest.
+
+The single-row, bulk, queued and async write routes all validate through
+``WriteTarget.validate``, and then insert with Core statements, so a row is
+checked once. The models' ``@validates`` hooks call ``Schema.check`` with
+the same fields, which keeps ORM writes (seeding, the shell) to the same
+rules.
+"""
+
+
+class Int:
+    """An integer, optionally bounded by ``low`` and ``high`` (inclusive)."""
+
+    def __init__(self, low=None, high=None):
+        self.low = low
+        self.high = high
+
+    def fast_check(self, var):
+        """A Python expression true when ``var`` is valid as is."""
+        bounds = [f'{var}.__class__ is int']
+        if self.low is not None:
+            bounds.append(f'{var} >= {self.low!r}')
+        if self.high is not None:
+            bounds.append(f'{var} <= {self.high!r}')
+        return ' and '.join(bounds)
+
+    def coerce(self, name, value):
+        """``value`` as an int; raises ``ValueError`` with the 422 message.
+
+        Numeric strings and integral floats (``4.0``) are converted; bools
+        and floats with a fraction, infinity or NaN are not integers.
+        """
+        if value is None:
+            raise ValueError(f'{name} is required')
+        if value.__class__ is bool or (value.__class__ is float and not value.is_integer()):
+            raise ValueError(f'{name} must be an integer')
+        try:
+            value = int(value)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f'{name} must be an integer')
+        low, high = self.low, self.high
+        if (low is not None and value < low) or (high is not None and value > high):
+            if high is None:
+                raise ValueError(f'{name} must be at least {low}')
+            if low is None:
+                raise ValueError(f'{name} must be at most {high}')
+            raise ValueError(f'{name} must be between {low} and {high}')
+        return value
+
+
+class Str:
+    """A string that is not blank, optionally at most ``max_length`` long."""
+
+    def __init__(self, max_length=None):
+        self.max_length = max_length
+
+    def fast_check(self, var):
+        check = f'{var}.__class__ is str and {var} and not {var}.isspace()'
+        if self.max_length is not None:
+            check += f' and len({var}) <= {self.max_length!r}'
+        return check
+
+    def coerce(self, name, value):
+        if value is None:
+            raise ValueError(f'{name} is required')
+        if not isinstance(value, str):
+            raise ValueError(f'{name} must be a string')
+        if not value.strip():
+            raise ValueError(f'{name} must not be blank')
+        if self.max_length is not None and len(value) > self.max_length:
+            raise ValueError(f'{name} must be at most {self.max_length} characters')
+        return value
+
+
+class Schema:
+    """The fields of one request body; calling it validates a decoded body.
+
+    ``Schema('appearance', rating=Int(1, 5), ...)`` returns
+    ``({'rating': ..., ...}, errors)`` for a dict, with ``None`` for each
+    field that failed, and ``(None, ['appearance must be an object'])`` for
+    anything else.
+    """
+
+    def __init__(self, name, /, **fields):
+        self.name = name
+        self.fields = fields
+        self.validate = self._compile()
+
+    def __call__(self, data):
+        return self.validate(data)
+
+    def __repr__(self):
+        return f'<Schema {self.name} ({", ".join(self.fields)})>'
+
+    def _compile(self):
+        namespace = {'not_object': f'{self.name} must be an object'}
+        lines = [
+            'def validate(data):',
+            '    if data.__class__ is not dict and not isinstance(data, dict):',
+            '        return None, [not_object]',
+            '    errors = []',
+            '    get = data.get',
+        ]
+        for i, (name, field) in enumerate(self.fields.items()):
+            namespace[f'coerce_{i}'] = field.coerce
+            lines += [
+                f'    v{i} = get({name!r})',
+                f'    if not ({field.fast_check(f"v{i}")}):',
+                '        try:',
+                f'            v{i} = coerce_{i}({name!r}, v{i})',
+                '        except ValueError as e:',
+                '            errors.append(e.args[0])',
+                f'            v{i} = None',
+            ]
+        values = ', '.join(f'{name!r}: v{i}' for i, name in enumerate(self.fields))
+        lines.append(f'    return {{{values}}}, errors')
+        exec('\n'.join(lines), namespace)
+        validate = namespace['validate']
+        validate.__qualname__ = f'Schema({self.name!r}).validate'
+        return validate
+
+    def check(self, name, value):
+        """One field's clean value, for ``@validates`` hooks; raises ``ValueError``."""
+        return self.fields[name].coerce(name, value)
+
+
+# SQLite rowids are signed 64-bit; a larger int overflows when it is bound
+MAX_ID = 2 ** 63 - 1
+
+APPEARANCE = Schema('appearance', rating=Int(1, 5), episode_id=Int(1, MAX_ID), guest_id=Int(1, MAX_ID))
+RESTAURANT_PIZZA = Schema(
+    'restaurant_pizza', price=Int(1, 1000), restaurant_id=Int(1, MAX_ID), pizza_id=Int(1, MAX_ID)
+)
+RESTAURANT = Schema('restaurant', name=Str(max_length=80), capacity=Int(low=0))
+PIZZA = Schema('pizza', name=Str(max_length=80), ingredients=Str())
+
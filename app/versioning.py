@@ -0,0 +1,126 @@
+"""Per-table version counters and the ETags derived from them.
+
+Every flush (and every bulk DML statement) bumps ``table_versions`` for the
+tables it writes, inside the same transaction. GET routes declare the tables
+their payload is built from; their ETag is a hash of those counters plus the
+request, so ``If-None-Match`` can be answered with one primary-key lookup and
+no ORM loading or serialization.
+"""
+import hashlib
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert
+
+from . import db
+from .compression import ENCODINGS
+from .models import TableVersion
+
+
+def _cascaded(table_names):
+    """``table_names`` plus every table reached through ON DELETE CASCADE."""
+    tables = db.metadata.tables
+    seen = set(table_names)
+    pending = list(seen)
+    while pending:
+        name = pending.pop()
+        for table in tables.values():
+            if table.name in seen:
+                continue
+            if any(fk.ondelete == 'CASCADE' and fk.column.table.name == name for fk in table.foreign_keys):
+                seen.add(table.name)
+                pending.append(table.name)
+    return seen
+
+
+def bump_versions(connection, tables):
+    """Bump the counters of ``tables`` on ``connection``, for writes made outside the session."""
+    tables = sorted(t for t in tables if t != TableVersion.__tablename__)
+    if not tables:
+        return
+    stmt = insert(TableVersion.__table__).values([{'name': t, 'version': 1} for t in tables])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['name'], set_={'version': TableVersion.__table__.c.version + 1}
+    )
+    connection.execute(stmt)
+
+
+def _bump(session, tables):
+    bump_versions(session.connection(), tables)
+
+
+def _bump_flushed(session, flush_context):
+    written = {obj.__table__.name for obj in (*session.new, *session.dirty) if hasattr(obj, '__table__')}
+    deleted = {obj.__table__.name for obj in session.deleted if hasattr(obj, '__table__')}
+    _bump(session, written | _cascaded(deleted))
+
+
+def _bump_bulk(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    tables = {mapper.local_table.name}
+    if orm_execute_state.is_delete:
+        tables = _cascaded(tables)
+    _bump(orm_execute_state.session, tables)
+
+
+def track_versions(target):
+    """Bump version counters for writes made through ``target`` sessions."""
+    event.listen(target, 'after_flush', _bump_flushed)
+    event.listen(target, 'do_orm_execute', _bump_bulk)
+
+
+track_versions(db.session)
+
+
+def table_versions(tables):
+    rows = db.session.execute(
+        select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(tables))
+    )
+    versions = dict(rows.all())
+    return tuple(versions.get(t, 0) for t in tables)
+
+
+def compute_etag(tables, **view_args):
+    versions = table_versions(tables) if tables else ()
+    key = '|'.join([
+        request.endpoint,
+        repr(sorted(view_args.items())),
+        request.query_string.decode(),
+        repr(versions),
+    ])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def request_etag():
+    """The ETag ``@conditional`` computed for the current request, or None."""
+    return request.environ.get('lateshow.etag')
+
+
+def conditional(*tables):
+    """Tag a GET view with a strong ETag derived from ``tables``' versions.
+
+    A matching ``If-None-Match`` (including the ``-<encoding>`` variants
+    that compressed responses carry) short-circuits to 304 before the view
+    runs.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            etag = compute_etag(tables, **kwargs)
+            request.environ['lateshow.etag'] = etag
+            for candidate in (etag, *(f'{etag}-{encoding}' for encoding in ENCODINGS)):
+                if request.if_none_match.contains(candidate):
+                    resp = current_app.response_class(status=304)
+                    resp.set_etag(candidate)
+                    return resp
+            resp = current_app.make_response(view(**kwargs))
+            if resp.status_code == 200:
+                resp.set_etag(etag)
+            return resp
+        return wrapper
+    return decorator
@@ -0,0 +1,245 @@
+"""Group commit for single-row writes: accept now, commit in batches.
+
+Each inline ``POST``/``PUT`` of ``/appearances`` or ``/restaurant_pizzas``
+commits on its own, and a commit is the expensive part of a small write.
+With ``WRITE_QUEUE`` set, validated writes instead go onto an in-process
+queue and the request gets ``202 Accepted`` with a ``/writes/<id>``
+handle. One writer thread takes up to ``WRITE_QUEUE_MAX_ROWS`` writes, or
+whatever arrived within ``WRITE_QUEUE_MAX_DELAY_MS`` of the first, runs
+them in one transaction and commits once. A row the database rejects
+fails alone: SQLite rolls back just that statement, and its status carries
+the usual 422 messages.
+
+``WRITE_QUEUE = 'prefer'`` queues only requests sending ``Prefer:
+respond-async``; ``'always'`` queues every one. Durability:
+
+- ``WRITE_QUEUE_ACK = 'queued'`` answers as soon as the write is queued;
+  writes still queued when the process dies are lost.
+- ``WRITE_QUEUE_ACK = 'committed'`` holds the request until its batch has
+  committed (up to ``WRITE_QUEUE_TIMEOUT`` seconds, then 202) and answers
+  201/200/422, still sharing the commit with the rest of the batch.
+- ``WRITE_QUEUE_SYNCHRONOUS`` sets ``PRAGMA synchronous`` for the batches
+  (e.g. ``FULL`` to fsync every group commit) without changing it for the
+  other connections.
+
+Statuses are kept in memory, per process, for the last
+``WRITE_QUEUE_STATUS_LIMIT`` finished writes.
+"""
+import atexit
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from flask import jsonify, request
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from .writes import violation
+
+MODES = (None, 'prefer', 'always')
+ACKS = ('queued', 'committed')
+
+_STOP = object()
+
+
+class QueuedWrite:
+    """One queued row and, once its batch ran, what became of it."""
+
+    __slots__ = ('id', 'target', 'values', 'upsert', 'status', 'row_id', 'errors', 'done')
+
+    def __init__(self, target, values, upsert):
+        self.id = uuid.uuid4().hex
+        self.target = target
+        self.values = values
+        self.upsert = upsert
+        self.status = 'queued'
+        self.row_id = None
+        self.errors = None
+        self.done = threading.Event()
+
+    @property
+    def status_code(self):
+        """The code the inline route would have answered with."""
+        if self.status == 'failed':
+            return 422
+        return 200 if self.upsert else 201
+
+    def to_dict(self):
+        data = {'id': self.id, 'status': self.status}
+        if self.status == 'committed':
+            data['row_id'] = self.row_id
+        elif self.status == 'failed':
+            data['errors'] = self.errors
+        return data
+
+
+def _restore_synchronous(dbapi_connection, connection_record):
+    value = connection_record.info.pop('restore_synchronous', None)
+    if value is not None:
+        dbapi_connection.execute(f'PRAGMA synchronous={value}')
+
+
+class WriteQueue:
+    """The queue, its writer thread and the status of recent writes."""
+
+    def __init__(self, app, max_rows=500, max_delay=0.01, maxsize=10000, synchronous=None, status_limit=10000):
+        self.app = app
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.synchronous = synchronous
+        self.status_limit = status_limit
+        self._queue = queue.Queue(maxsize)
+        self._statuses = OrderedDict()
+        self._finished = deque()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, target, values, upsert=False):
+        """Queue a validated row; raises ``queue.Full`` when the queue is at capacity."""
+        item = QueuedWrite(target, values, upsert)
+        with self._lock:
+            self._start()
+            self._statuses[item.id] = item
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                del self._statuses[item.id]
+            raise
+        return item
+
+    def get(self, write_id):
+        with self._lock:
+            return self._statuses.get(write_id)
+
+    def flush(self):
+        """Wait until everything queued so far has been committed or failed."""
+        self._queue.join()
+
+    def close(self):
+        """Commit what is queued and stop the writer."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_rows:
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._commit(batch)
+            finally:
+                self._finish(batch)
+
+    def _commit(self, batch):
+        """Run ``batch`` in one transaction; rejected rows fail without aborting it."""
+        with self.app.app_context():
+            session = db.session
+            try:
+                if self.synchronous:
+                    connection = session.connection()
+                    previous = connection.exec_driver_sql('PRAGMA synchronous').scalar()
+                    connection.exec_driver_sql(f'PRAGMA synchronous={self.synchronous}')
+                    connection.connection.info['restore_synchronous'] = previous
+                for item in batch:
+                    stmt = item.target.upsert(item.values) if item.upsert else item.target.insert(item.values)
+                    try:
+                        item.row_id = session.scalar(stmt)
+                    except IntegrityError as e:
+                        found = None
+                        if violation(e) == 'foreign_key':
+                            found = session.execute(item.target.reference_check(item.values)).one()
+                        item.status, item.errors = 'failed', item.target.errors(e, found)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                self.app.logger.exception('write queue batch of %d failed', len(batch))
+                for item in batch:
+                    item.status, item.errors = 'failed', [f'batch failed: {e}']
+                return
+        for item in batch:
+            if item.status == 'queued':
+                item.status = 'committed'
+
+    def _finish(self, batch):
+        with self._lock:
+            for item in batch:
+                self._finished.append(item.id)
+            while len(self._finished) > self.status_limit:
+                self._statuses.pop(self._finished.popleft(), None)
+        for item in batch:
+            item.done.set()
+            self._queue.task_done()
+
+
+def wants_queue(queue_mode):
+    """Whether the current request should go through the write queue."""
+    if queue_mode == 'always':
+        return True
+    return queue_mode == 'prefer' and 'respond-async' in request.headers.get('Prefer', '')
+
+
+def queued_response(write_queue, target, values, upsert, ack='queued', timeout=5):
+    """Queue a validated row and answer 202 (or, with ``ack='committed'``, its outcome)."""
+    try:
+        item = write_queue.submit(target, values, upsert)
+    except queue.Full:
+        response = jsonify({'error': 'write queue is full'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    if ack == 'committed' and item.done.wait(timeout):
+        return jsonify(item.to_dict()), item.status_code
+    response = jsonify(item.to_dict())
+    response.headers['Location'] = f'/writes/{item.id}'
+    return response, 202
+
+
+def init_write_queue(app):
+    """Set up the write queue when ``WRITE_QUEUE`` asks for one; the writer starts on first use."""
+    mode = app.config.get('WRITE_QUEUE')
+    if mode not in MODES:
+        raise ValueError(f'unknown WRITE_QUEUE: {mode!r}')
+    if app.config.get('WRITE_QUEUE_ACK', 'queued') not in ACKS:
+        raise ValueError(f"unknown WRITE_QUEUE_ACK: {app.config['WRITE_QUEUE_ACK']!r}")
+    if mode is None:
+        return None
+    write_queue = WriteQueue(
+        app,
+        max_rows=app.config.get('WRITE_QUEUE_MAX_ROWS', 500),
+        max_delay=app.config.get('WRITE_QUEUE_MAX_DELAY_MS', 10) / 1000,
+        maxsize=app.config.get('WRITE_QUEUE_MAXSIZE', 10000),
+        synchronous=app.config.get('WRITE_QUEUE_SYNCHRONOUS'),
+        status_limit=app.config.get('WRITE_QUEUE_STATUS_LIMIT', 10000),
+    )
+    if write_queue.synchronous:
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'checkin', _restore_synchronous)
+    app.extensions['write_queue'] = write_queue
+    return write_queue
@@ -0,0 +1,104 @@
+"""Single-row writes that leave integrity checks to the database.
+
+``POST`` inserts the row with one INSERT and ``PUT`` upserts it with
+``INSERT ... ON CONFLICT DO UPDATE``; neither looks the referenced rows up
+first, which saves the round trips and closes the race between a check and
+the insert. The foreign keys and unique indexes reject bad rows, and
+``WriteTarget.errors`` turns the ``IntegrityError`` into the usual 422
+messages. Only when a foreign key failed is the database asked which
+reference is missing.
+"""
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+
+from .models import Appearance, Episode, Guest, Pizza, Restaurant, RestaurantPizza
+from .validation import APPEARANCE, RESTAURANT_PIZZA
+
+# IntegrityError kind -> marker in the driver's message
+VIOLATIONS = (('unique', 'UNIQUE'), ('foreign_key', 'FOREIGN KEY'), ('check', 'CHECK'))
+
+
+def violation(error):
+    """``'unique'``, ``'foreign_key'``, ``'check'`` or None for an ``IntegrityError``."""
+    message = str(error.orig).upper()
+    for kind, marker in VIOLATIONS:
+        if marker in message:
+            return kind
+    return None
+
+
+class WriteTarget:
+    """How a child table is written: validation, references and its unique pair.
+
+    ``references`` maps each foreign-key column to ``(model, not-found
+    message)``; ``key`` is the uniquely indexed column pair that ``PUT``
+    upserts on, and ``update`` the columns an upsert overwrites.
+    """
+
+    def __init__(self, model, validate, references, key, update, duplicate, include):
+        self.model = model
+        self.validate = validate
+        self.references = references
+        self.key = key
+        self.update = update
+        self.duplicate = duplicate
+        self.include = include
+
+    def insert(self, values):
+        """``INSERT`` of ``values``, returning the row id."""
+        stmt = insert(self.model).values(**values).returning(self.model.id)
+        # lets app.cache drop just the parent entry this row is embedded in
+        return stmt.execution_options(row_values=values)
+
+    def upsert(self, values):
+        """``INSERT ... ON CONFLICT (key) DO UPDATE`` of ``values``, returning the row id."""
+        stmt = insert(self.model).values(**values)
+        return stmt.on_conflict_do_update(
+            index_elements=list(self.key), set_={c: stmt.excluded[c] for c in self.update}
+        ).returning(self.model.id).execution_options(row_values=values)
+
+    def detail(self, obj_id):
+        """Select of the written row with its ``include`` relationships joined in."""
+        return (
+            select(self.model)
+            .options(*self.model.loader_options(include=self.include))
+            .where(self.model.id == obj_id)
+            .execution_options(populate_existing=True)
+        )
+
+    def reference_check(self, values):
+        """One-row select of whether each referenced row exists, in ``references`` order."""
+        return select(*(
+            select(model.id).where(model.id == values[column]).exists()
+            for column, (model, _) in self.references.items()
+        ))
+
+    def errors(self, error, found=None):
+        """422 messages for ``error``; ``found`` is the ``reference_check`` row."""
+        kind = violation(error)
+        if kind == 'unique':
+            return [self.duplicate]
+        if kind == 'foreign_key' and found is not None:
+            missing = [message for (_, message), ok in zip(self.references.values(), found) if not ok]
+            if missing:
+                return missing
+        return [str(error.orig)]
+
+
+APPEARANCES = WriteTarget(
+    Appearance, APPEARANCE.validate,
+    references={'episode_id': (Episode, 'episode not found'), 'guest_id': (Guest, 'guest not found')},
+    key=('episode_id', 'guest_id'),
+    update=('rating',),
+    duplicate='guest already appears in this episode',
+    include=('guest', 'episode'),
+)
+
+MENU_ITEMS = WriteTarget(
+    RestaurantPizza, RESTAURANT_PIZZA.validate,
+    references={'restaurant_id': (Restaurant, 'restaurant not found'), 'pizza_id': (Pizza, 'pizza not found')},
+    key=('restaurant_id', 'pizza_id'),
+    update=('price',),
+    duplicate='restaurant already serves this pizza',
+    include=('pizza', 'restaurant'),
+)
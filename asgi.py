@@ -0,0 +1,5 @@
+from app.aio import create_async_app
+
+
+# ASGI entrypoint: hypercorn asgi:app
+app = create_async_app()
@@ -0,0 +1,101 @@
+"""Compare JSON encoders and compression on the nested detail payloads.
+
+Builds one episode with ``appearances`` guests and one restaurant with
+``appearances`` menu items, then times encoding ``Episode.to_dict()`` and
+``Restaurant.to_dict()`` with Flask's stock provider (sorted keys, and
+indented as in debug mode) and with each installed ``JSON_BACKEND``. It
+also times splicing a pre-encoded body as a ``Fragment`` against decoding
+and re-encoding it, and reports the byte sizes raw, gzipped and (when
+brotli is installed) brotli-compressed.
+
+Usage: python benchmarks/bench_json.py [appearances] [repeat]
+"""
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.compression import available_encodings, compress  # noqa: E402
+from app.json_provider import BACKENDS, Fragment, JSONProvider  # noqa: E402
+from app.models import Appearance, Episode, Guest, Pizza, Restaurant, RestaurantPizza  # noqa: E402
+from seed import FIRST_EPISODE  # noqa: E402
+
+
+def _installed():
+    for backend in BACKENDS:
+        try:
+            __import__(backend)
+        except ImportError:
+            if backend != 'stdlib':
+                continue
+        yield backend
+
+
+def encoders(app):
+    """``(name, encode)`` pairs, Flask's stock provider first."""
+    stock = DefaultJSONProvider(app)
+    yield 'flask default', lambda obj: json.dumps(obj, default=stock.default, sort_keys=True).encode()
+    yield 'flask pretty', lambda obj: json.dumps(obj, default=stock.default, sort_keys=True, indent=2).encode()
+    for backend in _installed():
+        yield backend, JSONProvider(app, backend=backend).dumps_bytes
+
+
+def payloads(rows):
+    db.session.add(Episode(id=1, date=FIRST_EPISODE, number=1))
+    db.session.add(Restaurant(id=1, name='Downtown Pizza', capacity=80))
+    db.session.execute(insert(Guest), [{'id': i, 'name': f'Guest {i}', 'occupation': 'actor'} for i in range(1, rows + 1)])
+    db.session.execute(insert(Pizza), [
+        {'id': i, 'name': f'Pizza {i}', 'ingredients': 'tomato,mozzarella,basil'} for i in range(1, rows + 1)
+    ])
+    db.session.execute(insert(Appearance), [
+        {'episode_id': 1, 'guest_id': i, 'rating': 1 + i % 5} for i in range(1, rows + 1)
+    ])
+    db.session.execute(insert(RestaurantPizza), [
+        {'restaurant_id': 1, 'pizza_id': i, 'price': 1 + i % 30} for i in range(1, rows + 1)
+    ])
+    db.session.commit()
+    episode = db.session.get(Episode, 1, options=Episode.loader_options())
+    restaurant = db.session.get(Restaurant, 1, options=Restaurant.loader_options())
+    return {'Episode.to_dict()': episode.to_dict(), 'Restaurant.to_dict()': restaurant.to_dict()}
+
+
+def _time(fn, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main(rows=2000, repeat=20):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp}/bench.db'})
+        with app.app_context():
+            db.create_all()
+            data = payloads(rows)
+            level = app.config['COMPRESS_LEVEL']
+
+            for label, obj in data.items():
+                print(f'{label} with {rows} nested rows')
+                results = {}
+                for name, encode in encoders(app):
+                    results[name] = _time(lambda: encode(obj), repeat)
+                    body = encode(obj)
+                    sizes = '  '.join(f'{enc} {len(compress(body, enc, level)):>8} B' for enc in available_encodings())
+                    print(f'{name:>14}: {results[name] * 1000:8.2f} ms  raw {len(body):>8} B  {sizes}')
+                fastest = min(results, key=results.get)
+                print(f'{"speedup":>14}: {results["flask default"] / results[fastest]:.1f}x ({fastest})')
+
+                provider = app.json
+                body = provider.dumps_bytes(obj)
+                spliced = _time(lambda: provider.dumps_bytes({'items': [Fragment(body)] * 10}), repeat)
+                reencoded = _time(lambda: provider.dumps_bytes({'items': [provider.loads(body)] * 10}), repeat)
+                print(f'{"fragment":>14}: {spliced * 1000:8.2f} ms vs {reencoded * 1000:.2f} ms decoding and '
+                      f're-encoding 10 cached bodies ({reencoded / spliced:.1f}x)\n')
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
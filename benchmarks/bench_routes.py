@@ -0,0 +1,295 @@
+"""Benchmark every API route through the Flask test client on a generated dataset.
+
+The dataset comes from ``seed.generate`` and is cached under
+``benchmarks/.data`` keyed by its sizes and seed, so repeated runs (and runs
+on other commits) start from identical data. Each route is called
+``--requests`` times after a warm-up; the report has throughput, p50/p99
+latency and SQL statements per request. Results are written to
+``benchmarks/results/<commit>.json`` and ``--compare`` prints the change
+against an earlier results file.
+
+Usage:
+    python benchmarks/bench_routes.py --episodes 5000 --guests 20000 --appearances 100k
+    python benchmarks/bench_routes.py --compare benchmarks/results/<older commit>.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import event, insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.changelog import horizon  # noqa: E402
+from app.models import Guest, Pizza  # noqa: E402
+from seed import count, generate  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, '.data')
+RESULTS_DIR = os.path.join(HERE, 'results')
+
+
+def scenarios(sizes, fresh_guest, fresh_pizza, write_id, since):
+    """``(name, rule, request factory)`` per benchmarked call.
+
+    ``factory(i)`` gives ``(method, path, json)``, or ``(method, path, json,
+    headers)``. ``write_id`` is a queued write for the status route and
+    ``since`` the change feed's horizon, so feed reads catch up on the setup.
+
+    Writes use ids nothing else touches: appearances and menu rows pair
+    existing parents with guests/pizzas created just for the run (the
+    upserts then update the pairs the creates made), and each delete removes
+    a different row.
+    """
+    episodes, guests, restaurants = sizes['episodes'], sizes['guests'], sizes['restaurants']
+
+    def get(path):
+        return lambda i: ('GET', path.format(i=i), None)
+
+    return [
+        ('index', '/', get('/')),
+        ('favicon', '/favicon.ico', get('/favicon.ico')),
+        ('episodes', '/episodes', get('/episodes')),
+        ('episodes page', '/episodes', get('/episodes?limit=100')),
+        ('episodes by date', '/episodes', get('/episodes?sort=date&date_from=2000-01-01&limit=100')),
+        ('episodes sparse', '/episodes', get('/episodes?fields=id,number&limit=100')),
+        ('episodes with guests', '/episodes', get('/episodes?include=appearances.guest&limit=100')),
+        ('episodes search', '/episodes', get('/episodes?q=fox&limit=100')),
+        ('episodes by ids', '/episodes', lambda i: ('GET', '/episodes?ids=' + ','.join(
+            str((i + j) % episodes + 1) for j in range(7)), None)),
+        ('episode', '/episodes/<int:episode_id>', lambda i: ('GET', f'/episodes/{i % episodes + 1}', None)),
+        ('episode sparse', '/episodes/<int:episode_id>',
+         lambda i: ('GET', f'/episodes/{i % episodes + 1}?fields=id,number,appearances.rating', None)),
+        ('episode stats', '/episodes/<int:episode_id>/stats',
+         lambda i: ('GET', f'/episodes/{i % episodes + 1}/stats', None)),
+        ('guests', '/guests', get('/guests')),
+        ('guests page', '/guests', get('/guests?limit=100')),
+        ('guests search', '/guests', get('/guests?q=grace&limit=100')),
+        ('guests filtered', '/guests', get('/guests?occupation=chef&min_rating=4&limit=100')),
+        ('guest stats', '/guests/<int:guest_id>/stats', lambda i: ('GET', f'/guests/{i % guests + 1}/stats', None)),
+        ('guest leaderboard', '/leaderboards/guests', get('/leaderboards/guests?min_appearances=3')),
+        ('restaurants', '/restaurants', get('/restaurants')),
+        ('restaurant', '/restaurants/<int:restaurant_id>',
+         lambda i: ('GET', f'/restaurants/{i % restaurants + 1}', None)),
+        ('restaurants by ids', '/restaurants', lambda i: ('GET', '/restaurants?ids=' + ','.join(
+            str((i + j) % restaurants + 1) for j in range(7)), None)),
+        ('batch', '/batch', lambda i: ('POST', '/batch', [
+            f'/episodes/{(i + j) % episodes + 1}' for j in range(7)])),
+        ('restaurant stats', '/restaurants/<int:restaurant_id>/stats',
+         lambda i: ('GET', f'/restaurants/{i % restaurants + 1}/stats', None)),
+        ('pizzas', '/pizzas', get('/pizzas')),
+        ('pizzas by ingredient', '/pizzas', get('/pizzas?ingredient=basil,tomato')),
+        ('cheapest restaurants', '/pizzas/<int:pizza_id>/cheapest',
+         lambda i: ('GET', f'/pizzas/{i % sizes["pizzas"] + 1}/cheapest', None)),
+        ('changes', '/changes', get(f'/changes?since={since}&limit=100')),
+        ('changes stream', '/changes/stream', get(f'/changes/stream?since={since}')),
+        ('cache stats', '/cache/stats', get('/cache/stats')),
+        ('metrics', '/metrics', get('/metrics')),
+        ('create appearance', '/appearances', lambda i: ('POST', '/appearances', {
+            'rating': 1 + i % 5, 'episode_id': i % episodes + 1, 'guest_id': fresh_guest(i)})),
+        ('upsert appearance', '/appearances', lambda i: ('PUT', '/appearances', {
+            'rating': 1 + (i + 1) % 5, 'episode_id': i % episodes + 1, 'guest_id': fresh_guest(i)})),
+        ('queue appearance', '/appearances', lambda i: ('POST', '/appearances', {
+            'rating': 1 + i % 5, 'episode_id': (i + 1) % episodes + 1, 'guest_id': fresh_guest(i)},
+            {'Prefer': 'respond-async'})),
+        ('write status', '/writes/<write_id>', get(f'/writes/{write_id}')),
+        ('create appearances bulk', '/appearances/bulk', lambda i: ('POST', '/appearances/bulk', [
+            {'rating': 1 + j % 5, 'episode_id': j % episodes + 1, 'guest_id': fresh_guest(i, 'bulk')}
+            for j in range(100)])),
+        ('create menu item', '/restaurant_pizzas', lambda i: ('POST', '/restaurant_pizzas', {
+            'price': 1 + i % 30, 'restaurant_id': i % restaurants + 1, 'pizza_id': fresh_pizza(i)})),
+        ('upsert menu item', '/restaurant_pizzas', lambda i: ('PUT', '/restaurant_pizzas', {
+            'price': 2 + i % 30, 'restaurant_id': i % restaurants + 1, 'pizza_id': fresh_pizza(i)})),
+        ('create menu items bulk', '/restaurant_pizzas/bulk', lambda i: ('POST', '/restaurant_pizzas/bulk', [
+            {'price': 1 + j % 30, 'restaurant_id': j % restaurants + 1, 'pizza_id': fresh_pizza(i, 'bulk')}
+            for j in range(min(100, restaurants))])),
+        ('delete guest', '/guests/<int:guest_id>', lambda i: ('DELETE', f'/guests/{guests - i}', None)),
+        ('delete episode', '/episodes/<int:episode_id>', lambda i: ('DELETE', f'/episodes/{episodes - i}', None)),
+        ('delete restaurant', '/restaurants/<int:restaurant_id>',
+         lambda i: ('DELETE', f'/restaurants/{restaurants - i}', None)),
+    ]
+
+
+def dataset(sizes, seed):
+    """Path of a database holding the generated dataset, built on first use."""
+    key = '-'.join(f'{k}{v}' for k, v in sizes.items()) + f'-seed{seed}'
+    path = os.path.join(DATA_DIR, f'{key}.db')
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}.tmp'})
+        with app.app_context():
+            db.create_all()
+            generate(**sizes, seed=seed)
+            db.session.remove()
+            db.engine.dispose()
+        os.replace(f'{path}.tmp', path)
+    return path
+
+
+def percentile(samples, p):
+    return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+
+def run(app, name, factory, requests, warmup):
+    client = app.test_client()
+    with app.app_context():
+        engine = db.engine
+    statements = [0]
+
+    def count_statement(*args):
+        statements[0] += 1
+
+    latencies = []
+    errors = 0
+    for i in range(warmup + requests):
+        method, path, body, *headers = factory(i)
+        if i == warmup:
+            event.listen(engine, 'before_cursor_execute', count_statement)
+        start = time.perf_counter()
+        rv = client.open(path, method=method, json=body, headers=headers[0] if headers else None)
+        rv.get_data()
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            latencies.append(elapsed)
+            errors += rv.status_code >= 400
+    event.remove(engine, 'before_cursor_execute', count_statement)
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'errors': errors,
+        'rps': requests / sum(latencies),
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'queries_per_request': statements[0] / requests,
+    }
+
+
+def commit_id():
+    try:
+        sha = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+        dirty = subprocess.run(['git', 'diff', '--quiet', 'HEAD', '--', 'app'], cwd=ROOT).returncode
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return sha + ('-dirty' if dirty else '')
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f'\nvs {baseline["commit"]} ({os.path.basename(baseline_path)}):')
+    for name, current in results['routes'].items():
+        before = baseline['routes'].get(name)
+        if before is None:
+            print(f'{name:>26}: new')
+            continue
+        print(f'{name:>26}: rps {(current["rps"] / before["rps"] - 1) * 100:+6.1f}%  '
+              f'p99 {(current["p99_ms"] / before["p99_ms"] - 1) * 100:+6.1f}%  '
+              f'queries {current["queries_per_request"] - before["queries_per_request"]:+.1f}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--episodes', type=count, default=5000)
+    parser.add_argument('--guests', type=count, default=20000)
+    parser.add_argument('--appearances', type=count, default=100000)
+    parser.add_argument('--restaurants', type=count, default=200)
+    parser.add_argument('--pizzas', type=count, default=1000)
+    parser.add_argument('--menu-items', type=count, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--only', help='comma-separated route names to run')
+    parser.add_argument('--cache', action='store_true', help='keep the response cache on')
+    parser.add_argument('--output', help='results file (default benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to diff against')
+    args = parser.parse_args(argv)
+
+    sizes = {k: getattr(args, k) for k in ('episodes', 'guests', 'appearances', 'restaurants', 'pizzas', 'menu_items')}
+    calls = args.warmup + args.requests
+    if min(sizes['episodes'], sizes['guests'], sizes['restaurants']) <= calls:
+        parser.error(f'episodes, guests and restaurants must exceed {calls} (deletes use one row per call)')
+
+    source = dataset(sizes, args.seed)
+    work = source + '.run'
+    shutil.copyfile(source, work)
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{work}',
+        'RESPONSE_CACHE_BACKEND': 'memory' if args.cache else 'null',
+        'PROFILING_ENABLED': False,
+        'WRITE_QUEUE': 'prefer',
+        # one catch-up pass per stream request
+        'CHANGES_STREAM_MAX_SECONDS': 0,
+    })
+
+    # fresh guests/pizzas give the write routes pairs that cannot collide
+    fresh = {'guest': sizes['guests'], 'pizza': sizes['pizzas']}
+    batch = max(100, calls)
+    with app.app_context():
+        # adds tables (and triggers) newer than a dataset cached by an older commit
+        db.create_all()
+        db.session.execute(insert(Guest), [{'name': f'Bench guest {i}', 'occupation': 'bench'} for i in range(2 * batch + 1)])
+        db.session.execute(insert(Pizza), [{'name': f'Bench pizza {i}', 'ingredients': 'bench'} for i in range(2 * batch)])
+        db.session.commit()
+        since = horizon(db.session)
+
+    def fresh_guest(i, kind=''):
+        return fresh['guest'] + 1 + i + (batch if kind else 0)
+
+    def fresh_pizza(i, kind=''):
+        return fresh['pizza'] + 1 + i + (batch if kind else 0)
+
+    write = app.test_client().post('/appearances', headers={'Prefer': 'respond-async'}, json={
+        'rating': 1, 'episode_id': 1, 'guest_id': fresh['guest'] + 2 * batch + 1})
+    routes = scenarios(sizes, fresh_guest, fresh_pizza, write.get_json()['id'], since)
+    covered = {rule for _, rule, _ in routes}
+    missing = sorted(r.rule for r in app.url_map.iter_rules() if r.endpoint != 'static' and r.rule not in covered)
+    if missing:
+        parser.error(f'routes without a benchmark: {", ".join(missing)}')
+    if args.only:
+        wanted = set(args.only.split(','))
+        routes = [r for r in routes if r[0] in wanted]
+
+    results = {
+        'commit': commit_id(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'dataset': {**sizes, 'seed': args.seed},
+        'requests': args.requests,
+        'cache': args.cache,
+        'routes': {},
+    }
+    print(f'dataset {results["dataset"]}, {args.requests} requests per route')
+    try:
+        for name, _, factory in routes:
+            r = run(app, name, factory, args.requests, args.warmup)
+            results['routes'][name] = r
+            print(f'{name:>26}: {r["rps"]:9.1f} req/s  p50 {r["p50_ms"]:8.2f} ms  p99 {r["p99_ms"]:8.2f} ms  '
+                  f'{r["queries_per_request"]:5.1f} queries  errors {r["errors"]}')
+    finally:
+        app.extensions['write_queue'].close()
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(work + suffix):
+                os.remove(work + suffix)
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{results["commit"]}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'saved {output}')
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
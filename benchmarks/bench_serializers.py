@@ -0,0 +1,49 @@
+"""Compare the ORM to_dict path with the column-projected serializer.
+
+Usage: python benchmarks/bench_serializers.py [rows] [repeat]
+"""
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import Guest  # noqa: E402
+from app.serializers import projected_select, row_serializer  # noqa: E402
+
+
+def orm_path():
+    db.session.expunge_all()
+    return json.dumps([g.to_dict() for g in Guest.query.order_by(Guest.id)])
+
+
+def projected_path():
+    serialize = row_serializer(Guest)
+    return json.dumps([serialize(row) for row in db.session.execute(projected_select(Guest).order_by(Guest.id))])
+
+
+def main(rows=50000, repeat=5):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp}/bench.db'})
+        with app.app_context():
+            db.create_all()
+            db.session.execute(insert(Guest), [
+                {'name': f'Guest {i}', 'occupation': 'actor'} for i in range(rows)
+            ])
+            db.session.commit()
+            assert orm_path() == projected_path()
+
+            results = {}
+            for name, fn in (('orm', orm_path), ('projected', projected_path)):
+                results[name] = min(timeit.repeat(fn, number=1, repeat=repeat))
+                print(f'{name:>10}: {results[name] * 1000:8.1f} ms for {rows} rows')
+            print(f'   speedup: {results["orm"] / results["projected"]:.1f}x')
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
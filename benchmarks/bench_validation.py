@@ -0,0 +1,69 @@
+"""Payloads/sec of decoding and validating write bodies.
+
+Times ``loads`` plus the compiled ``APPEARANCE`` and ``RESTAURANT_PIZZA``
+schemas on single bodies (well-typed, numeric strings that need coercing,
+and bodies where every field fails), and on an NDJSON batch as the bulk
+endpoints read it, with each installed ``JSON_BACKEND``. No database is
+involved.
+
+Usage: python benchmarks/bench_validation.py [rows] [repeat]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from app.json_provider import BACKENDS, JSONProvider  # noqa: E402
+from app.validation import APPEARANCE, RESTAURANT_PIZZA  # noqa: E402
+
+BODIES = {
+    'appearance': (APPEARANCE, {'rating': 5, 'episode_id': 12, 'guest_id': 340}),
+    'appearance, strings': (APPEARANCE, {'rating': '5', 'episode_id': '12', 'guest_id': '340'}),
+    'appearance, all invalid': (APPEARANCE, {'rating': 9, 'episode_id': 'x'}),
+    'restaurant_pizza': (RESTAURANT_PIZZA, {'price': 12, 'restaurant_id': 3, 'pizza_id': 41}),
+}
+
+
+def _installed():
+    for backend in BACKENDS:
+        try:
+            __import__(backend)
+        except ImportError:
+            if backend != 'stdlib':
+                continue
+        yield backend
+
+
+def _rate(count, seconds):
+    return f'{count / seconds:>12,.0f} payloads/s'
+
+
+def main(rows=10000, repeat=5):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'PROFILING_ENABLED': False})
+    for backend in _installed():
+        provider = JSONProvider(app, backend=backend)
+        loads, dumps = provider.loads, provider.dumps_bytes
+        print(backend)
+        for name, (schema, body) in BODIES.items():
+            raw = dumps(body)
+            validate = schema.validate
+            number = rows * 10
+            best = min(timeit.repeat(lambda: validate(loads(raw)), number=number, repeat=repeat))
+            only = min(timeit.repeat(lambda: validate(body), number=number, repeat=repeat))
+            print(f'  {name:<24} decode+validate {_rate(number, best)}   validate {_rate(number, only)}')
+
+        lines = [dumps({'rating': 1 + i % 5, 'episode_id': i % 997 + 1, 'guest_id': i + 1}) for i in range(rows)]
+        validate = APPEARANCE.validate
+
+        def batch():
+            for line in lines:
+                validate(loads(line))
+
+        best = min(timeit.repeat(batch, number=1, repeat=repeat))
+        print(f'  {f"ndjson batch of {rows}":<24} decode+validate {_rate(rows, best)}')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
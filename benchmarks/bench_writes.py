@@ -0,0 +1,104 @@
+"""Writes/sec of ``POST /appearances`` inline and through the write queue.
+
+Each mode gets a fresh copy of a generated SQLite database and ``--clients``
+threads posting distinct appearances through the Flask test client. For
+queued modes the clock stops once the writer has committed everything, so
+the figure is committed rows per second, not accepted requests.
+
+Usage:
+    python benchmarks/bench_writes.py --writes 5000 --clients 16
+    python benchmarks/bench_writes.py --only inline,queued
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from seed import count, generate  # noqa: E402
+
+# name -> config overrides; every queued mode uses WRITE_QUEUE='always'
+MODES = {
+    'inline': {},
+    'inline, synchronous=FULL': {'SQLITE_PRAGMAS': {**Config.SQLITE_PRAGMAS, 'synchronous': 'FULL'}},
+    'queued': {'WRITE_QUEUE': 'always'},
+    'queued, ack committed': {'WRITE_QUEUE': 'always', 'WRITE_QUEUE_ACK': 'committed'},
+    'queued, ack committed, synchronous=FULL': {
+        'WRITE_QUEUE': 'always', 'WRITE_QUEUE_ACK': 'committed', 'WRITE_QUEUE_SYNCHRONOUS': 'FULL',
+    },
+}
+
+
+def run(database, config, writes, clients, episodes):
+    """``(seconds, rejected)`` for ``writes`` posts spread over ``clients`` threads."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}', 'RESPONSE_CACHE_BACKEND': 'null',
+                      'PROFILING_ENABLED': False, **config})
+    rejected = [0]
+    lock = threading.Lock()
+
+    def post(worker):
+        client = app.test_client()
+        for i in range(worker, writes, clients):
+            # guest i + 1 appears once, so every pair is new
+            rv = client.post('/appearances', json={'rating': 1 + i % 5, 'episode_id': i % episodes + 1,
+                                                   'guest_id': i + 1})
+            if rv.status_code >= 400:
+                with lock:
+                    rejected[0] += 1
+
+    threads = [threading.Thread(target=post, args=(worker,)) for worker in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    write_queue = app.extensions.get('write_queue')
+    if write_queue is not None:
+        write_queue.flush()
+    elapsed = time.perf_counter() - started
+    if write_queue is not None:
+        write_queue.close()
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    return elapsed, rejected[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writes', type=count, default=5000)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--episodes', type=count, default=1000)
+    parser.add_argument('--only', help=f'comma-separated modes: {", ".join(MODES)}')
+    args = parser.parse_args(argv)
+    modes = MODES if not args.only else {name: MODES[name] for name in args.only.split(',')}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'source.db')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{source}'})
+        with app.app_context():
+            db.create_all()
+            generate(args.episodes, args.writes, 0, log=lambda line: None)
+            db.session.remove()
+            db.engine.dispose()
+
+        print(f'{args.writes} writes from {args.clients} clients')
+        for name, config in modes.items():
+            work = os.path.join(tmp, 'work.db')
+            shutil.copyfile(source, work)
+            elapsed, rejected = run(work, config, args.writes, args.clients, args.episodes)
+            print(f'{name:>40}: {args.writes / elapsed:9.1f} writes/s  ({elapsed:6.2f}s, {rejected} rejected)')
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(work + suffix):
+                    os.remove(work + suffix)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
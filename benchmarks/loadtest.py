@@ -0,0 +1,173 @@
+"""Load-test the sync (WSGI) and async (ASGI) deployments side by side.
+
+Seeds a temporary SQLite database, starts both servers on it (a threaded
+werkzeug server for the Flask app, hypercorn for the Quart app) and drives
+each with N concurrent keep-alive clients, reporting requests/sec and
+p50/p99 latency.
+
+Usage:
+    python benchmarks/loadtest.py --clients 64 --duration 10
+    python benchmarks/loadtest.py --sync-url http://127.0.0.1:5000 --async-url http://127.0.0.1:8000
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_PATHS = ['/episodes/1', '/restaurants/1', '/guests?limit=50', '/episodes?limit=50']
+
+SYNC_SERVER = '''
+import logging
+import sys
+from werkzeug.serving import make_server
+logging.getLogger('werkzeug').setLevel(logging.ERROR)
+from app import create_app
+make_server('127.0.0.1', int(sys.argv[1]), create_app(), threaded=True).serve_forever()
+'''
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(url, timeout=15):
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((parts.hostname, parts.port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'server at {url} did not start')
+
+
+def seed(database_url, episodes, guests, per_episode):
+    from app import create_app, db
+    from seed import generate
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_url})
+    with app.app_context():
+        db.create_all()
+        generate(
+            episodes=episodes, guests=guests, appearances=episodes * per_episode,
+            restaurants=1, pizzas=per_episode, menu_items=per_episode, log=lambda line: None,
+        )
+
+
+def run_load(base_url, paths, clients, duration):
+    parts = urlsplit(base_url)
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+    stop_at = time.monotonic() + duration
+
+    def client(n):
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        i = n
+        while time.monotonic() < stop_at:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status >= 500:
+                    errors[n] += 1
+            except (OSError, http.client.HTTPException):
+                errors[n] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+                continue
+            latencies[n].append(time.perf_counter() - start)
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    samples = sorted(x for per_client in latencies for x in per_client)
+    if not samples:
+        return {'requests': 0, 'errors': sum(errors)}
+
+    def pct(p):
+        return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+    return {
+        'requests': len(samples),
+        'errors': sum(errors),
+        'rps': len(samples) / elapsed,
+        'p50_ms': pct(0.50),
+        'p99_ms': pct(0.99),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--paths', default=','.join(DEFAULT_PATHS))
+    parser.add_argument('--sync-url', help='target an already running WSGI deployment')
+    parser.add_argument('--async-url', help='target an already running ASGI deployment')
+    parser.add_argument('--episodes', type=int, default=1000)
+    parser.add_argument('--guests', type=int, default=5000)
+    parser.add_argument('--per-episode', type=int, default=20)
+    args = parser.parse_args(argv)
+    paths = args.paths.split(',')
+
+    procs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        targets = {'sync': args.sync_url, 'async': args.async_url}
+        if not (args.sync_url and args.async_url):
+            database_url = f'sqlite:///{tmp}/loadtest.db'
+            seed(database_url, args.episodes, args.guests, args.per_episode)
+            # the async app has no response cache; disable it so both do the same work
+            env = {
+                **os.environ, 'DATABASE_URL': database_url, 'LATESHOW_CONFIG': 'production',
+                'RESPONSE_CACHE_BACKEND': 'null', 'PYTHONPATH': ROOT,
+            }
+            if not targets['sync']:
+                port = _free_port()
+                procs.append(subprocess.Popen([sys.executable, '-c', SYNC_SERVER, str(port)], env=env, cwd=ROOT))
+                targets['sync'] = f'http://127.0.0.1:{port}'
+            if not targets['async']:
+                port = _free_port()
+                procs.append(subprocess.Popen(
+                    [sys.executable, '-m', 'hypercorn', 'asgi:app', '--bind', f'127.0.0.1:{port}'],
+                    env=env, cwd=ROOT,
+                ))
+                targets['async'] = f'http://127.0.0.1:{port}'
+        try:
+            print(f'{args.clients} clients, {args.duration:g}s per deployment, paths: {", ".join(paths)}')
+            for name, url in targets.items():
+                _wait_for(url)
+                run_load(url, paths, args.clients, min(args.duration, 1))  # warm up
+                r = run_load(url, paths, args.clients, args.duration)
+                if not r['requests']:
+                    print(f'{name:>6}: no successful requests ({r["errors"]} errors)')
+                    continue
+                print(f'{name:>6}: {r["rps"]:8.1f} req/s  p50 {r["p50_ms"]:7.2f} ms  '
+                      f'p99 {r["p99_ms"]:7.2f} ms  errors {r["errors"]}')
+        finally:
+            for proc in procs:
+                proc.terminate()
+                proc.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,84 @@
 from app import create_app, db
-from flask_migrate import upgrade
 
 
 app = create_app()
 
 
-def run_migrations():
-    """Run migrations (calls Alembic upgrade head)."""
+def run_migrations(dedupe=False, delete_orphans=False):
+    """Run migrations (calls Alembic upgrade head).
+
+    ``dedupe`` keeps the newest row of each duplicated appearance or menu
+    pair instead of aborting the unique-pair migration; ``delete_orphans``
+    deletes child rows whose parents are missing instead of aborting the
+    cascading foreign key migration.
+    """
+    from flask_migrate import upgrade
+    x_arg = (['dedupe=newest'] if dedupe else []) + (['orphans=delete'] if delete_orphans else [])
+    with app.app_context():
+        upgrade(x_arg=x_arg or None)
+
+
+def rebuild_stats():
+    """Recompute the summary tables (same as `flask stats rebuild`)."""
+    from app.stats import rebuild
+    with app.app_context():
+        with db.engine.begin() as connection:
+            rebuild(connection)
+
+
+def rebuild_search():
+    """Repopulate the FTS and ingredient indexes (same as `flask search rebuild`)."""
+    from app.search import rebuild
+    with app.app_context():
+        with db.engine.begin() as connection:
+            rebuild(connection)
+
+
+def compact_changes():
+    """Collapse and truncate the change feed (same as `flask changes compact`)."""
+    from app.changelog import compact
     with app.app_context():
-        upgrade()
+        with db.engine.begin() as connection:
+            result = compact(connection, app.config['CHANGELOG_RETENTION_DAYS'])
+    print(f"Collapsed {result['collapsed']}, truncated {result['truncated']}; horizon is seq {result['horizon']}")
+
+
+def export_data(directory, fmt='ndjson'):
+    """Export every data table to ``directory`` (same as `flask export`)."""
+    from app.transfer import export_dataset
+    with app.app_context():
+        export_dataset(directory, fmt)
+
+
+def import_data(directory):
+    """Load an export into empty tables (same as `flask import`)."""
+    from app.transfer import import_dataset
+    with app.app_context():
+        import_dataset(directory)
+
+
+def import_report():
+    """Print cold-start import timings (same as `flask startup report`)."""
+    from app.startup import format_report, import_report as report
+    print(format_report(report()))
 
 
 if __name__ == '__main__':
     # handy entrypoint: python manage.py migrate
     import sys
     if len(sys.argv) > 1 and sys.argv[1] in ('migrate', 'upgrade'):
-        run_migrations()
+        run_migrations(dedupe='--dedupe' in sys.argv[2:], delete_orphans='--delete-orphans' in sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'rebuild-stats':
+        rebuild_stats()
+    elif len(sys.argv) > 1 and sys.argv[1] == 'rebuild-search':
+        rebuild_search()
+    elif len(sys.argv) > 1 and sys.argv[1] == 'compact-changes':
+        compact_changes()
+    elif len(sys.argv) > 2 and sys.argv[1] == 'export':
+        export_data(*sys.argv[2:4])
+    elif len(sys.argv) > 2 and sys.argv[1] == 'import':
+        import_data(sys.argv[2])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'import-report':
+        import_report()
     else:
         app.run(debug=True)
@@ -0,0 +1,176 @@
+"""add summary stats tables
+
+Revision ID: 3f6b8d21c5e7
+Revises: 7c1d2e9a4b10
+Create Date: 2026-10-18 11:26:40.119305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6b8d21c5e7'
+down_revision = '7c1d2e9a4b10'
+branch_labels = None
+depends_on = None
+
+
+# frozen copy of app.stats.trigger_ddl() at this revision
+TRIGGERS = [
+    """CREATE TRIGGER episode_stats_insert AFTER INSERT ON appearances BEGIN
+        INSERT INTO episode_stats (episode_id, row_count, value_sum, value_min, value_max)
+        VALUES (NEW.episode_id, 1, NEW.rating, NEW.rating, NEW.rating)
+        ON CONFLICT(episode_id) DO UPDATE SET
+            row_count = row_count + 1,
+            value_sum = value_sum + excluded.value_sum,
+            value_min = min(value_min, excluded.value_min),
+            value_max = max(value_max, excluded.value_max);
+END""",
+    """CREATE TRIGGER episode_stats_delete AFTER DELETE ON appearances BEGIN
+        UPDATE episode_stats SET
+            row_count = row_count - 1,
+            value_sum = value_sum - OLD.rating,
+            value_min = CASE WHEN OLD.rating > value_min THEN value_min
+                ELSE (SELECT min(rating) FROM appearances WHERE episode_id = OLD.episode_id) END,
+            value_max = CASE WHEN OLD.rating < value_max THEN value_max
+                ELSE (SELECT max(rating) FROM appearances WHERE episode_id = OLD.episode_id) END
+        WHERE episode_id = OLD.episode_id;
+        DELETE FROM episode_stats WHERE episode_id = OLD.episode_id AND row_count <= 0;
+END""",
+    """CREATE TRIGGER episode_stats_update AFTER UPDATE OF episode_id, rating ON appearances BEGIN
+        UPDATE episode_stats SET
+            row_count = row_count - 1,
+            value_sum = value_sum - OLD.rating,
+            value_min = CASE WHEN OLD.rating > value_min THEN value_min
+                ELSE (SELECT min(rating) FROM appearances WHERE episode_id = OLD.episode_id) END,
+            value_max = CASE WHEN OLD.rating < value_max THEN value_max
+                ELSE (SELECT max(rating) FROM appearances WHERE episode_id = OLD.episode_id) END
+        WHERE episode_id = OLD.episode_id;
+        DELETE FROM episode_stats WHERE episode_id = OLD.episode_id AND row_count <= 0;
+        INSERT INTO episode_stats (episode_id, row_count, value_sum, value_min, value_max)
+        VALUES (NEW.episode_id, 1, NEW.rating, NEW.rating, NEW.rating)
+        ON CONFLICT(episode_id) DO UPDATE SET
+            row_count = row_count + 1,
+            value_sum = value_sum + excluded.value_sum,
+            value_min = min(value_min, excluded.value_min),
+            value_max = max(value_max, excluded.value_max);
+END""",
+    """CREATE TRIGGER guest_stats_insert AFTER INSERT ON appearances BEGIN
+        INSERT INTO guest_stats (guest_id, row_count, value_sum, value_min, value_max)
+        VALUES (NEW.guest_id, 1, NEW.rating, NEW.rating, NEW.rating)
+        ON CONFLICT(guest_id) DO UPDATE SET
+            row_count = row_count + 1,
+            value_sum = value_sum + excluded.value_sum,
+            value_min = min(value_min, excluded.value_min),
+            value_max = max(value_max, excluded.value_max);
+END""",
+    """CREATE TRIGGER guest_stats_delete AFTER DELETE ON appearances BEGIN
+        UPDATE guest_stats SET
+            row_count = row_count - 1,
+            value_sum = value_sum - OLD.rating,
+            value_min = CASE WHEN OLD.rating > value_min THEN value_min
+                ELSE (SELECT min(rating) FROM appearances WHERE guest_id = OLD.guest_id) END,
+            value_max = CASE WHEN OLD.rating < value_max THEN value_max
+                ELSE (SELECT max(rating) FROM appearances WHERE guest_id = OLD.guest_id) END
+        WHERE guest_id = OLD.guest_id;
+        DELETE FROM guest_stats WHERE guest_id = OLD.guest_id AND row_count <= 0;
+END""",
+    """CREATE TRIGGER guest_stats_update AFTER UPDATE OF guest_id, rating ON appearances BEGIN
+        UPDATE guest_stats SET
+            row_count = row_count - 1,
+            value_sum = value_sum - OLD.rating,
+            value_min = CASE WHEN OLD.rating > value_min THEN value_min
+                ELSE (SELECT min(rating) FROM appearances WHERE guest_id = OLD.guest_id) END,
+            value_max = CASE WHEN OLD.rating < value_max THEN value_max
+                ELSE (SELECT max(rating) FROM appearances WHERE guest_id = OLD.guest_id) END
+        WHERE guest_id = OLD.guest_id;
+        DELETE FROM guest_stats WHERE guest_id = OLD.guest_id AND row_count <= 0;
+        INSERT INTO guest_stats (guest_id, row_count, value_sum, value_min, value_max)
+        VALUES (NEW.guest_id, 1, NEW.rating, NEW.rating, NEW.rating)
+        ON CONFLICT(guest_id) DO UPDATE SET
+            row_count = row_count + 1,
+            value_sum = value_sum + excluded.value_sum,
+            value_min = min(value_min, excluded.value_min),
+            value_max = max(value_max, excluded.value_max);
+END""",
+    """CREATE TRIGGER restaurant_stats_insert AFTER INSERT ON restaurant_pizzas BEGIN
+        INSERT INTO restaurant_stats (restaurant_id, row_count, value_sum, value_min, value_max)
+        VALUES (NEW.restaurant_id, 1, NEW.price, NEW.price, NEW.price)
+        ON CONFLICT(restaurant_id) DO UPDATE SET
+            row_count = row_count + 1,
+            value_sum = value_sum + excluded.value_sum,
+            value_min = min(value_min, excluded.value_min),
+            value_max = max(value_max, excluded.value_max);
+END""",
+    """CREATE TRIGGER restaurant_stats_delete AFTER DELETE ON restaurant_pizzas BEGIN
+        UPDATE restaurant_stats SET
+            row_count = row_count - 1,
+            value_sum = value_sum - OLD.price,
+            value_min = CASE WHEN OLD.price > value_min THEN value_min
+                ELSE (SELECT min(price) FROM restaurant_pizzas WHERE restaurant_id = OLD.restaurant_id) END,
+            value_max = CASE WHEN OLD.price < value_max THEN value_max
+                ELSE (SELECT max(price) FROM restaurant_pizzas WHERE restaurant_id = OLD.restaurant_id) END
+        WHERE restaurant_id = OLD.restaurant_id;
+        DELETE FROM restaurant_stats WHERE restaurant_id = OLD.restaurant_id AND row_count <= 0;
+END""",
+    """CREATE TRIGGER restaurant_stats_update AFTER UPDATE OF restaurant_id, price ON restaurant_pizzas BEGIN
+        UPDATE restaurant_stats SET
+            row_count = row_count - 1,
+            value_sum = value_sum - OLD.price,
+            value_min = CASE WHEN OLD.price > value_min THEN value_min
+                ELSE (SELECT min(price) FROM restaurant_pizzas WHERE restaurant_id = OLD.restaurant_id) END,
+            value_max = CASE WHEN OLD.price < value_max THEN value_max
+                ELSE (SELECT max(price) FROM restaurant_pizzas WHERE restaurant_id = OLD.restaurant_id) END
+        WHERE restaurant_id = OLD.restaurant_id;
+        DELETE FROM restaurant_stats WHERE restaurant_id = OLD.restaurant_id AND row_count <= 0;
+        INSERT INTO restaurant_stats (restaurant_id, row_count, value_sum, value_min, value_max)
+        VALUES (NEW.restaurant_id, 1, NEW.price, NEW.price, NEW.price)
+        ON CONFLICT(restaurant_id) DO UPDATE SET
+            row_count = row_count + 1,
+            value_sum = value_sum + excluded.value_sum,
+            value_min = min(value_min, excluded.value_min),
+            value_max = max(value_max, excluded.value_max);
+END""",
+]
+
+BACKFILL = [
+    ('episode_stats', 'appearances', 'episode_id', 'rating'),
+    ('guest_stats', 'appearances', 'guest_id', 'rating'),
+    ('restaurant_stats', 'restaurant_pizzas', 'restaurant_id', 'price'),
+]
+
+
+def _summary_table(name, key, parent):
+    op.create_table(name,
+    sa.Column(key, sa.Integer(), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('value_sum', sa.Integer(), nullable=False),
+    sa.Column('value_min', sa.Integer(), nullable=True),
+    sa.Column('value_max', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint([key], [f'{parent}.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint(key)
+    )
+
+
+def upgrade():
+    _summary_table('episode_stats', 'episode_id', 'episodes')
+    _summary_table('guest_stats', 'guest_id', 'guests')
+    _summary_table('restaurant_stats', 'restaurant_id', 'restaurants')
+    for statement in TRIGGERS:
+        op.execute(statement)
+    for summary, source, key, value in BACKFILL:
+        op.execute(
+            f'INSERT INTO {summary} ({key}, row_count, value_sum, value_min, value_max) '
+            f'SELECT {key}, count(*), sum({value}), min({value}), max({value}) '
+            f'FROM {source} GROUP BY {key}'
+        )
+
+
+def downgrade():
+    for summary, *_ in BACKFILL:
+        for suffix in ('insert', 'delete', 'update'):
+            op.execute(f'DROP TRIGGER IF EXISTS {summary}_{suffix}')
+    op.drop_table('restaurant_stats')
+    op.drop_table('guest_stats')
+    op.drop_table('episode_stats')
@@ -0,0 +1,101 @@
+"""add search indexes
+
+Revision ID: 5d8e2b7f1a36
+Revises: c2a7e41b9f63
+Create Date: 2026-10-18 13:31:07.482915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8e2b7f1a36'
+down_revision = 'c2a7e41b9f63'
+branch_labels = None
+depends_on = None
+
+
+SPLIT_INGREDIENTS = r"""json_each('["' || replace(replace(replace(coalesce(NEW.ingredients, ''), '\', '\\'), '"', '\"'), ',', '","') || '"]')"""
+
+# frozen copy of app.search.fts_ddl() at this revision
+FTS = {
+    'guests': ('name', 'occupation'),
+    'pizzas': ('name', 'ingredients'),
+    'episodes': ('date', 'number'),
+}
+
+INGREDIENT_TRIGGERS = [
+    f"""CREATE TRIGGER pizza_ingredients_insert AFTER INSERT ON pizzas BEGIN
+        INSERT OR IGNORE INTO pizza_ingredients (ingredient, pizza_id)
+        SELECT lower(trim(value)), NEW.id FROM {SPLIT_INGREDIENTS} WHERE trim(value) != '';
+END""",
+    f"""CREATE TRIGGER pizza_ingredients_update AFTER UPDATE OF ingredients ON pizzas BEGIN
+        DELETE FROM pizza_ingredients WHERE pizza_id = OLD.id;
+        INSERT OR IGNORE INTO pizza_ingredients (ingredient, pizza_id)
+        SELECT lower(trim(value)), NEW.id FROM {SPLIT_INGREDIENTS} WHERE trim(value) != '';
+END""",
+]
+
+
+def _fts_statements(source, columns):
+    fts = f'{source}_fts'
+    names = ', '.join(columns)
+    new = ', '.join(f'NEW.{c}' for c in columns)
+    old = ', '.join(f'OLD.{c}' for c in columns)
+    insert = f'\n        INSERT INTO {fts} (rowid, {names}) VALUES (NEW.id, {new});'
+    remove = f"\n        INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', OLD.id, {old});"
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{source}', content_rowid='id')",
+        f'CREATE TRIGGER {fts}_insert AFTER INSERT ON {source} BEGIN{insert}\nEND',
+        f'CREATE TRIGGER {fts}_delete AFTER DELETE ON {source} BEGIN{remove}\nEND',
+        f'CREATE TRIGGER {fts}_update AFTER UPDATE ON {source} BEGIN{remove}{insert}\nEND',
+        f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+    ]
+
+
+def upgrade():
+    op.create_table('pizza_ingredients',
+    sa.Column('ingredient', sa.String(), nullable=False),
+    sa.Column('pizza_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['pizza_id'], ['pizzas.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ingredient', 'pizza_id')
+    )
+    op.create_index('ix_pizza_ingredients_pizza_id', 'pizza_ingredients', ['pizza_id'], unique=False)
+    op.create_index('ix_guests_occupation_nocase', 'guests', [sa.text('occupation COLLATE "NOCASE"')], unique=False)
+
+    # SQLite can add VIRTUAL generated columns in place
+    for summary in ('episode_stats', 'guest_stats', 'restaurant_stats'):
+        op.execute(f'ALTER TABLE {summary} ADD COLUMN value_avg FLOAT '
+                   'GENERATED ALWAYS AS (CAST(value_sum AS REAL) / NULLIF(row_count, 0)) VIRTUAL')
+    op.create_index('ix_episode_stats_value_avg', 'episode_stats', ['value_avg'], unique=False)
+    op.create_index('ix_guest_stats_value_avg', 'guest_stats', ['value_avg'], unique=False)
+
+    for source, columns in FTS.items():
+        for statement in _fts_statements(source, columns):
+            op.execute(statement)
+    for statement in INGREDIENT_TRIGGERS:
+        op.execute(statement)
+    op.execute(
+        'INSERT OR IGNORE INTO pizza_ingredients (ingredient, pizza_id) '
+        'SELECT lower(trim(value)), pizzas.id FROM pizzas, '
+        + SPLIT_INGREDIENTS.replace('NEW.', 'pizzas.') + " WHERE trim(value) != ''"
+    )
+
+
+def downgrade():
+    op.execute('DROP TRIGGER pizza_ingredients_update')
+    op.execute('DROP TRIGGER pizza_ingredients_insert')
+    for source in reversed(list(FTS)):
+        for suffix in ('update', 'delete', 'insert'):
+            op.execute(f'DROP TRIGGER {source}_fts_{suffix}')
+        op.execute(f'DROP TABLE {source}_fts')
+
+    op.drop_index('ix_guest_stats_value_avg', table_name='guest_stats')
+    op.drop_index('ix_episode_stats_value_avg', table_name='episode_stats')
+    for summary in ('restaurant_stats', 'guest_stats', 'episode_stats'):
+        op.execute(f'ALTER TABLE {summary} DROP COLUMN value_avg')
+
+    op.drop_index('ix_guests_occupation_nocase', table_name='guests')
+    op.drop_index('ix_pizza_ingredients_pizza_id', table_name='pizza_ingredients')
+    op.drop_table('pizza_ingredients')
@@ -0,0 +1,28 @@
+"""add table versions
+
+Revision ID: 7c1d2e9a4b10
+Revises: e4ef047fffa8
+Create Date: 2026-10-18 10:02:11.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1d2e9a4b10'
+down_revision = 'e4ef047fffa8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('table_versions',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('table_versions')
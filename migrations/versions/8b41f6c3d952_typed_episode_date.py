@@ -0,0 +1,117 @@
+"""typed episode date
+
+Revision ID: 8b41f6c3d952
+Revises: 5d8e2b7f1a36
+Create Date: 2026-10-18 14:02:33.915406
+
+"""
+import logging
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41f6c3d952'
+down_revision = '5d8e2b7f1a36'
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger('alembic.runtime.migration')
+
+BATCH_SIZE = 1000
+
+# frozen copy of app.models.DATE_FORMATS at this revision
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%y', '%m/%d/%Y')
+
+
+def _parse(value):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date()
+        except (AttributeError, ValueError):
+            pass
+    return None
+
+
+def _episodes(date_type):
+    return sa.Table('episodes', sa.MetaData(),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('date', date_type, nullable=False),
+    sa.Column('number', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def _recreate(table):
+    # rebuilding a parent table: the DROP would fire the children's ON DELETE
+    # CASCADE, so foreign keys are switched off (only possible outside a
+    # transaction), and the FTS triggers on it are put back afterwards
+    bind = op.get_bind()
+    triggers = bind.execute(
+        sa.text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :name"),
+        {'name': table.name},
+    ).scalars().all()
+    with op.get_context().autocommit_block():
+        op.execute('PRAGMA foreign_keys=OFF')
+    with op.batch_alter_table(table.name, copy_from=table, recreate='always'):
+        pass
+    for sql in triggers:
+        op.execute(sql)
+    with op.get_context().autocommit_block():
+        op.execute('PRAGMA foreign_keys=ON')
+
+
+def _rewrite_dates(convert):
+    """Apply ``convert`` to every date in id batches; returns the rows it rejected."""
+    bind = op.get_bind()
+    failed = []
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text('SELECT id, date FROM episodes WHERE id > :last ORDER BY id LIMIT :size'),
+            {'last': last_id, 'size': BATCH_SIZE},
+        ).all()
+        if not rows:
+            return failed
+        updates = []
+        for episode_id, value in rows:
+            converted = convert(value)
+            if converted is None:
+                failed.append((episode_id, value))
+            elif converted != value:
+                updates.append({'id': episode_id, 'date': converted})
+        if updates:
+            bind.execute(sa.text('UPDATE episodes SET date = :date WHERE id = :id'), updates)
+        last_id = rows[-1][0]
+        log.info('episodes.date: converted through id %s', last_id)
+
+
+def upgrade():
+    def to_iso(value):
+        parsed = _parse(value)
+        return parsed and parsed.isoformat()
+
+    failed = _rewrite_dates(to_iso)
+    for episode_id, value in failed:
+        log.error('episodes.date: cannot parse %r (id %s)', value, episode_id)
+    if failed:
+        raise RuntimeError(
+            f'{len(failed)} episode dates could not be parsed (ids {[i for i, _ in failed]}); '
+            f'fix them to one of {DATE_FORMATS} and rerun the upgrade'
+        )
+
+    _recreate(_episodes(sa.Date()))
+    op.create_index('ix_episodes_date_number', 'episodes', ['date', 'number'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_episodes_date_number', table_name='episodes')
+    _recreate(_episodes(sa.String()))
+
+    def to_legacy(value):
+        parsed = _parse(value)
+        return parsed and f'{parsed.month}/{parsed.day}/{parsed:%y}'
+
+    _rewrite_dates(to_legacy)
@@ -0,0 +1,30 @@
+"""add foreign key indexes
+
+Revision ID: a93e5f0c7d24
+Revises: 3f6b8d21c5e7
+Create Date: 2026-10-18 12:04:52.771630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a93e5f0c7d24'
+down_revision = '3f6b8d21c5e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_appearances_episode_id_guest_id', 'appearances', ['episode_id', 'guest_id'], unique=False)
+    op.create_index('ix_appearances_guest_id', 'appearances', ['guest_id'], unique=False)
+    op.create_index('ix_restaurant_pizzas_restaurant_id_pizza_id', 'restaurant_pizzas', ['restaurant_id', 'pizza_id'], unique=False)
+    op.create_index('ix_restaurant_pizzas_pizza_id', 'restaurant_pizzas', ['pizza_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_restaurant_pizzas_pizza_id', table_name='restaurant_pizzas')
+    op.drop_index('ix_restaurant_pizzas_restaurant_id_pizza_id', table_name='restaurant_pizzas')
+    op.drop_index('ix_appearances_guest_id', table_name='appearances')
+    op.drop_index('ix_appearances_episode_id_guest_id', table_name='appearances')
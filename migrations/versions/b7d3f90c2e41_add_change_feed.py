@@ -0,0 +1,55 @@
+"""add change feed
+
+Revision ID: b7d3f90c2e41
+Revises: f2c84a1d6e53
+Create Date: 2026-10-18 19:04:52.318604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d3f90c2e41'
+down_revision = 'f2c84a1d6e53'
+branch_labels = None
+depends_on = None
+
+
+# frozen copy of app.changelog.TABLES and OPS at this revision
+TABLES = ('episodes', 'guests', 'appearances', 'restaurants', 'pizzas', 'restaurant_pizzas')
+OPS = (('insert', 'INSERT', 'NEW'), ('update', 'UPDATE', 'NEW'), ('delete', 'DELETE', 'OLD'))
+
+
+def upgrade():
+    op.create_table('changes',
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.PrimaryKeyConstraint('seq'),
+    sqlite_autoincrement=True
+    )
+    op.create_index('ix_changes_table_name_row_id', 'changes', ['table_name', 'row_id'], unique=False)
+    op.create_table('changes_horizon',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # existing rows have no history; the feed starts with the first write after this
+    for table in TABLES:
+        for name, event, ref in OPS:
+            op.execute(
+                f'CREATE TRIGGER {table}_changelog_{name} AFTER {event} ON {table} '
+                f"BEGIN INSERT INTO changes (table_name, row_id, op) VALUES ('{table}', {ref}.id, '{name}'); END"
+            )
+
+
+def downgrade():
+    for table in TABLES:
+        for name, _, _ in OPS:
+            op.execute(f'DROP TRIGGER IF EXISTS {table}_changelog_{name}')
+    op.drop_table('changes_horizon')
+    op.drop_index('ix_changes_table_name_row_id', table_name='changes')
+    op.drop_table('changes')
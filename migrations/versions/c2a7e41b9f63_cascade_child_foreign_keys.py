@@ -0,0 +1,106 @@
+"""cascade child foreign keys
+
+Revision ID: c2a7e41b9f63
+Revises: a93e5f0c7d24
+Create Date: 2026-10-18 12:48:19.305114
+
+Rows orphaned while foreign keys were unenforced would block the table
+copy. They abort the upgrade unless it runs with ``-x orphans=delete``
+(``flask db upgrade -x orphans=delete`` or ``python manage.py migrate
+--delete-orphans``), which deletes them.
+"""
+import logging
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2a7e41b9f63'
+down_revision = 'a93e5f0c7d24'
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger('alembic.runtime.migration')
+
+# table -> condition matching its rows whose parents are missing
+ORPHANS = {
+    'appearances': 'episode_id NOT IN (SELECT id FROM episodes) OR guest_id NOT IN (SELECT id FROM guests)',
+    'restaurant_pizzas': 'restaurant_id NOT IN (SELECT id FROM restaurants) OR pizza_id NOT IN (SELECT id FROM pizzas)',
+}
+
+
+def _appearances(ondelete):
+    return sa.Table('appearances', sa.MetaData(),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('rating', sa.Integer(), nullable=False),
+    sa.Column('guest_id', sa.Integer(), nullable=False),
+    sa.Column('episode_id', sa.Integer(), nullable=False),
+    sa.CheckConstraint('rating >= 1 AND rating <= 5', name='rating_range'),
+    sa.ForeignKeyConstraint(['episode_id'], ['episodes.id'], ondelete=ondelete),
+    sa.ForeignKeyConstraint(['guest_id'], ['guests.id'], ondelete=ondelete),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_appearances_episode_id_guest_id', 'episode_id', 'guest_id'),
+    sa.Index('ix_appearances_guest_id', 'guest_id'),
+    )
+
+
+def _restaurant_pizzas(ondelete):
+    return sa.Table('restaurant_pizzas', sa.MetaData(),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('price', sa.Integer(), nullable=False),
+    sa.Column('restaurant_id', sa.Integer(), nullable=False),
+    sa.Column('pizza_id', sa.Integer(), nullable=False),
+    sa.CheckConstraint('price > 0 AND price <= 1000', name='price_range'),
+    sa.ForeignKeyConstraint(['pizza_id'], ['pizzas.id'], ondelete=ondelete),
+    sa.ForeignKeyConstraint(['restaurant_id'], ['restaurants.id'], ondelete=ondelete),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_restaurant_pizzas_restaurant_id_pizza_id', 'restaurant_id', 'pizza_id'),
+    sa.Index('ix_restaurant_pizzas_pizza_id', 'pizza_id'),
+    )
+
+
+def _recreate(table):
+    # SQLite can only change a foreign key by rebuilding the table, and
+    # dropping the old table takes its triggers (the stats summaries) with it
+    bind = op.get_bind()
+    triggers = bind.execute(
+        sa.text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :name"),
+        {'name': table.name},
+    ).scalars().all()
+    with op.batch_alter_table(table.name, copy_from=table, recreate='always'):
+        pass
+    for sql in triggers:
+        op.execute(sql)
+
+
+def upgrade():
+    orphans = context.get_x_argument(as_dictionary=True).get('orphans')
+    if orphans not in (None, 'delete'):
+        raise RuntimeError(f'unknown orphans mode {orphans!r}; the only one is "delete"')
+    bind = op.get_bind()
+    found = 0
+    for table, condition in ORPHANS.items():
+        ids = bind.execute(sa.text(f'SELECT id FROM {table} WHERE {condition} ORDER BY id')).scalars().all()
+        if not ids:
+            continue
+        (log.warning if orphans else log.error)(
+            '%s: %d rows reference missing parents (ids %s)', table, len(ids), ','.join(map(str, ids))
+        )
+        if orphans:
+            bind.execute(sa.text(f'DELETE FROM {table} WHERE {condition}'))
+            log.warning('%s: deleted %d orphaned rows', table, len(ids))
+        else:
+            found += len(ids)
+    if found:
+        raise RuntimeError(
+            f'{found} orphaned rows; fix or delete them and rerun the upgrade, or rerun it with '
+            '-x orphans=delete (python manage.py migrate --delete-orphans) to delete them'
+        )
+    _recreate(_appearances('CASCADE'))
+    _recreate(_restaurant_pizzas('CASCADE'))
+
+
+def downgrade():
+    _recreate(_restaurant_pizzas(None))
+    _recreate(_appearances(None))
@@ -0,0 +1,37 @@
+"""add ranking indexes
+
+Revision ID: d5a0c3e8f719
+Revises: b7d3f90c2e41
+Create Date: 2026-10-18 20:11:36.905127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a0c3e8f719'
+down_revision = 'b7d3f90c2e41'
+branch_labels = None
+depends_on = None
+
+# table -> (old index, old columns, new index, new columns)
+INDEXES = {
+    'guest_stats': ('ix_guest_stats_value_avg', ['value_avg'],
+                    'ix_guest_stats_value_avg_row_count', ['value_avg', 'row_count']),
+    'restaurant_pizzas': ('ix_restaurant_pizzas_pizza_id', ['pizza_id'],
+                          'ix_restaurant_pizzas_pizza_id_price_restaurant_id', ['pizza_id', 'price', 'restaurant_id']),
+}
+
+
+def upgrade():
+    # the new indexes lead with the old ones' columns, so they cover the same lookups
+    for table, (old, _, new, columns) in INDEXES.items():
+        op.create_index(new, table, columns, unique=False)
+        op.drop_index(old, table_name=table)
+
+
+def downgrade():
+    for table, (old, columns, new, _) in INDEXES.items():
+        op.create_index(old, table, columns, unique=False)
+        op.drop_index(new, table_name=table)
@@ -0,0 +1,78 @@
+"""unique child pairs
+
+Revision ID: f2c84a1d6e53
+Revises: 8b41f6c3d952
+Create Date: 2026-10-18 16:21:07.402118
+
+Duplicated pairs abort the upgrade unless it runs with ``-x dedupe=newest``
+(``flask db upgrade -x dedupe=newest`` or ``python manage.py migrate
+--dedupe``), which keeps the newest row (highest id) of each pair and
+deletes the others.
+"""
+import logging
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c84a1d6e53'
+down_revision = '8b41f6c3d952'
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger('alembic.runtime.migration')
+
+# table -> (old composite index, new unique index, columns)
+PAIRS = {
+    'appearances': ('ix_appearances_episode_id_guest_id', 'uq_appearances_episode_id_guest_id',
+                    ['episode_id', 'guest_id']),
+    'restaurant_pizzas': ('ix_restaurant_pizzas_restaurant_id_pizza_id',
+                          'uq_restaurant_pizzas_restaurant_id_pizza_id', ['restaurant_id', 'pizza_id']),
+}
+
+
+def _duplicates(table, columns):
+    names = ', '.join(columns)
+    return op.get_bind().execute(sa.text(
+        f'SELECT {names}, group_concat(id) FROM {table} GROUP BY {names} HAVING count(*) > 1'
+    )).all()
+
+
+def _keep_newest(table, columns):
+    names = ', '.join(columns)
+    return op.get_bind().execute(sa.text(
+        f'DELETE FROM {table} WHERE id NOT IN (SELECT max(id) FROM {table} GROUP BY {names})'
+    )).rowcount
+
+
+def upgrade():
+    dedupe = context.get_x_argument(as_dictionary=True).get('dedupe')
+    if dedupe not in (None, 'newest'):
+        raise RuntimeError(f'unknown dedupe mode {dedupe!r}; the only one is "newest"')
+    log_duplicate = log.warning if dedupe else log.error
+    found = 0
+    for table, (_, _, columns) in PAIRS.items():
+        duplicates = _duplicates(table, columns)
+        for *key, ids in duplicates:
+            log_duplicate('%s: duplicate %s %s (ids %s)', table, '/'.join(columns), tuple(key), ids)
+        if duplicates and dedupe:
+            log.warning('%s: deleted %d rows, keeping the newest of each pair', table, _keep_newest(table, columns))
+        else:
+            found += len(duplicates)
+    if found:
+        raise RuntimeError(
+            f'{found} duplicated pairs; delete the extra rows and rerun the upgrade, or rerun it with '
+            '-x dedupe=newest (python manage.py migrate --dedupe) to keep the newest row of each pair'
+        )
+
+    # the unique indexes cover the same lookups as the composite ones they replace
+    for table, (old, new, columns) in PAIRS.items():
+        op.create_index(new, table, columns, unique=True)
+        op.drop_index(old, table_name=table)
+
+
+def downgrade():
+    for table, (old, new, columns) in PAIRS.items():
+        op.create_index(old, table, columns, unique=False)
+        op.drop_index(new, table_name=table)
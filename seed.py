@@ -1,6 +1,34 @@
+"""Seed the database.
+
+``python seed.py`` loads the small sample dataset. Passing any size
+generates a synthetic dataset instead, e.g.::
+
+    python seed.py --episodes 50000 --guests 200000 --appearances 2M --seed 1
+
+Generated data is deterministic for a given ``--seed`` and sizes, is
+inserted with chunked bulk INSERTs, and replaces whatever the tables held.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import delete, insert
+
 from app import create_app, db
 from app.models import Episode, Guest, Appearance
 
+FIRST_NAMES = ('Michael', 'Sandra', 'Tracey', 'David', 'Rita', 'Jon', 'Maya', 'Omar', 'Grace', 'Leo',
+               'Nina', 'Paul', 'Aisha', 'Hugo', 'Ines', 'Kofi', 'Lena', 'Raj', 'Sofia', 'Tom')
+LAST_NAMES = ('Fox', 'Bernhard', 'Ullman', 'Kamau', 'Moreno', 'Stewart', 'Rudolph', 'Khan', 'Hopper',
+              'Ortiz', 'Simone', 'Rudd', 'Tyler', 'Grant', 'Diaz', 'Mensah', 'Olin', 'Patel', 'Coppola', 'Hanks')
+OCCUPATIONS = ('actor', 'actress', 'comedian', 'musician', 'author', 'politician', 'chef', 'athlete',
+               'director', 'journalist', 'scientist', 'television actress')
+INGREDIENTS = ('tomato', 'mozzarella', 'basil', 'pepperoni', 'mushroom', 'onion', 'olive', 'ham',
+               'pineapple', 'garlic', 'spinach', 'ricotta', 'anchovy', 'pepper', 'sausage', 'oregano')
+FIRST_EPISODE = date(1999, 1, 11)
+
 
 def seed():
     app = create_app()
@@ -50,5 +78,118 @@ def seed():
         print('Seeded database with sample data')
 
 
+def _spread(total, parents, children, rng):
+    """``(parent, child)`` id pairs, ``total`` of them, unique and spread evenly over parents."""
+    if not total:
+        return iter(())
+    per_parent, extra = divmod(total, parents) if parents else (total, 0)
+    if not parents or per_parent + (extra > 0) > children:
+        raise ValueError(f'cannot place {total} unique pairs on {parents} x {children} ids')
+    return (
+        (parent, child)
+        for parent in range(1, parents + 1)
+        for child in rng.sample(range(1, children + 1), per_parent + (parent <= extra))
+    )
+
+
+def _rows(count, make):
+    return ({'id': i, **make(i)} for i in range(1, count + 1))
+
+
+def generate(episodes, guests, appearances, restaurants=0, pizzas=0, menu_items=0, seed=0,
+             chunk_size=10000, log=print):
+    """Replace the data with a synthetic dataset; needs an app context.
+
+    The same arguments always produce the same rows. Summary, search and
+    ingredient tables are filled by their triggers as the rows go in. The
+    change feed is truncated afterwards, so feeds that started before the
+    new data answer 410 and resync.
+    """
+    from app.changelog import latest, truncate
+    from app.models import Pizza, Restaurant, RestaurantPizza
+
+    rng = random.Random(seed)
+    tables = (
+        (Episode, _rows(episodes, lambda i: {
+            'date': FIRST_EPISODE + timedelta(days=i - 1), 'number': i,
+        })),
+        (Guest, _rows(guests, lambda i: {
+            'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}',
+            'occupation': rng.choice(OCCUPATIONS),
+        })),
+        (Appearance, ({'episode_id': e, 'guest_id': g, 'rating': rng.randint(1, 5)}
+                      for e, g in _spread(appearances, episodes, guests, rng))),
+        (Restaurant, _rows(restaurants, lambda i: {
+            'name': f'{rng.choice(LAST_NAMES)} Pizza {i}', 'capacity': rng.randint(10, 200),
+        })),
+        (Pizza, _rows(pizzas, lambda i: {
+            'name': f'Pizza {i}', 'ingredients': ','.join(rng.sample(INGREDIENTS, rng.randint(2, 5))),
+        })),
+        (RestaurantPizza, ({'restaurant_id': r, 'pizza_id': p, 'price': rng.randint(1, 30)}
+                           for r, p in _spread(menu_items, restaurants, pizzas, rng))),
+    )
+
+    for model, _ in reversed(tables):
+        db.session.execute(delete(model))
+    db.session.commit()
+
+    for model, rows in tables:
+        started = time.perf_counter()
+        count = 0
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                db.session.execute(insert(model), chunk)
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            db.session.execute(insert(model), chunk)
+            count += len(chunk)
+        db.session.commit()
+        elapsed = time.perf_counter() - started
+        log(f'{model.__tablename__:>18}: {count:>9} rows in {elapsed:6.1f}s ({count / max(elapsed, 1e-9):,.0f} rows/s)')
+
+    connection = db.session.connection()
+    truncate(connection, latest(connection))
+    db.session.commit()
+
+
+def count(value):
+    """An int with an optional k/M suffix: ``50000``, ``200k``, ``2M``."""
+    multiplier = {'k': 1000, 'm': 1000000}.get(value[-1:].lower(), 1)
+    try:
+        return int(float(value[:-1] if multiplier > 1 else value) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'not a count: {value!r}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Seed the database (sample data unless sizes are given).')
+    parser.add_argument('--episodes', type=count)
+    parser.add_argument('--guests', type=count)
+    parser.add_argument('--appearances', type=count)
+    parser.add_argument('--restaurants', type=count)
+    parser.add_argument('--pizzas', type=count)
+    parser.add_argument('--menu-items', type=count, help='restaurant_pizzas rows')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=count, default=10000)
+    args = parser.parse_args(argv)
+
+    sizes = {k: getattr(args, k) for k in ('episodes', 'guests', 'appearances', 'restaurants', 'pizzas', 'menu_items')}
+    if all(v is None for v in sizes.values()):
+        seed()
+        return
+    sizes = {k: v or 0 for k, v in sizes.items()}
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        try:
+            generate(**sizes, seed=args.seed, chunk_size=args.chunk_size)
+        except ValueError as e:
+            parser.error(str(e))
+    print(f'Seeded database with synthetic data (seed {args.seed})')
+
+
 if __name__ == '__main__':
-    seed()
+    main(sys.argv[1:])
@@ -0,0 +1,109 @@
+import contextlib
+import sqlite3
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+
+
+class QueryCounter:
+    """Collects the SQL statements executed while it is active."""
+
+    def __init__(self):
+        self.statements = []
+        self.parameters = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+TEST_CONFIG = {'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'}
+
+
+@pytest.fixture(scope='session')
+def database_template():
+    """Return ``get(seed=None)``: an in-memory database with the schema, built once.
+
+    ``seed`` is a callable run in an app context after ``create_all``; each
+    distinct one gets its own template, kept for the whole session.
+    """
+    templates = {}
+
+    def get(seed=None):
+        if seed not in templates:
+            app = create_app(TEST_CONFIG)
+            with app.app_context():
+                db.create_all()
+                if seed is not None:
+                    seed()
+                    db.session.commit()
+                template = sqlite3.connect(':memory:', check_same_thread=False)
+                raw = db.engine.raw_connection()
+                try:
+                    raw.driver_connection.backup(template)
+                finally:
+                    raw.close()
+                db.session.remove()
+            templates[seed] = template
+        return templates[seed]
+
+    yield get
+    for template in templates.values():
+        template.close()
+
+
+@pytest.fixture
+def clone_app(database_template):
+    """Return ``clone(seed=None, config=None)``: a new app on a copy of a template.
+
+    Copying a template with the SQLite backup API is much cheaper than
+    ``create_all`` (and any seeding) for every test.
+    """
+    def clone(seed=None, config=None):
+        app = create_app({**TEST_CONFIG, **(config or {})})
+        with app.app_context():
+            raw = db.engine.raw_connection()
+            try:
+                database_template(seed).backup(raw.driver_connection)
+            finally:
+                raw.close()
+        return app
+
+    return clone
+
+
+@pytest.fixture
+def app(clone_app):
+    yield clone_app()
+
+
+@pytest.fixture
+def count_queries(app):
+    """Return a context manager counting queries issued against the app engine.
+
+    Usage::
+
+        with count_queries() as counter:
+            client.get('/episodes/1')
+        assert counter.count == 2
+    """
+    with app.app_context():
+        engine = db.engine
+
+    @contextlib.contextmanager
+    def _count():
+        counter = QueryCounter()
+
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            counter.statements.append(statement)
+            counter.parameters.append(parameters[0] if executemany else parameters)
+
+        event.listen(engine, 'before_cursor_execute', _before_execute)
+        try:
+            yield counter
+        finally:
+            event.remove(engine, 'before_cursor_execute', _before_execute)
+
+    return _count
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('quart')
+pytest.importorskip('aiosqlite')
+pytest.importorskip('greenlet')
+
+from app import create_app, db  # noqa: E402
+from app.aio import create_async_app  # noqa: E402
+from app.models import Appearance, Episode, Guest, Pizza, Restaurant, RestaurantPizza  # noqa: E402
+
+
+@pytest.fixture
+def apps(tmp_path):
+    config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path}/lateshow.db', 'RESPONSE_CACHE_BACKEND': 'null'}
+    sync_app = create_app(config)
+    with sync_app.app_context():
+        db.create_all()
+        ep = Episode(date='1/11/99', number=1)
+        g = Guest(name='Michael J. Fox', occupation='actor')
+        r = Restaurant(name='Downtown Pizza', capacity=80)
+        p = Pizza(name='Margherita', ingredients='tomato,basil')
+        db.session.add_all([
+            ep, g, r, p, Guest(name='Sandra Bernhard', occupation='Comedian'),
+            Appearance(rating=4, episode=ep, guest=g),
+            RestaurantPizza(price=12, restaurant=r, pizza=p),
+        ])
+        db.session.commit()
+    async_app = create_async_app(config)
+    yield sync_app, async_app
+    asyncio.run(async_app.extensions['async_engine'].dispose())
+
+
+def _async_call(app, method, path, **kwargs):
+    async def call():
+        client = app.test_client()
+        rv = await getattr(client, method)(path, **kwargs)
+        return rv.status_code, await rv.get_data(as_text=True), rv.headers
+    return asyncio.run(call())
+
+
+@pytest.mark.parametrize('path', [
+    '/', '/episodes', '/episodes/1', '/episodes/9', '/guests', '/guests?limit=1',
+    '/guests?limit=zero', '/restaurants', '/restaurants/1', '/pizzas',
+    '/guests?q=fox', '/guests?occupation=COMEDIAN', '/episodes?min_rating=4', '/pizzas?ingredient=basil',
+    '/guests?min_rating=x', '/episodes?fields=id,number', '/episodes?include=appearances.guest&limit=1',
+    '/episodes/1?fields=number,appearances.guest.name', '/restaurants/1?fields=pizzas.price', '/guests?fields=age',
+    '/episodes?ids=1,9,1', '/restaurants?ids=1&fields=name,pizzas.price', '/guests?ids=2,1', '/episodes?ids=1&limit=2',
+])
+def test_get_parity(apps, path):
+    sync_app, async_app = apps
+    expected = sync_app.test_client().get(path)
+    status, body, headers = _async_call(async_app, 'get', path)
+    assert status == expected.status_code
+    assert sync_app.json.loads(body) == expected.get_json()
+    assert headers.get('Link') == expected.headers.get('Link')
+
+
+def test_stream_ndjson(apps):
+    _, async_app = apps
+    status, body, headers = _async_call(async_app, 'get', '/guests?stream=ndjson')
+    assert status == 200
+    assert headers['Content-Type'] == 'application/x-ndjson'
+    assert len(body.splitlines()) == 2
+
+
+@pytest.mark.parametrize('path, payload', [
+    ('/appearances', {'rating': 9, 'episode_id': 1}),
+    ('/appearances', {'rating': 3, 'episode_id': 1, 'guest_id': 99}),
+    ('/restaurant_pizzas', {'price': 0, 'restaurant_id': 1, 'pizza_id': 1}),
+    ('/appearances', {'rating': 3, 'episode_id': 1, 'guest_id': 1}),
+    ('/restaurant_pizzas', {'price': 9, 'restaurant_id': 7, 'pizza_id': 8}),
+])
+def test_write_validation_parity(apps, path, payload):
+    sync_app, async_app = apps
+    expected = sync_app.test_client().post(path, json=payload)
+    status, body, _ = _async_call(async_app, 'post', path, json=payload)
+    assert (status, sync_app.json.loads(body)) == (expected.status_code, expected.get_json())
+
+
+def test_async_writes_bump_sync_etags(apps):
+    sync_app, async_app = apps
+    client = sync_app.test_client()
+    etag = client.get('/episodes/1').headers['ETag']
+
+    status, body, _ = _async_call(async_app, 'post', '/appearances', json={'rating': 5, 'episode_id': 1, 'guest_id': 2})
+    assert status == 201
+    data = sync_app.json.loads(body)
+    assert data['guest']['name'] == 'Sandra Bernhard'
+    assert data['episode'] == {'id': 1, 'date': '1999-01-11', 'number': 1}
+
+    rv = client.get('/episodes/1', headers={'If-None-Match': etag})
+    assert rv.status_code == 200
+    assert len(rv.get_json()['appearances']) == 2
+
+
+def test_async_upsert(apps):
+    sync_app, async_app = apps
+    payload = {'price': 15, 'restaurant_id': 1, 'pizza_id': 1}
+    status, body, _ = _async_call(async_app, 'put', '/restaurant_pizzas', json=payload)
+    assert status == 200
+    assert sync_app.json.loads(body)['price'] == 15
+    assert sync_app.test_client().get('/restaurants/1').get_json()['pizzas'][0]['price'] == 15
+
+
+def test_delete_restaurant(apps):
+    sync_app, async_app = apps
+    status, body, _ = _async_call(async_app, 'delete', '/restaurants/1')
+    assert status == 200
+    assert sync_app.json.loads(body)['pizzas'][0]['pizza']['name'] == 'Margherita'
+    assert sync_app.test_client().get('/restaurants/1').status_code == 404
+
+
+
+def test_delete_episode(apps):
+    sync_app, async_app = apps
+    expected = sync_app.test_client().get('/episodes/1').get_json()
+    status, body, _ = _async_call(async_app, 'delete', '/episodes/1')
+    assert status == 200
+    assert sync_app.json.loads(body) == expected
+    assert sync_app.test_client().get('/episodes/1').status_code == 404
+    assert _async_call(async_app, 'delete', '/episodes/1')[0] == 404
+
+
+def test_delete_guest(apps):
+    sync_app, async_app = apps
+    status, body, _ = _async_call(async_app, 'delete', '/guests/1')
+    assert status == 200
+    assert sync_app.json.loads(body) == {'id': 1, 'name': 'Michael J. Fox', 'occupation': 'actor'}
+    # the guest's appearance went with it through the cascade
+    assert sync_app.test_client().get('/episodes/1').get_json()['appearances'] == []
+    assert _async_call(async_app, 'delete', '/guests/1')[0] == 404
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from app import db
+from app.models import Appearance, Episode, Guest, Pizza, Restaurant, RestaurantPizza
+
+
+@pytest.fixture
+def client(app):
+    app.config['BULK_CHUNK_SIZE'] = 2
+    with app.app_context():
+        db.session.add_all([
+            Episode(date='1/11/99', number=1),
+            Episode(date='1/12/99', number=2),
+            Guest(name='Michael J. Fox', occupation='actor'),
+            Guest(name='Sandra Bernhard', occupation='Comedian'),
+            *(Guest(name=f'Guest {i}', occupation='actor') for i in range(3, 6)),
+            Restaurant(name='Downtown Pizza', capacity=80),
+            Pizza(name='Margherita', ingredients='tomato,basil'),
+            *(Pizza(name=f'Pizza {i}', ingredients='tomato') for i in range(2, 11)),
+        ])
+        db.session.commit()
+    return app.test_client()
+
+
+def _count(app, model):
+    with app.app_context():
+        return db.session.query(model).count()
+
+
+def test_bulk_appearances_json(client):
+    rows = [{'rating': r, 'episode_id': 1 + r % 2, 'guest_id': r} for r in range(1, 6)]
+    rv = client.post('/appearances/bulk', json=rows)
+    assert rv.status_code == 201
+    data = rv.get_json()
+    assert data['created'] == 5
+    assert data['ids'] == sorted(data['ids'])
+    assert _count(client.application, Appearance) == 5
+
+
+def test_bulk_restaurant_pizzas_ndjson(client):
+    body = '\n'.join(json.dumps({'price': p, 'restaurant_id': 1, 'pizza_id': p - 4}) for p in (5, 6, 7)) + '\n'
+    rv = client.post('/restaurant_pizzas/bulk', data=body, content_type='application/x-ndjson')
+    assert rv.status_code == 201
+    assert rv.get_json()['created'] == 3
+    assert len(client.get('/restaurants/1').get_json()['pizzas']) == 3
+
+
+def test_bulk_reports_every_bad_row_and_inserts_nothing(client):
+    rows = [
+        {'rating': 3, 'episode_id': 1, 'guest_id': 1},
+        {'rating': 9, 'episode_id': 1, 'guest_id': 1},
+        {'rating': 3, 'episode_id': 42, 'guest_id': 43},
+        {'episode_id': 1},
+        'nope',
+    ]
+    rv = client.post('/appearances/bulk', json=rows)
+    assert rv.status_code == 422
+    assert rv.get_json()['errors'] == [
+        {'index': 1, 'errors': ['rating must be between 1 and 5']},
+        {'index': 2, 'errors': ['episode not found', 'guest not found']},
+        {'index': 3, 'errors': ['rating is required', 'guest_id is required']},
+        {'index': 4, 'errors': ['appearance must be an object']},
+    ]
+    assert _count(client.application, Appearance) == 0
+
+
+def test_bulk_existence_checks_are_set_based(client, count_queries):
+    client.application.config['BULK_CHUNK_SIZE'] = 100
+    rows = [{'price': 10, 'restaurant_id': 1, 'pizza_id': p} for p in range(1, 11)]
+    with count_queries() as counter:
+        rv = client.post('/restaurant_pizzas/bulk', json=rows)
+    assert rv.status_code == 201
+    lookups = [s for s in counter.statements if s.lstrip().upper().startswith('SELECT')]
+    assert len(lookups) == 2
+    assert _count(client.application, RestaurantPizza) == 10
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'json': {'rating': 3}},
+    {'data': '{"rating": 3}\nnot json\n', 'content_type': 'application/x-ndjson'},
+])
+def test_bulk_rejects_malformed_body(client, kwargs):
+    rv = client.post('/appearances/bulk', **kwargs)
+    assert rv.status_code == 400
+
+
+def test_bulk_duplicates_are_rejected_by_the_unique_index(client):
+    assert client.post('/appearances/bulk', json=[{'rating': 3, 'episode_id': 1, 'guest_id': 1}]).status_code == 201
+    rows = [
+        {'rating': 4, 'episode_id': 2, 'guest_id': 2},
+        {'rating': 5, 'episode_id': 1, 'guest_id': 1},
+        {'rating': 2, 'episode_id': 2, 'guest_id': 2},
+        {'rating': 2, 'episode_id': 2, 'guest_id': 3},
+    ]
+    rv = client.post('/appearances/bulk', json=rows)
+    assert rv.status_code == 422
+    assert rv.get_json()['errors'] == [
+        {'index': 1, 'errors': ['guest already appears in this episode']},
+        {'index': 2, 'errors': ['guest already appears in this episode']},
+    ]
+    assert _count(client.application, Appearance) == 1
@@ -0,0 +1,175 @@
+import fnmatch
+
+import pytest
+from sqlalchemy import insert
+
+from app import create_app, db
+from app.cache import MemoryCache, RedisCache
+from app.models import Appearance, Episode, Guest, Pizza, Restaurant, RestaurantPizza
+
+
+class FakeRedis:
+    """Just enough of redis-py for RedisCache."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match='*'):
+        return [k for k in list(self.data) if fnmatch.fnmatch(k, match)]
+
+
+def _seed(app):
+    with app.app_context():
+        db.session.add_all([
+            Episode(date='1/11/99', number=1),
+            Guest(name='Michael J. Fox', occupation='actor'),
+            Restaurant(name='Downtown Pizza', capacity=80),
+            Pizza(name='Margherita', ingredients='tomato,basil'),
+        ])
+        db.session.commit()
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def app(request):
+    backend = 'memory' if request.param == 'memory' else RedisCache(FakeRedis())
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'RESPONSE_CACHE_BACKEND': backend,
+    })
+    with app.app_context():
+        db.create_all()
+    _seed(app)
+    return app
+
+
+def _stats(client):
+    return client.get('/cache/stats').get_json()
+
+
+def test_second_read_is_a_hit(app, count_queries):
+    client = app.test_client()
+    first = client.get('/episodes/1')
+    with count_queries() as counter:
+        second = client.get('/episodes/1')
+    assert second.get_json() == first.get_json()
+    # only the ETag version lookup reaches the database
+    assert all('table_versions' in stmt for stmt in counter.statements)
+    stats = _stats(client)
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+
+def test_create_appearance_invalidates_episode(app):
+    client = app.test_client()
+    assert client.get('/episodes/1').get_json()['appearances'] == []
+    rv = client.post('/appearances', json={'rating': 5, 'episode_id': 1, 'guest_id': 1})
+    assert rv.status_code == 201
+    assert len(client.get('/episodes/1').get_json()['appearances']) == 1
+
+
+def test_create_restaurant_pizza_invalidates_restaurant(app):
+    client = app.test_client()
+    assert client.get('/restaurants/1').get_json()['pizzas'] == []
+    client.post('/restaurant_pizzas', json={'price': 9, 'restaurant_id': 1, 'pizza_id': 1})
+    assert len(client.get('/restaurants/1').get_json()['pizzas']) == 1
+
+
+def test_delete_restaurant_invalidates(app):
+    client = app.test_client()
+    assert client.get('/restaurants/1').status_code == 200
+    client.delete('/restaurants/1')
+    assert client.get('/restaurants/1').status_code == 404
+
+
+def test_failed_write_keeps_entries(app):
+    client = app.test_client()
+    client.get('/episodes/1')
+    client.post('/appearances', json={'rating': 9, 'episode_id': 1, 'guest_id': 1})
+    client.get('/episodes/1')
+    assert _stats(client)['hits'] == 1
+
+
+def test_bulk_insert_drops_namespace(app):
+    client = app.test_client()
+    client.get('/restaurants/1')
+    with app.app_context():
+        db.session.execute(insert(RestaurantPizza), [{'price': 5, 'restaurant_id': 1, 'pizza_id': 1}])
+        db.session.commit()
+    assert len(client.get('/restaurants/1').get_json()['pizzas']) == 1
+
+
+def test_guest_update_drops_episode_entries(app):
+    client = app.test_client()
+    with app.app_context():
+        db.session.add(Appearance(rating=4, episode_id=1, guest_id=1))
+        db.session.commit()
+    assert client.get('/episodes/1').get_json()['appearances'][0]['guest']['name'] == 'Michael J. Fox'
+    with app.app_context():
+        db.session.get(Guest, 1).name = 'Marty McFly'
+        db.session.commit()
+    assert client.get('/episodes/1').get_json()['appearances'][0]['guest']['name'] == 'Marty McFly'
+
+
+def test_memory_cache_lru_and_ttl(monkeypatch):
+    cache = MemoryCache(maxsize=2, ttl=10)
+    cache.set('a', b'1')
+    cache.set('b', b'2')
+    cache.get('a')
+    cache.set('c', b'3')
+    assert cache.get('b') is None
+    assert cache.get('a') == b'1'
+
+    now = [0.0]
+    monkeypatch.setattr('app.cache.time.monotonic', lambda: now[0])
+    cache.set('d', b'4')
+    now[0] = 11.0
+    assert cache.get('d') is None
+
+
+@pytest.mark.parametrize('method', ['post', 'put'])
+def test_single_row_writes_drop_only_their_parent(app, method):
+    client = app.test_client()
+    with app.app_context():
+        db.session.add_all([Episode(date='1/12/99', number=2), Restaurant(name='Uptown Diner', capacity=40)])
+        db.session.commit()
+    for path in ('/episodes/1', '/episodes/2', '/restaurants/1', '/restaurants/2'):
+        client.get(path)
+    getattr(client, method)('/appearances', json={'rating': 5, 'episode_id': 1, 'guest_id': 1})
+    getattr(client, method)('/restaurant_pizzas', json={'price': 9, 'restaurant_id': 1, 'pizza_id': 1})
+    cache = app.extensions['response_cache']
+    # only the written parents' entries were dropped
+    assert [key for key in ('episode:1', 'episode:2', 'restaurant:1', 'restaurant:2') if cache._get(key)] == [
+        'episode:2', 'restaurant:2',
+    ]
+    assert len(client.get('/episodes/1').get_json()['appearances']) == 1
+    assert len(client.get('/restaurants/1').get_json()['pizzas']) == 1
+
+
+def test_entries_from_older_versions_are_misses(tmp_path):
+    # two workers on one database; worker 2's commits never reach worker 1's cache hooks
+    config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path}/shared.db', 'RESPONSE_CACHE_BACKEND': 'memory'}
+    worker1, worker2 = create_app(config), create_app(config)
+    with worker1.app_context():
+        db.create_all()
+    _seed(worker1)
+    client = worker1.test_client()
+    stale = client.get('/episodes/1')
+    assert client.get('/episodes/1').get_json()['appearances'] == []
+    assert worker2.test_client().post('/appearances', json={'rating': 5, 'episode_id': 1, 'guest_id': 1}).status_code == 201
+
+    fresh = client.get('/episodes/1', headers={'If-None-Match': stale.headers['ETag']})
+    assert fresh.status_code == 200
+    assert len(fresh.get_json()['appearances']) == 1
+    assert client.get('/episodes/1', headers={'If-None-Match': fresh.headers['ETag']}).status_code == 304
+    assert len(client.get('/episodes/1').get_json()['appearances']) == 1
+    assert _stats(client)['hits'] == 2
@@ -0,0 +1,225 @@
+import json
+
+import pytest
+from sqlalchemy import event, insert, text
+
+from app import db
+from app.changelog import compact, horizon, latest, truncate
+from app.models import Episode, Guest, Pizza, Restaurant
+
+
+def seed_shows():
+    db.session.add_all([
+        Episode(date='1/11/99', number=1),
+        Guest(name='Michael J. Fox', occupation='actor'),
+        Guest(name='Sandra Bernhard', occupation='Comedian'),
+        Restaurant(name='Downtown Pizza', capacity=80),
+        Pizza(name='Margherita', ingredients='tomato,basil'),
+    ])
+
+
+@pytest.fixture
+def app(clone_app):
+    return clone_app(seed_shows, {'CHANGES_POLL_INTERVAL': 0.01, 'CHANGES_STREAM_MAX_SECONDS': 0})
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def _since(app):
+    with app.app_context():
+        return latest(db.session)
+
+
+def _feed(client, since, **args):
+    rv = client.get('/changes', query_string={'since': since, **args})
+    assert rv.status_code == 200
+    return rv.get_json()
+
+
+def _ops(feed):
+    return [(c['table'], c['id'], c['op']) for c in feed['changes']]
+
+
+def test_seeded_rows_are_in_the_feed(client):
+    feed = _feed(client, 0)
+    assert _ops(feed) == [
+        ('episodes', 1, 'insert'), ('guests', 1, 'insert'), ('guests', 2, 'insert'),
+        ('pizzas', 1, 'insert'), ('restaurants', 1, 'insert'),
+    ]
+    assert [c['seq'] for c in feed['changes']] == [1, 2, 3, 4, 5]
+    assert feed['next'] == 5 and feed['more'] is False
+    assert feed['changes'][0]['at']
+
+
+def test_every_write_path_is_recorded(client, app):
+    since = _since(app)
+    assert client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 1}).status_code == 201
+    assert client.put('/appearances', json={'rating': 2, 'episode_id': 1, 'guest_id': 1}).status_code == 200
+    assert client.post('/appearances/bulk', json=[{'rating': 3, 'episode_id': 1, 'guest_id': 2}]).status_code == 201
+    assert client.put('/restaurant_pizzas', json={'price': 9, 'restaurant_id': 1, 'pizza_id': 1}).status_code == 200
+    # cascades to both appearances
+    assert client.delete('/episodes/1').status_code == 200
+    assert _ops(_feed(client, since)) == [
+        ('appearances', 1, 'insert'),
+        ('appearances', 1, 'update'),
+        ('appearances', 2, 'insert'),
+        ('restaurant_pizzas', 1, 'insert'),
+        ('appearances', 1, 'delete'),
+        ('appearances', 2, 'delete'),
+        ('episodes', 1, 'delete'),
+    ]
+
+
+def test_rolled_back_writes_leave_no_entries(client, app):
+    since = _since(app)
+    with app.app_context():
+        db.session.add(Guest(name='Tracey Ullman', occupation='actress'))
+        db.session.flush()
+        db.session.rollback()
+    assert client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 9}).status_code == 422
+    assert _feed(client, since)['changes'] == []
+
+
+def test_queued_writes_are_recorded(clone_app):
+    app = clone_app(seed_shows, {'WRITE_QUEUE': 'always'})
+    client = app.test_client()
+    since = _since(app)
+    try:
+        assert client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 1}).status_code == 202
+        app.extensions['write_queue'].flush()
+    finally:
+        app.extensions['write_queue'].close()
+    assert _ops(_feed(client, since)) == [('appearances', 1, 'insert')]
+
+
+def test_paging_and_table_filter(client, app):
+    with app.app_context():
+        db.session.execute(insert(Guest), [{'name': f'Guest {i}', 'occupation': 'actor'} for i in range(5)])
+        db.session.commit()
+    first = _feed(client, 0, limit=4)
+    assert [c['seq'] for c in first['changes']] == [1, 2, 3, 4]
+    assert first['next'] == 4 and first['more'] is True
+    rest = _feed(client, first['next'], limit=100)
+    assert [c['seq'] for c in rest['changes']] == list(range(5, 11))
+    assert rest['next'] == 10 and rest['more'] is False
+
+    feed = _feed(client, 0, tables='episodes,pizzas')
+    assert _ops(feed) == [('episodes', 1, 'insert'), ('pizzas', 1, 'insert')]
+    # entries the filter skipped are not read again
+    assert feed['next'] == 10
+
+
+def test_commits_between_reads_are_not_skipped(client, app):
+    reads = []
+
+    def commit_before_second_read(conn, cursor, statement, parameters, context, executemany):
+        # a write from elsewhere lands between the feed's two reads of changes
+        if 'FROM changes ' in statement or statement.rstrip().endswith('FROM changes'):
+            reads.append(statement)
+            if len(reads) == 2:
+                cursor.connection.execute("INSERT INTO guests (name, occupation) VALUES ('Tracey Ullman', 'actress')")
+                cursor.connection.commit()
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', commit_before_second_read)
+        try:
+            feed = _feed(client, 0)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', commit_before_second_read)
+    assert len(reads) == 2
+    assert [c['seq'] for c in feed['changes']] == [1, 2, 3, 4, 5]
+    assert feed['next'] == 5
+    assert _ops(_feed(client, feed['next'])) == [('guests', 3, 'insert')]
+
+
+@pytest.mark.parametrize('query, error', [
+    ('since=x', 'since must be an integer'),
+    ('since=-1', 'since must be at least 0'),
+    ('limit=0', 'limit must be at least 1'),
+    (f'since={2 ** 63}', f'since must be at most {2 ** 63 - 1}'),
+    (f'limit={2 ** 63}', f'limit must be at most {2 ** 63 - 1}'),
+    ('tables=guests,nope', 'unknown tables: nope'),
+])
+def test_bad_feed_args(client, query, error):
+    for path in ('/changes', '/changes/stream'):
+        rv = client.get(f'{path}?{query}')
+        assert rv.status_code == 400
+        assert rv.get_json() == {'error': error}
+
+
+def test_collapse_keeps_the_newest_entry_per_row(client, app):
+    client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 1})
+    client.put('/appearances', json={'rating': 2, 'episode_id': 1, 'guest_id': 1})
+    client.put('/appearances', json={'rating': 3, 'episode_id': 1, 'guest_id': 1})
+    before = _feed(client, 0)
+    with app.app_context():
+        with db.engine.begin() as connection:
+            assert compact(connection) == {'collapsed': 2, 'truncated': 0, 'horizon': 0}
+    after = _feed(client, 0)
+    assert after['changes'] == [c for c in before['changes'] if c['seq'] != 6 and c['seq'] != 7]
+    assert after['changes'][-1]['op'] == 'update'
+    assert after['next'] == before['next']
+
+
+def test_truncated_feeds_answer_410(client, app):
+    with app.app_context():
+        with db.engine.begin() as connection:
+            # ages the first three entries past the retention window
+            connection.execute(text("UPDATE changes SET changed_at = datetime('now', '-8 days') WHERE seq <= 3"))
+            assert compact(connection, retention_days=7) == {'collapsed': 0, 'truncated': 3, 'horizon': 3}
+    rv = client.get('/changes?since=2')
+    assert rv.status_code == 410
+    assert rv.get_json()['horizon'] == 3
+    assert client.get('/changes/stream?since=0').status_code == 410
+    assert [c['seq'] for c in _feed(client, 3)['changes']] == [4, 5]
+
+
+def test_seq_is_not_reused_after_truncation(client, app):
+    with app.app_context():
+        with db.engine.begin() as connection:
+            truncate(connection, latest(connection))
+            assert horizon(connection) == 5
+    client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 1})
+    assert [c['seq'] for c in _feed(client, 5)['changes']] == [6]
+
+
+def _events(rv):
+    frames = rv.get_data(as_text=True).strip().split('\n\n')
+    events = []
+    for frame in frames:
+        fields = dict(line.split(': ', 1) for line in frame.split('\n') if not line.startswith(':'))
+        if fields.get('event') == 'change':
+            events.append((int(fields['id']), json.loads(fields['data'])))
+    return frames, events
+
+
+def test_stream_sends_server_sent_events(client):
+    rv = client.get('/changes/stream?since=3')
+    assert rv.status_code == 200
+    assert rv.mimetype == 'text/event-stream'
+    assert rv.headers['Cache-Control'] == 'no-cache'
+    frames, events = _events(rv)
+    assert frames[0] == 'retry: 10'
+    assert [seq for seq, _ in events] == [4, 5]
+    assert events[1][1] == {**events[1][1], 'seq': 5, 'table': 'restaurants', 'id': 1, 'op': 'insert'}
+
+
+def test_stream_resumes_from_last_event_id(client):
+    rv = client.get('/changes/stream', headers={'Last-Event-ID': '4'})
+    assert [seq for seq, _ in _events(rv)[1]] == [5]
+
+
+def test_stream_polls_in_batches(client):
+    _, events = _events(client.get('/changes/stream?since=0&limit=2'))
+    assert [seq for seq, _ in events] == [1, 2, 3, 4, 5]
+
+
+def test_compact_command(app):
+    app.test_client().put('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 1})
+    app.test_client().put('/appearances', json={'rating': 5, 'episode_id': 1, 'guest_id': 1})
+    result = app.test_cli_runner().invoke(args=['changes', 'compact'])
+    assert result.exit_code == 0
+    assert result.output == 'Collapsed 1, truncated 0; horizon is seq 0\n'
@@ -0,0 +1,70 @@
+import gzip
+
+import pytest
+
+from app import db
+from app.models import Guest
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        db.session.add_all([Guest(name=f'Guest {i}', occupation='comedian') for i in range(100)])
+        db.session.commit()
+    return app.test_client()
+
+
+def test_gzip_when_accepted(client):
+    plain = client.get('/guests')
+    rv = client.get('/guests', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert rv.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in rv.headers['Vary']
+    assert int(rv.headers['Content-Length']) == len(rv.get_data()) < len(plain.get_data())
+    assert gzip.decompress(rv.get_data()) == plain.get_data()
+
+
+def test_identity_without_accept_encoding(client):
+    rv = client.get('/guests')
+    assert 'Content-Encoding' not in rv.headers
+    assert 'Accept-Encoding' in rv.headers['Vary']
+    rv = client.get('/guests', headers={'Accept-Encoding': 'gzip;q=0'})
+    assert 'Content-Encoding' not in rv.headers
+
+
+def test_small_bodies_and_errors_are_not_compressed(client):
+    rv = client.get('/guests?limit=1', headers={'Accept-Encoding': 'gzip'})
+    assert len(rv.get_data()) < 1024
+    assert 'Content-Encoding' not in rv.headers
+    rv = client.get('/guests?limit=x', headers={'Accept-Encoding': 'gzip'})
+    assert rv.status_code == 400
+    assert 'Content-Encoding' not in rv.headers
+
+
+def test_threshold_is_configurable(app, client):
+    app.config['COMPRESS_MIN_SIZE'] = 0
+    rv = client.get('/guests?limit=1', headers={'Accept-Encoding': 'gzip'})
+    assert rv.headers['Content-Encoding'] == 'gzip'
+    app.config['COMPRESS_MIN_SIZE'] = None
+    rv = client.get('/guests', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in rv.headers
+
+
+def test_streamed_responses_pass_through(client):
+    rv = client.get('/guests?stream=1', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in rv.headers
+    assert rv.get_json()[0]['name'] == 'Guest 0'
+
+
+def test_encoded_etag_variants_revalidate(client):
+    plain = client.get('/guests')
+    rv = client.get('/guests', headers={'Accept-Encoding': 'gzip'})
+    etag = rv.headers['ETag']
+    assert etag == plain.headers['ETag'][:-1] + '-gzip"'
+
+    again = client.get('/guests', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert 'Content-Encoding' not in again.headers
+
+    identity = client.get('/guests', headers={'If-None-Match': plain.headers['ETag']})
+    assert identity.status_code == 304
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import event, text
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Guest
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    path = tmp_path / 'lateshow.db'
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLALCHEMY_READ_URI': f'sqlite:///file:{path}?mode=ro&uri=true',
+        'RESPONSE_CACHE_BACKEND': 'null',
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add(Guest(name='Michael J. Fox', occupation='actor'))
+        db.session.commit()
+    return app
+
+
+def test_profiles_by_name_and_class():
+    assert create_app('testing').config['SQLALCHEMY_DATABASE_URI'] == 'sqlite:///:memory:'
+    assert create_app(TestingConfig).testing
+
+
+def test_pragmas_applied(file_app):
+    with file_app.app_context():
+        with db.engine.connect() as conn:
+            assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert conn.execute(text('PRAGMA synchronous')).scalar() == 1
+            assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+        with file_app.extensions['read_engine'].connect() as conn:
+            assert conn.execute(text('PRAGMA query_only')).scalar() == 1
+
+
+def test_reads_use_read_engine_and_writes_primary(file_app):
+    seen = []
+    with file_app.app_context():
+        engines = {'primary': db.engine, 'read': file_app.extensions['read_engine']}
+    listeners = {}
+    for name, engine in engines.items():
+        listeners[name] = lambda *args, name=name: seen.append(name)
+        event.listen(engine, 'before_cursor_execute', listeners[name])
+    try:
+        client = file_app.test_client()
+        assert client.get('/guests').status_code == 200
+        assert set(seen) == {'read'}
+
+        seen.clear()
+        rv = client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 1})
+        assert rv.status_code == 422
+        assert set(seen) == {'primary'}
+    finally:
+        for name, engine in engines.items():
+            event.remove(engine, 'before_cursor_execute', listeners[name])
@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import func, select
+
+from app import db
+from app.models import Appearance, Episode, Guest, GuestStats, Pizza, Restaurant, RestaurantPizza
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        e1, e2 = Episode(date='1/11/99', number=1), Episode(date='1/12/99', number=2)
+        g1, g2 = Guest(name='Michael J. Fox', occupation='actor'), Guest(name='Tracey Ullman', occupation='actress')
+        r = Restaurant(name='Downtown Pizza', capacity=80)
+        pizzas = [Pizza(name=f'P{i}', ingredients='tomato') for i in range(20)]
+        db.session.add_all([
+            e1, e2, g1, g2, r, *pizzas,
+            Appearance(rating=4, episode=e1, guest=g1),
+            Appearance(rating=2, episode=e1, guest=g2),
+            Appearance(rating=5, episode=e2, guest=g1),
+            *[RestaurantPizza(price=10 + i, restaurant=r, pizza=p) for i, p in enumerate(pizzas)],
+        ])
+        db.session.commit()
+    return app.test_client()
+
+
+def _count(app, model):
+    with app.app_context():
+        return db.session.scalar(select(func.count()).select_from(model))
+
+
+def test_delete_restaurant_cascades_in_one_statement(client, count_queries):
+    expected = client.get('/restaurants/1').get_json()
+    with count_queries() as counter:
+        rv = client.delete('/restaurants/1')
+    assert rv.status_code == 200
+    assert rv.get_json() == expected
+    deletes = [s for s in counter.statements if s.lstrip().upper().startswith('DELETE')]
+    assert len(deletes) == 1
+    assert _count(client.application, RestaurantPizza) == 0
+    assert _count(client.application, Pizza) == 20
+
+
+def test_delete_episode(client):
+    expected = client.get('/episodes/1').get_json()
+    rv = client.delete('/episodes/1')
+    assert rv.status_code == 200
+    assert rv.get_json() == expected
+    assert client.get('/episodes/1').status_code == 404
+    assert _count(client.application, Appearance) == 1
+    # cascaded appearance deletes still run the stats triggers
+    assert client.get('/guests/2/stats').get_json()['appearance_count'] == 0
+    assert client.get('/guests/1/stats').get_json()['appearance_count'] == 1
+
+
+def test_delete_guest(client):
+    rv = client.delete('/guests/1')
+    assert rv.get_json() == {'id': 1, 'name': 'Michael J. Fox', 'occupation': 'actor'}
+    assert [a['guest_id'] for a in client.get('/episodes/1').get_json()['appearances']] == [2]
+    assert client.get('/episodes/2/stats').get_json()['appearance_count'] == 0
+    with client.application.app_context():
+        assert db.session.get(GuestStats, 1) is None
+
+
+def test_delete_bumps_cascaded_table_versions(client):
+    etag = client.get('/episodes/1').headers['ETag']
+    client.delete('/guests/2')
+    assert client.get('/episodes/1', headers={'If-None-Match': etag}).status_code == 200
+
+
+@pytest.mark.parametrize('path', ['/episodes/9', '/guests/9', '/restaurants/9'])
+def test_delete_missing(client, path):
+    assert client.delete(path).status_code == 404
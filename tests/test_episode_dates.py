@@ -0,0 +1,82 @@
+from datetime import date
+
+import pytest
+
+from app import db
+from app.models import Episode, parse_date
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        db.session.add_all([
+            Episode(date='1/12/99', number=2),
+            Episode(date='1/11/99', number=1),
+            Episode(date=date(1999, 1, 11), number=3),
+            Episode(date='2000-03-01', number=4),
+            Episode(date='12/31/1999', number=5),
+        ])
+        db.session.commit()
+    return app.test_client()
+
+
+def _numbers(rv):
+    assert rv.status_code == 200, rv.get_data(as_text=True)
+    return [row['number'] for row in rv.get_json()]
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1/11/99', date(1999, 1, 11)),
+    ('01/11/1999', date(1999, 1, 11)),
+    ('1999-01-11', date(1999, 1, 11)),
+    ('3/1/00', date(2000, 3, 1)),
+    (date(1999, 1, 11), date(1999, 1, 11)),
+])
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
+
+
+@pytest.mark.parametrize('value', ['someday', '13/40/99', None, 19990111])
+def test_parse_date_rejects(value):
+    with pytest.raises(ValueError):
+        parse_date(value)
+
+
+def test_dates_render_as_iso(client):
+    assert client.get('/episodes/2').get_json()['date'] == '1999-01-11'
+    assert client.get('/episodes').get_json()[0] == {'id': 1, 'date': '1999-01-12', 'number': 2}
+    body = client.get('/episodes?stream=ndjson').get_data(as_text=True)
+    assert '"date": "2000-03-01"' in body or '"date":"2000-03-01"' in body
+
+
+def test_sort_by_date_then_number(client):
+    assert _numbers(client.get('/episodes')) == [2, 1, 3, 4, 5]
+    assert _numbers(client.get('/episodes?sort=date')) == [1, 3, 2, 5, 4]
+
+
+def test_sorted_pages_follow_link(client):
+    seen = []
+    url = '/episodes?sort=date&limit=2'
+    while url:
+        rv = client.get(url)
+        seen.extend(_numbers(rv))
+        link = rv.headers.get('Link')
+        url = link[1:link.index('>')] if link else None
+    assert seen == [1, 3, 2, 5, 4]
+
+
+def test_date_range_is_inclusive(client):
+    assert _numbers(client.get('/episodes?sort=date&date_from=1999-01-12')) == [2, 5, 4]
+    assert _numbers(client.get('/episodes?sort=date&date_to=1999-12-31')) == [1, 3, 2, 5]
+    assert _numbers(client.get('/episodes?date_from=1/11/99&date_to=1999-01-11')) == [1, 3]
+
+
+@pytest.mark.parametrize('query, error', [
+    ('/episodes?sort=rating', 'sort must be one of: id, date'),
+    ('/guests?sort=date', 'sort must be one of: id'),
+    ('/episodes?date_from=soon', 'date_from must be a date (YYYY-MM-DD)'),
+])
+def test_bad_args(client, query, error):
+    rv = client.get(query)
+    assert rv.status_code == 400
+    assert rv.get_json() == {'error': error}
@@ -0,0 +1,68 @@
+import pytest
+
+from app import db
+from app.models import Episode, Guest, Pizza, Restaurant
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        db.session.add_all([
+            Episode(date='1/11/99', number=1),
+            Guest(name='Michael J. Fox', occupation='actor'),
+            Restaurant(name='Downtown Pizza', capacity=80),
+            Pizza(name='Margherita', ingredients='tomato,basil'),
+        ])
+        db.session.commit()
+    return app.test_client()
+
+
+@pytest.mark.parametrize('path', ['/', '/episodes', '/episodes/1', '/guests', '/restaurants', '/restaurants/1', '/pizzas'])
+def test_get_routes_answer_304(client, path):
+    rv = client.get(path)
+    assert rv.status_code == 200
+    etag = rv.headers['ETag']
+    assert not etag.startswith('W/')
+
+    rv = client.get(path, headers={'If-None-Match': etag})
+    assert rv.status_code == 304
+    assert rv.data == b''
+    assert rv.headers['ETag'] == etag
+
+
+def test_304_skips_orm_and_serializer(client, count_queries):
+    etag = client.get('/episodes/1').headers['ETag']
+    with count_queries() as counter:
+        rv = client.get('/episodes/1', headers={'If-None-Match': etag})
+    assert rv.status_code == 304
+    assert counter.count == 1
+    assert 'table_versions' in counter.statements[0]
+
+
+def test_write_changes_etag(client):
+    etag = client.get('/episodes/1').headers['ETag']
+    rv = client.post('/appearances', json={'rating': 5, 'episode_id': 1, 'guest_id': 1})
+    assert rv.status_code == 201
+    rv = client.get('/episodes/1', headers={'If-None-Match': etag})
+    assert rv.status_code == 200
+    assert rv.headers['ETag'] != etag
+
+
+def test_unrelated_write_keeps_etag(client):
+    etag = client.get('/guests').headers['ETag']
+    client.post('/restaurant_pizzas', json={'price': 9, 'restaurant_id': 1, 'pizza_id': 1})
+    assert client.get('/guests', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_etag_varies_with_query_and_id(client):
+    assert client.get('/guests').headers['ETag'] != client.get('/guests?limit=1').headers['ETag']
+    with client.application.app_context():
+        db.session.add(Episode(date='1/12/99', number=2))
+        db.session.commit()
+    assert client.get('/episodes/1').headers['ETag'] != client.get('/episodes/2').headers['ETag']
+
+
+def test_failed_write_does_not_bump(client):
+    etag = client.get('/episodes/1').headers['ETag']
+    client.post('/appearances', json={'rating': 5, 'episode_id': 1, 'guest_id': 99})
+    assert client.get('/episodes/1', headers={'If-None-Match': etag}).status_code == 304
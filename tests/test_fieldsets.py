@@ -0,0 +1,121 @@
+import pytest
+
+from app import db
+from app.fieldsets import parse_fieldset
+from app.models import Appearance, Episode, EpisodeStats, Guest, Pizza, Restaurant, RestaurantPizza
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        ep = Episode(date='1/11/99', number=1)
+        g1 = Guest(name='Michael J. Fox', occupation='actor')
+        g2 = Guest(name='Sandra Bernhard', occupation='Comedian')
+        r = Restaurant(name='Downtown Pizza', capacity=80)
+        p = Pizza(name='Margherita', ingredients='tomato,basil')
+        db.session.add_all([
+            ep, g1, g2, r, p, Episode(date='1/12/99', number=2),
+            Appearance(rating=4, episode=ep, guest=g1), Appearance(rating=2, episode=ep, guest=g2),
+            RestaurantPizza(price=12, restaurant=r, pizza=p),
+        ])
+        db.session.commit()
+    return app.test_client()
+
+
+@pytest.mark.parametrize('args, include, exclude', [
+    ({}, ('appearances.guest',), ()),
+    ({'include': ''}, (), ()),
+    ({'fields': 'id,number'}, (), ('date',)),
+    ({'fields': 'id,appearances.rating'}, ('appearances',),
+     ('appearances.id', 'appearances.guest_id', 'appearances.episode_id', 'date', 'number')),
+    ({'fields': 'appearances.guest.name'}, ('appearances.guest',), ('appearances.guest.id', 'appearances.guest.occupation')),
+    ({'include': 'appearances', 'fields': 'id,appearances'}, ('appearances',), ('date', 'number')),
+])
+def test_parse(app, args, include, exclude):
+    fieldset = parse_fieldset(args, Episode)
+    assert (fieldset.include, fieldset.exclude) == (include, exclude)
+
+
+@pytest.mark.parametrize('model, args, message', [
+    (Episode, {'fields': 'id,title'}, "unknown field 'title'"),
+    (Episode, {'fields': 'appearances.guest.age'}, "unknown field 'appearances.guest.age'"),
+    (Episode, {'include': 'guests'}, "unknown include 'guests'"),
+    (Episode, {'include': 'appearances.pizza'}, "unknown include 'appearances.pizza'"),
+    (Episode, {'fields': ','}, 'fields must name at least one field'),
+    (Pizza, {'include': 'restaurants'}, "unknown include 'restaurants'"),
+    (EpisodeStats, {'fields': 'rating'}, "unknown field 'rating'"),
+])
+def test_unknown_names_are_rejected(app, model, args, message):
+    with pytest.raises(ValueError, match=message):
+        parse_fieldset(args, model)
+
+
+def test_sparse_list_selects_only_those_columns(client, count_queries):
+    with count_queries() as counter:
+        rv = client.get('/episodes?fields=id,number')
+    assert rv.get_json() == [{'id': 1, 'number': 1}, {'id': 2, 'number': 2}]
+    select = [s for s in counter.statements if 'FROM episodes' in s]
+    assert len(select) == 1 and 'date' not in select[0]
+
+
+def test_list_include_eager_loads_per_page(client, count_queries):
+    with count_queries() as counter:
+        rv = client.get('/episodes?include=appearances.guest&fields=number,appearances.rating,'
+                        'appearances.guest,appearances.guest.name&limit=1')
+    assert rv.get_json() == [{'number': 1, 'appearances': [{'rating': 4, 'guest': {'name': 'Michael J. Fox'}},
+                                                          {'rating': 2, 'guest': {'name': 'Sandra Bernhard'}}]}]
+    assert rv.headers['X-Next-Cursor'] == '1'
+    # the page, then one select-in load of appearances joined to guests
+    assert len([s for s in counter.statements if 'table_versions' not in s]) == 2
+
+
+def test_list_include_streams(client):
+    # appearances is only passed through, so it keeps all its keys
+    rv = client.get('/guests?include=appearances.episode&fields=name,appearances.episode.number&stream=ndjson')
+    assert rv.get_data(as_text=True).splitlines() == [
+        '{"name":"Michael J. Fox","appearances":[{"id":1,"rating":4,"guest_id":1,"episode_id":1,"episode":{"number":1}}]}',
+        '{"name":"Sandra Bernhard","appearances":[{"id":2,"rating":2,"guest_id":2,"episode_id":1,"episode":{"number":1}}]}',
+    ]
+
+
+def test_detail_fields_skip_unrequested_relations(client, count_queries):
+    with count_queries() as counter:
+        rv = client.get('/episodes/1?fields=id,number')
+    assert rv.get_json() == {'id': 1, 'number': 1}
+    assert len([s for s in counter.statements if 'table_versions' not in s]) == 1
+    assert 'appearances' not in counter.statements[-1]
+
+    rv = client.get('/restaurants/1?fields=name,pizzas.price,pizzas.pizza.name')
+    assert rv.get_json() == {'name': 'Downtown Pizza', 'pizzas': [{'price': 12, 'pizza': {'name': 'Margherita'}}]}
+
+
+def test_detail_default_shape_is_unchanged(client):
+    full = client.get('/episodes/1').get_json()
+    assert full == client.get('/episodes/1?include=appearances.guest').get_json()
+    assert full['appearances'][0]['guest']['name'] == 'Michael J. Fox'
+
+
+def test_stats_fields(client):
+    rv = client.get('/episodes/1/stats?fields=appearance_count,average_rating')
+    assert rv.get_json() == {'appearance_count': 2, 'average_rating': 3.0}
+    assert client.get('/guests/9/stats?fields=min_rating').status_code == 404
+
+
+@pytest.mark.parametrize('path', [
+    '/episodes?fields=nope', '/episodes/1?include=guest', '/restaurants/1?fields=pizzas.cost',
+    '/guests/1/stats?fields=price',
+])
+def test_bad_shapes_are_400(client, path):
+    rv = client.get(path)
+    assert rv.status_code == 400
+    assert 'unknown' in rv.get_json()['error']
+
+
+def test_to_dict_exclude(app):
+    with app.app_context():
+        guest = Guest(id=5, name='Grace', occupation='chef')
+        assert guest.to_dict(exclude=('occupation',)) == {'id': 5, 'name': 'Grace'}
+        stats = EpisodeStats(episode_id=1, row_count=2, value_sum=7, value_min=3, value_max=4)
+        assert stats.to_dict(exclude=('episode_id', 'min_rating', 'max_rating')) == {
+            'appearance_count': 2, 'average_rating': 3.5,
+        }
@@ -0,0 +1,78 @@
+import json
+from datetime import date
+
+import pytest
+
+from app import create_app, db
+from app.json_provider import BACKENDS, Fragment, JSONProvider, resolve_backend
+from app.models import Appearance, Episode, Guest
+
+
+def _available(backend):
+    try:
+        __import__(backend)
+    except ImportError:
+        return False
+    return True
+
+
+INSTALLED = [b for b in BACKENDS if b == 'stdlib' or _available(b)]
+
+
+@pytest.fixture(params=INSTALLED)
+def provider(request, app):
+    return JSONProvider(app, backend=request.param)
+
+
+def test_auto_picks_an_installed_backend():
+    assert resolve_backend('auto') == INSTALLED[0]
+    with pytest.raises(ValueError, match='unknown JSON_BACKEND'):
+        resolve_backend('ujson')
+
+
+def test_compact_unsorted_with_iso_dates(provider):
+    body = provider.dumps_bytes({'b': 1, 'a': [date(1999, 1, 11)], 'name': 'Café'})
+    assert body == '{"b":1,"a":["1999-01-11"],"name":"Café"}'.encode()
+
+
+def test_fragments_are_spliced_verbatim(provider):
+    body = provider.dumps_bytes({'cached': Fragment('{"id": 1}'), 'rows': [Fragment(b'[1,2]'), 3]})
+    assert body == b'{"cached":{"id": 1},"rows":[[1,2],3]}'
+
+
+def test_strings_cannot_pose_as_fragments(app, provider):
+    # the placeholder nonce is private to the provider instance
+    other = JSONProvider(app)
+    marker = other._marker + '0'
+    body = provider.dumps_bytes({'f': Fragment(b'1'), 'text': marker})
+    assert json.loads(body) == {'f': 1, 'text': marker}
+
+
+def test_dumps_kwargs_fall_back_to_stdlib(provider):
+    assert provider.dumps({'b': 1, 'a': 2}, sort_keys=True) == '{"a": 2, "b": 1}'
+    assert provider.loads(b'{"a": [1]}') == {'a': [1]}
+
+
+def test_configured_backend_serves_responses():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'JSON_BACKEND': 'stdlib'})
+    assert app.json.backend == 'stdlib'
+    with app.app_context():
+        db.create_all()
+        ep = Episode(date='1/11/99', number=1)
+        g = Guest(name='Michael J. Fox', occupation='actor')
+        db.session.add_all([ep, g, Appearance(rating=4, episode=ep, guest=g)])
+        db.session.commit()
+    rv = app.test_client().get('/episodes/1')
+    assert rv.status_code == 200
+    assert rv.get_data().startswith(b'{"id":1,')
+    assert rv.get_json()['date'] == '1999-01-11'
+
+
+def test_streamed_rows_use_the_provider(app):
+    with app.app_context():
+        db.session.add_all([Episode(date=date(1999, 1, 10 + i), number=i) for i in range(1, 4)])
+        db.session.commit()
+    rv = app.test_client().get('/episodes?stream=ndjson')
+    lines = rv.get_data().splitlines()
+    assert [json.loads(line)['number'] for line in lines] == [1, 2, 3]
+    assert b', ' not in lines[0]
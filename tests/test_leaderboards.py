@@ -0,0 +1,99 @@
+import pytest
+
+from app import db
+from app.models import Appearance, Episode, Guest, Pizza, Restaurant, RestaurantPizza
+
+# guest -> ratings, one per episode
+RATINGS = {
+    'Ada': [5],
+    'Bo': [5, 5, 4],
+    'Cy': [3, 4],
+    'Di': [5, 4, 5],
+    'Ed': [],
+}
+
+
+def seed_rankings():
+    episodes = [Episode(date=f'1/{10 + n}/99', number=n) for n in range(1, 4)]
+    for name, ratings in RATINGS.items():
+        guest = Guest(name=name, occupation='actor')
+        db.session.add_all(Appearance(rating=r, episode=e, guest=guest) for r, e in zip(ratings, episodes))
+    margherita = Pizza(name='Margherita', ingredients='tomato,basil')
+    db.session.add_all([margherita, Pizza(name='Hawaiian', ingredients='ham,pineapple')])
+    for name, price in (('Uptown', 14), ('Downtown', 9), ('Midtown', 11), ('Airport', 9)):
+        db.session.add(RestaurantPizza(price=price, pizza=margherita, restaurant=Restaurant(name=name, capacity=40)))
+
+
+@pytest.fixture
+def app(clone_app):
+    return clone_app(seed_rankings)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def _names(rows):
+    return [row['name'] for row in rows]
+
+
+def test_guests_ranked_by_average_then_appearances(client):
+    rows = client.get('/leaderboards/guests').get_json()
+    # Bo and Di tie on 4.67; Ada's single 5 tops both
+    assert _names(rows) == ['Ada', 'Di', 'Bo', 'Cy']
+    assert rows[0] == {'rank': 1, 'id': 1, 'name': 'Ada', 'occupation': 'actor',
+                       'appearance_count': 1, 'average_rating': 5.0}
+    assert rows[1]['average_rating'] == 4.67
+    assert [row['rank'] for row in rows] == [1, 2, 3, 4]
+
+
+def test_min_appearances_and_limit(client):
+    assert _names(client.get('/leaderboards/guests?min_appearances=2').get_json()) == ['Di', 'Bo', 'Cy']
+    assert _names(client.get('/leaderboards/guests?limit=2').get_json()) == ['Ada', 'Di']
+    client.application.config['PAGE_MAX_LIMIT'] = 1
+    assert _names(client.get('/leaderboards/guests?limit=50').get_json()) == ['Ada']
+
+
+def test_leaderboard_follows_writes(client):
+    etag = client.get('/leaderboards/guests').headers['ETag']
+    assert client.put('/appearances', json={'rating': 1, 'episode_id': 1, 'guest_id': 1}).status_code == 200
+    assert client.post('/appearances', json={'rating': 5, 'episode_id': 3, 'guest_id': 3}).status_code == 201
+    rv = client.get('/leaderboards/guests', headers={'If-None-Match': etag})
+    assert rv.status_code == 200
+    assert _names(rv.get_json()) == ['Di', 'Bo', 'Cy', 'Ada']
+    client.delete('/episodes/1')
+    # three 4.5s over two appearances each: the later guest ranks first
+    assert _names(client.get('/leaderboards/guests').get_json()) == ['Di', 'Cy', 'Bo']
+
+
+def test_cheapest_restaurants(client):
+    rv = client.get('/pizzas/1/cheapest')
+    assert rv.status_code == 200
+    data = rv.get_json()
+    assert data['pizza'] == {'id': 1, 'name': 'Margherita', 'ingredients': 'tomato,basil'}
+    assert [(row['price'], row['restaurant']['name']) for row in data['cheapest']] == [
+        (9, 'Downtown'), (9, 'Airport'), (11, 'Midtown'), (14, 'Uptown'),
+    ]
+    assert data['cheapest'][0]['restaurant'] == {'id': 2, 'name': 'Downtown', 'capacity': 40}
+    assert len(client.get('/pizzas/1/cheapest?limit=2').get_json()['cheapest']) == 2
+    assert client.get('/pizzas/2/cheapest').get_json()['cheapest'] == []
+
+
+def test_cheapest_follows_repricing(client):
+    etag = client.get('/pizzas/1/cheapest').headers['ETag']
+    client.put('/restaurant_pizzas', json={'price': 5, 'restaurant_id': 1, 'pizza_id': 1})
+    rv = client.get('/pizzas/1/cheapest?limit=1', headers={'If-None-Match': etag})
+    assert rv.get_json()['cheapest'] == [{'price': 5, 'restaurant': {'id': 1, 'name': 'Uptown', 'capacity': 40}}]
+
+
+@pytest.mark.parametrize('path, status, error', [
+    ('/pizzas/9/cheapest', 404, 'Pizza not found'),
+    ('/pizzas/1/cheapest?limit=0', 400, 'limit must be at least 1'),
+    ('/leaderboards/guests?limit=x', 400, 'limit must be an integer'),
+    ('/leaderboards/guests?min_appearances=0', 400, 'min_appearances must be at least 1'),
+])
+def test_bad_requests(client, path, status, error):
+    rv = client.get(path)
+    assert rv.status_code == status
+    assert rv.get_json() == {'error': error}
@@ -0,0 +1,97 @@
+import re
+
+import pytest
+
+from app import create_app, db
+from app.metrics import Registry
+from app.models import Appearance, Episode, Guest
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        ep = Episode(date='1/11/99', number=1)
+        g = Guest(name='Michael J. Fox', occupation='actor')
+        db.session.add_all([ep, g, Appearance(rating=4, episode=ep, guest=g)])
+        db.session.commit()
+    return app.test_client()
+
+
+def _samples(client):
+    rv = client.get('/metrics')
+    assert rv.status_code == 200
+    assert rv.mimetype == 'text/plain'
+    samples = {}
+    for line in rv.get_data(as_text=True).splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_records_latency_sql_serialization_and_size(client):
+    client.get('/episodes/1')
+    client.get('/episodes/1')
+    client.get('/guests?limit=1')
+    samples = _samples(client)
+
+    endpoint = 'endpoint="api.get_episode"'
+    assert samples[f'lateshow_request_duration_seconds_count{{{endpoint},method="GET",status="200"}}'] == 2
+    assert samples[f'lateshow_request_duration_seconds_bucket{{{endpoint},method="GET",status="200",le="+Inf"}}'] == 2
+    # the second request is a cache hit: only the ETag version lookup runs
+    assert samples[f'lateshow_sql_queries_per_request_bucket{{{endpoint},le="1"}}'] == 1
+    assert samples[f'lateshow_sql_queries_per_request_count{{{endpoint}}}'] == 2
+    assert samples[f'lateshow_sql_duration_seconds_sum{{{endpoint}}}'] > 0
+    assert samples[f'lateshow_serialization_duration_seconds_sum{{{endpoint}}}'] > 0
+    assert samples[f'lateshow_response_size_bytes_sum{{{endpoint}}}'] > 0
+    assert samples['lateshow_serialization_duration_seconds_sum{endpoint="api.get_guests"}'] > 0
+
+
+def test_metrics_endpoint_is_not_instrumented(client):
+    client.get('/metrics')
+    assert not any('metrics.metrics' in name for name in _samples(client))
+
+
+def test_streamed_responses_are_recorded_on_close(client):
+    rv = client.get('/guests?stream=ndjson')
+    rv.get_data()
+    rv.close()
+    samples = _samples(client)
+    assert samples['lateshow_sql_queries_per_request_count{endpoint="api.get_guests"}'] == 1
+    assert samples['lateshow_sql_duration_seconds_sum{endpoint="api.get_guests"}'] > 0
+    assert not any(name.startswith('lateshow_response_size_bytes') and 'get_guests' in name for name in samples)
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    for value in (0, 2, 2, 7, 500):
+        registry.observe('lateshow_sql_queries_per_request', {'endpoint': 'x'}, value)
+    text = registry.render()
+    buckets = dict(re.findall(r'lateshow_sql_queries_per_request_bucket\{endpoint="x",le="([^"]+)"\} (\d+)', text))
+    assert buckets['0'] == '1'
+    assert buckets['2'] == '3'
+    assert buckets['10'] == '4'
+    assert buckets['100'] == '4'
+    assert buckets['+Inf'] == '5'
+    assert 'lateshow_sql_queries_per_request_sum{endpoint="x"} 511.0' in text
+
+
+@pytest.mark.parametrize('kwargs', [{'query_string': {'_profile': '1'}}, {'headers': {'X-Profile': '1'}}])
+def test_profile_mode_returns_cprofile_listing(client, kwargs):
+    rv = client.get('/episodes/1', **kwargs)
+    assert rv.status_code == 200
+    assert rv.mimetype == 'text/plain'
+    body = rv.get_data(as_text=True)
+    assert body.startswith('GET /episodes/1')
+    assert '-> 200 OK' in body
+    assert 'cumulative' in body
+
+
+def test_profile_mode_is_off_in_production():
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'PROFILING_ENABLED': False})
+    with app.app_context():
+        db.create_all()
+    rv = app.test_client().get('/episodes?_profile=1')
+    assert rv.status_code == 200
+    assert rv.get_json() == []
+    assert create_app('production').config['PROFILING_ENABLED'] is False
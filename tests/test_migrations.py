@@ -0,0 +1,143 @@
+import os
+import sqlite3
+
+import pytest
+from flask_migrate import downgrade, upgrade
+
+from app import create_app, db
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+def _schema(path, kind):
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute('SELECT name FROM sqlite_master WHERE type = ?', (kind,))
+        return {r[0] for r in rows if 'alembic_version' not in r[0]}
+
+
+def test_upgrade_matches_models(tmp_path):
+    path = tmp_path / 'migrated.db'
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    with app.app_context():
+        upgrade(directory=MIGRATIONS)
+        downgrade(directory=MIGRATIONS, revision='base')
+        upgrade(directory=MIGRATIONS)
+
+    fresh = tmp_path / 'fresh.db'
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{fresh}'})
+    with app.app_context():
+        db.create_all()
+
+    assert _schema(path, 'table') == _schema(fresh, 'table')
+    assert _schema(path, 'trigger') == _schema(fresh, 'trigger')
+    assert _schema(path, 'index') == _schema(fresh, 'index')
+    for table in _schema(fresh, 'table'):
+        assert _foreign_keys(path, table) == _foreign_keys(fresh, table), table
+
+
+def _foreign_keys(path, table):
+    with sqlite3.connect(path) as conn:
+        # (table, from, to, on_update, on_delete)
+        return sorted(r[2:7] for r in conn.execute(f'PRAGMA foreign_key_list({table})'))
+
+
+def _at_revision(path, revision):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    with app.app_context():
+        upgrade(directory=MIGRATIONS, revision=revision)
+    return app
+
+
+def test_episode_dates_are_converted_in_place(tmp_path):
+    path = tmp_path / 'legacy.db'
+    app = _at_revision(path, '5d8e2b7f1a36')
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO episodes (date, number) VALUES ('1/11/99', 1), ('12/31/1999', 2)")
+        conn.execute("INSERT INTO guests (name, occupation) VALUES ('Michael J. Fox', 'actor')")
+        conn.execute('INSERT INTO appearances (rating, episode_id, guest_id) VALUES (4, 1, 1), (5, 2, 1)')
+    with app.app_context():
+        upgrade(directory=MIGRATIONS)
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT date FROM episodes ORDER BY id').fetchall() == [('1999-01-11',), ('1999-12-31',)]
+        # rebuilding episodes must not cascade into its children
+        assert conn.execute('SELECT count(*) FROM appearances').fetchone() == (2,)
+        assert conn.execute('SELECT count(*) FROM episode_stats').fetchone() == (2,)
+        assert conn.execute("SELECT rowid FROM episodes_fts WHERE episodes_fts MATCH '1999'").fetchall() == [(1,), (2,)]
+
+    with app.app_context():
+        downgrade(directory=MIGRATIONS, revision='5d8e2b7f1a36')
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT date FROM episodes ORDER BY id').fetchall() == [('1/11/99',), ('12/31/99',)]
+        assert conn.execute('SELECT count(*) FROM appearances').fetchone() == (2,)
+
+
+def test_unparseable_episode_dates_abort_the_upgrade(tmp_path, capfd):
+    path = tmp_path / 'legacy.db'
+    app = _at_revision(path, '5d8e2b7f1a36')
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO episodes (date, number) VALUES ('1/11/99', 1), ('someday', 2)")
+    with app.app_context(), pytest.raises(SystemExit):
+        upgrade(directory=MIGRATIONS)
+
+    # alembic's logging config writes straight to stderr
+    assert "cannot parse 'someday' (id 2)" in capfd.readouterr().err
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT date FROM episodes ORDER BY id').fetchall() == [('1/11/99',), ('someday',)]
+        assert conn.execute('SELECT version_num FROM alembic_version').fetchone() == ('5d8e2b7f1a36',)
+
+
+def test_duplicate_pairs_abort_the_unique_index_upgrade(tmp_path, capfd):
+    path = tmp_path / 'legacy.db'
+    app = _at_revision(path, '8b41f6c3d952')
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO episodes (date, number) VALUES ('1999-01-11', 1)")
+        conn.execute("INSERT INTO guests (name, occupation) VALUES ('Michael J. Fox', 'actor')")
+        conn.execute('INSERT INTO appearances (rating, episode_id, guest_id) VALUES (4, 1, 1), (5, 1, 1)')
+    with app.app_context(), pytest.raises(SystemExit):
+        upgrade(directory=MIGRATIONS)
+    assert 'appearances: duplicate episode_id/guest_id (1, 1) (ids 1,2)' in capfd.readouterr().err
+
+    with sqlite3.connect(path) as conn:
+        conn.execute('DELETE FROM appearances WHERE id = 2')
+    with app.app_context():
+        upgrade(directory=MIGRATIONS)
+    with sqlite3.connect(path) as conn, pytest.raises(sqlite3.IntegrityError):
+        conn.execute('INSERT INTO appearances (rating, episode_id, guest_id) VALUES (3, 1, 1)')
+
+
+def test_dedupe_keeps_the_newest_row_of_each_pair(tmp_path, capfd):
+    path = tmp_path / 'legacy.db'
+    app = _at_revision(path, '8b41f6c3d952')
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO episodes (date, number) VALUES ('1999-01-11', 1)")
+        conn.execute("INSERT INTO guests (name, occupation) VALUES ('Michael J. Fox', 'actor')")
+        conn.execute("INSERT INTO guests (name, occupation) VALUES ('Sandra Bernhard', 'Comedian')")
+        conn.execute('INSERT INTO appearances (rating, episode_id, guest_id) VALUES (4, 1, 1), (2, 1, 2), (5, 1, 1)')
+    with app.app_context():
+        upgrade(directory=MIGRATIONS, x_arg=['dedupe=newest'])
+    assert 'appearances: deleted 1 rows, keeping the newest of each pair' in capfd.readouterr().err
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT id, rating FROM appearances ORDER BY id').fetchall() == [(2, 2), (3, 5)]
+
+
+def test_orphaned_rows_abort_the_cascade_upgrade(tmp_path, capfd):
+    path = tmp_path / 'legacy.db'
+    app = _at_revision(path, 'a93e5f0c7d24')
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO episodes (date, number) VALUES ('1/11/99', 1)")
+        conn.execute("INSERT INTO guests (name, occupation) VALUES ('Michael J. Fox', 'actor')")
+        # written while foreign keys were unenforced: episode 9 does not exist
+        conn.execute('INSERT INTO appearances (rating, episode_id, guest_id) VALUES (4, 1, 1), (5, 9, 1)')
+    with app.app_context(), pytest.raises(SystemExit):
+        upgrade(directory=MIGRATIONS)
+    assert 'appearances: 1 rows reference missing parents (ids 2)' in capfd.readouterr().err
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT count(*) FROM appearances').fetchone() == (2,)
+        assert conn.execute('SELECT version_num FROM alembic_version').fetchone() == ('a93e5f0c7d24',)
+
+    with app.app_context():
+        upgrade(directory=MIGRATIONS, x_arg=['orphans=delete'])
+    assert 'appearances: deleted 1 orphaned rows' in capfd.readouterr().err
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT id FROM appearances').fetchall() == [(1,)]
@@ -0,0 +1,150 @@
+import time
+
+import pytest
+
+from app import db
+from app.models import Appearance, Episode, Guest, Pizza, Restaurant, RestaurantPizza
+
+
+def seed_shows():
+    guests = [Guest(name=f'Guest {i}', occupation='actor') for i in range(4)]
+    pizzas = [Pizza(name=f'Pizza {i}', ingredients='tomato') for i in range(3)]
+    for number in range(1, 4):
+        episode = Episode(date=f'1/{10 + number}/99', number=number)
+        db.session.add_all(Appearance(rating=1 + i % 5, episode=episode, guest=g) for i, g in enumerate(guests[:number + 1]))
+    for capacity in (20, 40):
+        restaurant = Restaurant(name=f'Pizzeria {capacity}', capacity=capacity)
+        db.session.add_all(RestaurantPizza(price=10 + i, restaurant=restaurant, pizza=p) for i, p in enumerate(pizzas))
+
+
+@pytest.fixture
+def app(clone_app):
+    return clone_app(seed_shows)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_ids_return_detail_payloads_in_request_order(client):
+    rv = client.get('/episodes?ids=3,9,1,3')
+    assert rv.status_code == 200
+    items = rv.get_json()
+    assert items[0] == client.get('/episodes/3').get_json()
+    assert items[1] == {'id': 9, 'status': 404, 'error': 'Episode not found'}
+    assert items[2] == client.get('/episodes/1').get_json()
+    assert items[3] == items[0]
+    assert len(items[0]['appearances']) == 4
+
+
+def test_restaurant_ids(client):
+    items = client.get('/restaurants?ids=2,1').get_json()
+    assert [item['id'] for item in items] == [2, 1]
+    assert items[0] == client.get('/restaurants/2').get_json()
+    assert items[0]['pizzas'][0]['pizza']['name'] == 'Pizza 0'
+
+
+def test_ids_honour_fields_and_include(client):
+    items = client.get('/episodes?ids=2,1&fields=number,appearances.guest.name').get_json()
+    assert set(items[0]) == {'number', 'appearances'}
+    assert [a['guest'] for a in items[0]['appearances']] == [{'name': f'Guest {i}'} for i in range(3)]
+    assert client.get('/guests?ids=2').get_json() == [{'id': 2, 'name': 'Guest 1', 'occupation': 'actor'}]
+
+
+@pytest.mark.parametrize('path', ['/episodes?ids={ids}', '/restaurants?ids={ids}'])
+def test_ids_take_three_queries_however_many(client, count_queries, path):
+    counts = []
+    for ids in ('1', '1,2,3', '2,1,9'):
+        with count_queries() as counter:
+            assert client.get(path.format(ids=ids)).status_code == 200
+        counts.append(counter.count)
+    # ETag versions, the IN select, the selectin load of children and their parents
+    assert counts == [3, 3, 3]
+
+
+@pytest.mark.parametrize('query, error', [
+    ('ids=x', 'ids must be comma-separated integers'),
+    ('ids=', 'ids must name at least one id'),
+    ('ids=1,1000000000000000000000000000000', f'ids must be between 1 and {2 ** 63 - 1}'),
+    ('ids=0', f'ids must be between 1 and {2 ** 63 - 1}'),
+    ('ids=1&limit=2', 'ids cannot be combined with limit'),
+    ('ids=1&q=fox&sort=date', 'ids cannot be combined with q, sort'),
+    ('ids=1&include=nope', "unknown include 'nope'"),
+])
+def test_bad_ids(client, query, error):
+    rv = client.get(f'/episodes?{query}')
+    assert rv.status_code == 400
+    assert rv.get_json() == {'error': error}
+
+
+def test_ids_are_capped(client):
+    client.application.config['MULTI_GET_MAX_IDS'] = 2
+    assert client.get('/episodes?ids=1,2,3').get_json() == {'error': 'ids may name at most 2 ids'}
+
+
+def test_restaurant_list_etag_follows_the_menu(client):
+    etag = client.get('/restaurants?ids=1').headers['ETag']
+    rv = client.put('/restaurant_pizzas', json={'price': 30, 'restaurant_id': 1, 'pizza_id': 1})
+    assert rv.status_code == 200
+    rv = client.get('/restaurants?ids=1', headers={'If-None-Match': etag})
+    assert rv.status_code == 200
+    assert rv.get_json()[0]['pizzas'][0]['price'] == 30
+
+
+def test_batch_runs_gets_in_order(client):
+    paths = ['/episodes/2', '/restaurants/1?fields=name', '/episodes/9', '/favicon.ico', '/nope']
+    rv = client.post('/batch', json=[*paths[:2], {'path': paths[2]}, *paths[3:]])
+    assert rv.status_code == 200
+    items = rv.get_json()
+    assert [item['path'] for item in items] == paths
+    assert [item['status'] for item in items] == [200, 200, 404, 204, 404]
+    assert items[0]['body'] == client.get('/episodes/2').get_json()
+    assert items[1]['body'] == {'name': 'Pizzeria 20'}
+    assert items[2]['body'] == {'error': 'Episode not found'}
+    assert items[3]['body'] is None
+
+
+def test_batch_passes_headers(client):
+    etag = client.get('/episodes/1').headers['ETag']
+    items = client.post('/batch', json=[{'path': '/episodes/1', 'headers': {'If-None-Match': etag}}]).get_json()
+    assert items == [{'path': '/episodes/1', 'status': 304, 'body': None}]
+
+
+def test_batch_embeds_text_bodies(client):
+    item = client.post('/batch', json=['/metrics']).get_json()[0]
+    assert item['status'] == 200
+    assert item['body'].startswith('# HELP')
+
+
+@pytest.mark.parametrize('body, error', [
+    ({'path': '/'}, 'body must be a JSON array of paths or {"path", "headers"} objects'),
+    ([], 'batch must contain at least one request'),
+    (['episodes'], 'request 0: path must start with /'),
+    (['/', {'path': '/', 'method': 'DELETE'}], 'request 1: only GET is supported'),
+    ([{'path': '/', 'headers': {'X': 1}}], 'request 0: headers must map names to strings'),
+    ([1], 'request 0 must be a path or an object'),
+])
+def test_bad_batches(client, body, error):
+    rv = client.post('/batch', json=body)
+    assert rv.status_code == 400
+    assert rv.get_json() == {'error': error}
+
+
+def test_batch_is_capped(client):
+    client.application.config['BATCH_MAX_REQUESTS'] = 2
+    assert client.post('/batch', json=['/'] * 3).get_json() == {'error': 'batch may contain at most 2 requests'}
+
+
+def test_batch_refuses_streamed_responses(client):
+    client.application.config.update(CHANGES_POLL_INTERVAL=0.01, CHANGES_STREAM_MAX_SECONDS=3)
+    started = time.monotonic()
+    items = client.post('/batch', json=['/changes/stream', '/episodes?stream=ndjson', '/episodes/1']).get_json()
+    # the change stream was closed unread, not polled until it expired
+    assert time.monotonic() - started < 3
+    error = {'error': 'streamed responses cannot be batched'}
+    assert items[:2] == [
+        {'path': '/changes/stream', 'status': 400, 'body': error},
+        {'path': '/episodes?stream=ndjson', 'status': 400, 'body': error},
+    ]
+    assert items[2]['status'] == 200
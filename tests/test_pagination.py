@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from app import db
+from app.models import Guest
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        db.session.add_all([Guest(name=f'Guest {i}', occupation='actor') for i in range(7)])
+        db.session.commit()
+    return app.test_client()
+
+
+def test_unpaginated_list_unchanged(client):
+    rv = client.get('/guests')
+    assert rv.status_code == 200
+    assert [g['id'] for g in rv.get_json()] == list(range(1, 8))
+    assert 'Link' not in rv.headers
+
+
+def test_keyset_pages_follow_link(client):
+    rv = client.get('/guests?limit=3')
+    assert [g['id'] for g in rv.get_json()] == [1, 2, 3]
+    assert rv.headers['X-Next-Cursor'] == '3'
+
+    seen = []
+    url = '/guests?limit=3'
+    while url:
+        rv = client.get(url)
+        seen.extend(g['id'] for g in rv.get_json())
+        link = rv.headers.get('Link')
+        url = link[1:link.index('>')] if link else None
+    assert seen == list(range(1, 8))
+
+
+def test_after_id_without_limit_uses_default(client):
+    rv = client.get('/guests?after_id=5')
+    assert [g['id'] for g in rv.get_json()] == [6, 7]
+    assert 'X-Next-Cursor' not in rv.headers
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=abc', 'after_id=-1', 'stream=xml'])
+def test_bad_pagination_args(client, query):
+    rv = client.get(f'/guests?{query}')
+    assert rv.status_code == 400
+    assert 'error' in rv.get_json()
+
+
+@pytest.mark.parametrize('path', ['/guests', '/episodes', '/episodes?sort=date&'])
+@pytest.mark.parametrize('arg', ['after_id', 'limit'])
+def test_pagination_args_fit_sqlite_integers(client, path, arg):
+    sep = '' if path.endswith('&') else '?'
+    rv = client.get(f'{path}{sep}{arg}={10 ** 30}')
+    assert rv.status_code == 400
+    assert rv.get_json() == {'error': f'{arg} must be at most {2 ** 63 - 1}'}
+    assert client.get(f'{path}{sep}{arg}={2 ** 63 - 1}').status_code == 200
+
+
+def test_stream_json_array(client):
+    rv = client.get('/guests?stream=1')
+    assert rv.status_code == 200
+    assert rv.is_streamed
+    data = json.loads(rv.get_data(as_text=True))
+    assert [g['id'] for g in data] == list(range(1, 8))
+
+
+def test_stream_empty_table(app):
+    rv = app.test_client().get('/pizzas?stream=json')
+    assert json.loads(rv.get_data(as_text=True)) == []
+
+
+def test_stream_ndjson_with_cursor(client):
+    rv = client.get('/guests?stream=ndjson&after_id=2&limit=3')
+    assert rv.mimetype == 'application/x-ndjson'
+    lines = rv.get_data(as_text=True).splitlines()
+    assert [json.loads(line)['id'] for line in lines] == [3, 4, 5]
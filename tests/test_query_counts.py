@@ -0,0 +1,60 @@
+import pytest
+
+from app import db
+from app.models import Appearance, Episode, Guest, Pizza, Restaurant, RestaurantPizza
+
+
+def _seed(app, size):
+    with app.app_context():
+        ep = Episode(date='1/11/99', number=1)
+        r = Restaurant(name='Chain R', capacity=100)
+        db.session.add_all([ep, r])
+        for i in range(size):
+            g = Guest(name=f'Guest {i}', occupation='actor')
+            p = Pizza(name=f'Pizza {i}', ingredients='tomato')
+            db.session.add_all([
+                Appearance(rating=1 + i % 5, episode=ep, guest=g),
+                RestaurantPizza(price=10 + i, restaurant=r, pizza=p),
+            ])
+        db.session.commit()
+        return ep.id, r.id
+
+
+@pytest.mark.parametrize('path', ['/episodes/{episode}', '/restaurants/{restaurant}'])
+def test_detail_query_count_independent_of_size(app, count_queries, path):
+    small = _seed(app, 1)
+    large = _seed(app, 25)
+    client = app.test_client()
+
+    counts = []
+    for episode_id, restaurant_id in (small, large):
+        with count_queries() as counter:
+            rv = client.get(path.format(episode=episode_id, restaurant=restaurant_id))
+        assert rv.status_code == 200
+        counts.append(counter.count)
+
+    assert counts[0] == counts[1]
+    # ETag version lookup, the episode/restaurant row, its selectin children
+    assert counts[1] <= 3
+
+
+def test_episode_detail_payload_unchanged(app):
+    episode_id, _ = _seed(app, 3)
+    data = app.test_client().get(f'/episodes/{episode_id}').get_json()
+    assert len(data['appearances']) == 3
+    assert all('guest' in a and a['guest']['occupation'] == 'actor' for a in data['appearances'])
+
+
+def test_delete_restaurant_query_count_independent_of_size(app, count_queries):
+    _, small = _seed(app, 1)
+    _, large = _seed(app, 25)
+    client = app.test_client()
+
+    counts = []
+    for restaurant_id in (small, large):
+        with count_queries() as counter:
+            rv = client.delete(f'/restaurants/{restaurant_id}')
+        assert rv.status_code == 200
+        counts.append(counter.count)
+
+    assert counts[0] == counts[1]
@@ -1,20 +1,15 @@
 import pytest
-from app import create_app, db
+from app import db
 from app.models import Restaurant, Pizza, RestaurantPizza
 
 
+def seed_minimal():
+    db.session.add_all([Restaurant(name='Test R', capacity=10), Pizza(name='Test P', ingredients='ing')])
+
+
 @pytest.fixture
-def client(tmp_path):
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    with app.app_context():
-        db.create_all()
-        # seed minimal data
-        r = Restaurant(name='Test R', capacity=10)
-        p = Pizza(name='Test P', ingredients='ing')
-        db.session.add_all([r, p])
-        db.session.commit()
+def client(clone_app):
+    app = clone_app(seed_minimal)
     with app.test_client() as c:
         yield c
 
@@ -0,0 +1,131 @@
+import pytest
+from sqlalchemy import delete, text, update
+
+from app import db
+from app.models import Appearance, Episode, Guest, Pizza, PizzaIngredient
+from app.search import fts_query, rebuild
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        db.session.add_all([
+            Episode(date='1/11/99', number=1),
+            Episode(date='1/12/99', number=2),
+            Episode(date='1/13/99', number=3),
+            Guest(name='Michael J. Fox', occupation='actor'),
+            Guest(name='Sandra Bernhard', occupation='Comedian'),
+            Guest(name='Tracey Ullman', occupation='Actor'),
+            Pizza(name='Margherita', ingredients='Tomato, Basil, Mozzarella'),
+            Pizza(name='Pepperoni', ingredients='tomato,pepperoni'),
+            Pizza(name='Pesto', ingredients='basil,pine nuts'),
+        ])
+        db.session.flush()
+        db.session.add_all([
+            Appearance(rating=5, episode_id=1, guest_id=1),
+            Appearance(rating=4, episode_id=2, guest_id=1),
+            Appearance(rating=2, episode_id=2, guest_id=2),
+            Appearance(rating=1, episode_id=3, guest_id=3),
+        ])
+        db.session.commit()
+    return app.test_client()
+
+
+def _ids(rv):
+    assert rv.status_code == 200, rv.get_data(as_text=True)
+    return [row['id'] for row in rv.get_json()]
+
+
+def test_guest_text_search_matches_word_prefixes(client):
+    assert _ids(client.get('/guests?q=mich')) == [1]
+    assert _ids(client.get('/guests?q=actor')) == [1, 3]
+    assert _ids(client.get('/guests?q=sandra bern')) == [2]
+    assert _ids(client.get('/guests?q=nobody')) == []
+
+
+def test_guest_occupation_is_case_insensitive(client):
+    assert _ids(client.get('/guests?occupation=ACTOR')) == [1, 3]
+    assert _ids(client.get('/guests?occupation=comedian')) == [2]
+
+
+def test_min_rating_uses_average(client):
+    assert _ids(client.get('/guests?min_rating=4.5')) == [1]
+    assert _ids(client.get('/episodes?min_rating=3')) == [1, 2]
+    assert _ids(client.get('/guests?min_rating=2&occupation=actor')) == [1]
+
+
+def test_episode_search_covers_guests(client):
+    assert _ids(client.get('/episodes?q=bernhard')) == [2]
+    assert _ids(client.get('/episodes?q=13')) == [3]
+    assert _ids(client.get('/episodes?q=fox')) == [1, 2]
+
+
+def test_ingredient_filter_requires_every_ingredient(client):
+    assert _ids(client.get('/pizzas?ingredient=basil')) == [1, 3]
+    assert _ids(client.get('/pizzas?ingredient=BASIL, tomato')) == [1]
+    assert _ids(client.get('/pizzas?ingredient=pine nuts')) == [3]
+    assert _ids(client.get('/pizzas?q=pepp')) == [2]
+
+
+def test_filters_combine_with_paging(client):
+    rv = client.get('/guests?occupation=actor&limit=1')
+    assert _ids(rv) == [1]
+    assert 'occupation=actor' in rv.headers['Link']
+    assert _ids(client.get('/guests?occupation=actor&after_id=1')) == [3]
+
+
+@pytest.mark.parametrize('query, error', [
+    ('/guests?min_rating=high', 'min_rating must be a number'),
+    ('/guests?q=%22*', 'q must contain at least one word'),
+    ('/pizzas?ingredient=,', 'ingredient must not be empty'),
+])
+def test_bad_filters(client, query, error):
+    rv = client.get(query)
+    assert rv.status_code == 400
+    assert rv.get_json() == {'error': error}
+
+
+def test_fts_query_quotes_operators():
+    assert fts_query('fox OR "x" NEAR(') == '"fox"* "OR"* "x"* "NEAR"*'
+
+
+def test_indexes_follow_writes(client, app):
+    with app.app_context():
+        guest = db.session.get(Guest, 2)
+        guest.name = 'Sandra Lee'
+        pizza = db.session.get(Pizza, 2)
+        pizza.ingredients = 'cheese'
+        db.session.commit()
+        db.session.execute(update(Pizza).where(Pizza.id == 3).values(ingredients='Basil,mint'))
+        db.session.execute(delete(Guest).where(Guest.id == 1))
+        db.session.commit()
+    assert _ids(client.get('/guests?q=bernhard')) == []
+    assert _ids(client.get('/guests?q=lee')) == [2]
+    assert _ids(client.get('/guests?q=fox')) == []
+    assert _ids(client.get('/pizzas?ingredient=tomato')) == [1]
+    assert _ids(client.get('/pizzas?ingredient=mint')) == [3]
+    assert _ids(client.get('/pizzas?ingredient=cheese')) == [2]
+
+    with app.app_context():
+        db.session.execute(delete(Pizza).where(Pizza.id == 1))
+        db.session.commit()
+        assert db.session.query(PizzaIngredient).filter_by(pizza_id=1).count() == 0
+
+
+def test_rebuild_restores_indexes(client, app):
+    with app.app_context():
+        db.session.execute(text("INSERT INTO guests_fts (guests_fts) VALUES ('delete-all')"))
+        db.session.execute(delete(PizzaIngredient))
+        db.session.commit()
+        with db.engine.begin() as connection:
+            rebuild(connection)
+    assert _ids(client.get('/guests?q=fox')) == [1]
+    assert _ids(client.get('/pizzas?ingredient=basil')) == [1, 3]
+
+
+def test_filtered_list_etag_follows_ratings(client):
+    etag = client.get('/guests?min_rating=3').headers['ETag'].strip('"')
+    client.post('/appearances', json={'rating': 5, 'episode_id': 1, 'guest_id': 3})
+    rv = client.get('/guests?min_rating=3', headers={'If-None-Match': f'"{etag}"'})
+    assert rv.status_code == 200
+    assert _ids(rv) == [1, 3]
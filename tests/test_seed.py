@@ -0,0 +1,55 @@
+import argparse
+
+import pytest
+from sqlalchemy import func, select
+
+from app import db
+from app.models import Appearance, Episode, EpisodeStats, Guest, Pizza, PizzaIngredient, RestaurantPizza
+from seed import count, generate
+
+SIZES = {'episodes': 20, 'guests': 15, 'appearances': 90, 'restaurants': 4, 'pizzas': 6, 'menu_items': 18}
+
+
+def _snapshot():
+    return {
+        model.__tablename__: db.session.execute(select(model.__table__).order_by(*model.__table__.primary_key)).all()
+        for model in (Episode, Guest, Appearance, Pizza, RestaurantPizza)
+    }
+
+
+def test_generate_is_deterministic(app):
+    with app.app_context():
+        generate(**SIZES, seed=7, log=lambda line: None)
+        first = _snapshot()
+        generate(**SIZES, seed=7, log=lambda line: None)
+        assert _snapshot() == first
+        generate(**SIZES, seed=8, log=lambda line: None)
+        assert _snapshot() != first
+
+
+def test_generate_sizes_pairs_and_derived_tables(app):
+    with app.app_context():
+        generate(**SIZES, seed=1, log=lambda line: None)
+        assert db.session.scalar(select(func.count()).select_from(Appearance)) == 90
+        pairs = db.session.execute(select(Appearance.episode_id, Appearance.guest_id)).all()
+        assert len(set(pairs)) == 90
+        assert db.session.scalar(select(func.count()).select_from(RestaurantPizza)) == 18
+        # triggers fill the summaries and the ingredient index as rows go in
+        assert db.session.scalar(select(func.sum(EpisodeStats.row_count))) == 90
+        assert db.session.scalar(select(func.count()).select_from(PizzaIngredient)) > 6
+
+
+def test_generate_rejects_impossible_sizes(app):
+    with app.app_context():
+        with pytest.raises(ValueError):
+            generate(episodes=2, guests=3, appearances=7, log=lambda line: None)
+
+
+@pytest.mark.parametrize('raw, expected', [('50000', 50000), ('200k', 200000), ('2M', 2000000), ('1.5k', 1500)])
+def test_count_suffixes(raw, expected):
+    assert count(raw) == expected
+
+
+def test_count_rejects_garbage():
+    with pytest.raises(argparse.ArgumentTypeError):
+        count('lots')
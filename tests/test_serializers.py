@@ -0,0 +1,29 @@
+import pytest
+
+from app import db
+from app.models import Episode, Guest, Pizza, Restaurant
+from app.serializers import projected_select, row_serializer
+
+
+@pytest.mark.parametrize('model, values', [
+    (Episode, {'date': '1/11/99', 'number': 1}),
+    (Guest, {'name': 'Michael J. Fox', 'occupation': 'actor'}),
+    (Restaurant, {'name': 'Downtown Pizza', 'capacity': 80}),
+    (Pizza, {'name': 'Margherita', 'ingredients': 'tomato,mozzarella,basil'}),
+])
+def test_projection_matches_to_dict(app, model, values):
+    with app.app_context():
+        db.session.add(model(**values))
+        db.session.commit()
+        expected = [obj.to_dict(depth=0) for obj in db.session.scalars(db.select(model))]
+        serialize = row_serializer(model)
+        rows = db.session.execute(projected_select(model)).all()
+        assert [serialize(row) for row in rows] == expected
+
+
+def test_list_endpoint_matches_orm_output(app):
+    with app.app_context():
+        db.session.add_all([Guest(name=f'G{i}', occupation='host') for i in range(3)])
+        db.session.commit()
+        expected = [g.to_dict() for g in Guest.query.order_by(Guest.id)]
+    assert app.test_client().get('/guests').get_json() == expected
@@ -0,0 +1,65 @@
+import subprocess
+import sys
+
+from app import db
+from app.models import Episode
+from app.startup import ROOT, format_report, import_report
+
+
+def test_create_app_does_not_import_flask_migrate():
+    code = (
+        "import sys; from app import create_app; "
+        "create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'}); "
+        "print('flask_migrate' in sys.modules, 'alembic' in sys.modules)"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ['False', 'False']
+
+
+def test_migrate_extension_loads_on_first_use(app):
+    from flask_migrate import _MigrateConfig
+
+    assert app.extensions['migrate'].db is db
+    assert isinstance(app.extensions['migrate'], _MigrateConfig)
+    assert app.extensions['migrate'].directory == 'migrations'
+
+
+def test_db_command_loads_flask_migrate(app):
+    result = app.test_cli_runner().invoke(args=['db', '--help'])
+    assert result.exit_code == 0
+    assert 'upgrade' in result.output
+    assert '--directory' in result.output
+
+
+def test_startup_times_are_recorded_and_exported(app):
+    startup = app.extensions['startup']
+    assert startup['import_seconds'] > 0
+    assert startup['create_app_seconds'] > 0
+    body = app.test_client().get('/metrics').get_data(as_text=True)
+    assert '# TYPE lateshow_startup_seconds gauge' in body
+    assert 'lateshow_startup_seconds{phase="create_app"}' in body
+
+
+def test_import_report():
+    report = import_report(top=5)
+    assert 0 < report['import_seconds'] < 30
+    assert report['create_app_seconds'] > 0
+    assert len(report['packages']) == 5
+    names = [name for name, _ in report['packages']]
+    assert 'sqlalchemy' in names
+    assert 'alembic' not in names
+    assert all(seconds >= 0 for _, seconds in report['modules'])
+    assert 'slowest modules' in format_report(report)
+
+
+def test_cloned_databases_are_independent(clone_app):
+    first, second = clone_app(), clone_app()
+    with first.app_context():
+        db.session.add(Episode(date='1/11/99', number=1))
+        db.session.commit()
+        assert db.session.query(Episode).count() == 1
+    with second.app_context():
+        assert db.session.query(Episode).count() == 0
+        # the template carries the triggers create_all adds
+        names = db.session.execute(db.text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars().all()
+        assert names
@@ -0,0 +1,105 @@
+import pytest
+from sqlalchemy import insert, text
+
+from app import db
+from app.models import Appearance, Episode, Guest, Pizza, Restaurant, RestaurantPizza
+from app.stats import rebuild
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        db.session.add_all([
+            Episode(date='1/11/99', number=1),
+            Episode(date='1/12/99', number=2),
+            Guest(name='Michael J. Fox', occupation='actor'),
+            Guest(name='Sandra Bernhard', occupation='Comedian'),
+            Guest(name='Tracey Ullman', occupation='television actress'),
+            Restaurant(name='Downtown Pizza', capacity=80),
+            Pizza(name='Margherita', ingredients='tomato,basil'),
+            Pizza(name='Pepperoni', ingredients='tomato,pepperoni'),
+        ])
+        db.session.commit()
+    return app.test_client()
+
+
+def _appear(client, rating, episode_id=1, guest_id=1):
+    rv = client.post('/appearances', json={'rating': rating, 'episode_id': episode_id, 'guest_id': guest_id})
+    assert rv.status_code == 201
+    return rv.get_json()['id']
+
+
+def test_empty_and_missing(client):
+    assert client.get('/episodes/1/stats').get_json() == {
+        'episode_id': 1, 'appearance_count': 0, 'average_rating': None, 'min_rating': None, 'max_rating': None,
+    }
+    assert client.get('/episodes/9/stats').status_code == 404
+    assert client.get('/guests/9/stats').status_code == 404
+    assert client.get('/restaurants/9/stats').status_code == 404
+
+
+def test_appearance_writes_update_episode_and_guest(client):
+    _appear(client, 4)
+    _appear(client, 2, guest_id=2)
+    _appear(client, 5, episode_id=2)
+    assert client.get('/episodes/1/stats').get_json() == {
+        'episode_id': 1, 'appearance_count': 2, 'average_rating': 3.0, 'min_rating': 2, 'max_rating': 4,
+    }
+    assert client.get('/guests/1/stats').get_json() == {
+        'guest_id': 1, 'appearance_count': 2, 'average_rating': 4.5, 'min_rating': 4, 'max_rating': 5,
+    }
+
+
+def test_bulk_and_delete_keep_restaurant_stats_current(client):
+    rv = client.post('/restaurant_pizzas/bulk', json=[
+        {'price': 10, 'restaurant_id': 1, 'pizza_id': 1},
+        {'price': 30, 'restaurant_id': 1, 'pizza_id': 2},
+    ])
+    assert rv.status_code == 201
+    assert client.get('/restaurants/1/stats').get_json() == {
+        'restaurant_id': 1, 'pizza_count': 2, 'average_price': 20.0, 'min_price': 10, 'max_price': 30,
+    }
+    client.delete('/restaurants/1')
+    with client.application.app_context():
+        assert db.session.execute(text('SELECT count(*) FROM restaurant_stats')).scalar() == 0
+
+
+def test_removing_extremes_recomputes_min_max(app, client):
+    ids = [_appear(client, r, guest_id=g) for r, g in ((1, 1), (3, 2), (5, 3))]
+    with app.app_context():
+        db.session.delete(db.session.get(Appearance, ids[0]))
+        db.session.get(Appearance, ids[2]).rating = 2
+        db.session.commit()
+    assert client.get('/episodes/1/stats').get_json() == {
+        'episode_id': 1, 'appearance_count': 2, 'average_rating': 2.5, 'min_rating': 2, 'max_rating': 3,
+    }
+
+
+def test_moving_an_appearance_between_episodes(app, client):
+    appearance_id = _appear(client, 4)
+    with app.app_context():
+        db.session.get(Appearance, appearance_id).episode_id = 2
+        db.session.commit()
+    assert client.get('/episodes/1/stats').get_json()['appearance_count'] == 0
+    assert client.get('/episodes/2/stats').get_json()['appearance_count'] == 1
+
+
+def test_rebuild_matches_incremental(app, client):
+    for rating, episode_id, guest_id in [(1, 1, 1), (5, 1, 2), (3, 2, 1)]:
+        _appear(client, rating, episode_id, guest_id)
+    with app.app_context():
+        db.session.execute(insert(RestaurantPizza), [{'price': 7, 'restaurant_id': 1, 'pizza_id': 1}])
+        db.session.commit()
+    paths = ['/episodes/1/stats', '/episodes/2/stats', '/guests/1/stats', '/guests/2/stats', '/restaurants/1/stats']
+    before = [client.get(p).get_json() for p in paths]
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text('DELETE FROM guest_stats'))
+            rebuild(conn)
+    assert [client.get(p).get_json() for p in paths] == before
+
+
+def test_rebuild_cli(app):
+    result = app.test_cli_runner().invoke(args=['stats', 'rebuild'])
+    assert result.exit_code == 0
+    assert 'episode_stats' in result.output
@@ -0,0 +1,156 @@
+import json
+import sqlite3
+
+import pytest
+from sqlalchemy import func, select, text
+
+from app import create_app, db
+from app.changelog import horizon, latest
+from app.models import Appearance, Episode, EpisodeStats, Guest, Pizza, PizzaIngredient, Restaurant, RestaurantPizza
+from app.transfer import TABLES, export_dataset, import_dataset
+from seed import generate
+
+SIZES = {'episodes': 20, 'guests': 15, 'appearances': 90, 'restaurants': 4, 'pizzas': 6, 'menu_items': 18}
+MODELS = (Episode, Guest, Appearance, Restaurant, Pizza, RestaurantPizza)
+
+
+def seed_generated():
+    generate(**SIZES, seed=3, log=lambda line: None)
+
+
+def _snapshot():
+    return {
+        model.__tablename__: db.session.execute(select(model.__table__).order_by(*model.__table__.primary_key)).all()
+        for model in MODELS
+    }
+
+
+def _triggers():
+    return db.session.execute(text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' ORDER BY name")).all()
+
+
+@pytest.fixture
+def source(clone_app):
+    return clone_app(seed_generated)
+
+
+@pytest.mark.parametrize('fmt', ['ndjson', 'parquet'])
+def test_round_trip(source, app, tmp_path, fmt):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    lines = []
+    with source.app_context():
+        counts = export_dataset(tmp_path, fmt, chunk_size=7, log=lines.append)
+        expected = _snapshot()
+    assert list(counts) == list(TABLES)
+    assert counts['appearances'] == 90
+    assert json.loads((tmp_path / 'manifest.json').read_text()) == {'format': fmt, 'tables': counts}
+    assert 'rows/s' in lines[0]
+
+    with app.app_context():
+        assert import_dataset(tmp_path, chunk_size=7, log=lambda line: None) == counts
+        assert _snapshot() == expected
+        # the triggers filled the derived tables, and the feed starts afresh
+        assert db.session.scalar(select(func.sum(EpisodeStats.row_count))) == 90
+        assert db.session.scalar(select(func.count()).select_from(PizzaIngredient)) > 6
+        assert horizon(db.session) == latest(db.session)
+        taken = set(db.session.execute(select(Appearance.guest_id).where(Appearance.episode_id == 1)).scalars())
+        guest_id = min(set(range(1, 16)) - taken)
+        db.session.remove()
+    # the triggers are back and maintain the derived tables again
+    rv = app.test_client().post('/appearances', json={'rating': 5, 'episode_id': 1, 'guest_id': guest_id})
+    assert rv.status_code == 201, rv.get_json()
+    with app.app_context():
+        assert db.session.scalar(select(func.sum(EpisodeStats.row_count))) == 91
+        assert latest(db.session) == horizon(db.session) + 1
+
+
+def test_ndjson_rows_are_objects(source, tmp_path):
+    with source.app_context():
+        export_dataset(tmp_path, log=lambda line: None)
+    first = json.loads((tmp_path / 'episodes.ndjson').read_text().splitlines()[0])
+    assert first == {'id': 1, 'date': '1999-01-11', 'number': 1}
+
+
+def test_import_refuses_filled_tables_unless_replacing(source, tmp_path):
+    with source.app_context():
+        export_dataset(tmp_path, log=lambda line: None)
+        expected = _snapshot()
+        with pytest.raises(ValueError, match='tables already hold data: episodes, guests'):
+            import_dataset(tmp_path, log=lambda line: None)
+        db.session.execute(Episode.__table__.delete().where(Episode.id > 10))
+        db.session.commit()
+        import_dataset(tmp_path, replace=True, log=lambda line: None)
+        assert _snapshot() == expected
+
+
+def test_import_checks_the_manifest(app, source, tmp_path):
+    with source.app_context():
+        export_dataset(tmp_path, log=lambda line: None)
+    manifest = json.loads((tmp_path / 'manifest.json').read_text())
+    manifest['tables']['guests'] += 1
+    (tmp_path / 'manifest.json').write_text(json.dumps(manifest))
+    with app.app_context():
+        triggers = _triggers()
+        with pytest.raises(ValueError, match='guests: read 15 rows, the manifest lists 16'):
+            import_dataset(tmp_path, log=lambda line: None)
+        # the failed import rolled back as a whole, dropped triggers included
+        assert db.session.scalar(select(func.count()).select_from(Episode)) == 0
+        assert _triggers() == triggers
+        with pytest.raises(ValueError, match='has no manifest.json'):
+            import_dataset(tmp_path / 'nope', log=lambda line: None)
+
+
+def test_cli_commands(source, app, tmp_path):
+    result = source.test_cli_runner().invoke(args=['export', str(tmp_path), '--chunk-size', '10'])
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines()[-1].lstrip().startswith('total:       153 rows')
+    result = app.test_cli_runner().invoke(args=['import', str(tmp_path)])
+    assert result.exit_code == 0, result.output
+    result = app.test_cli_runner().invoke(args=['import', str(tmp_path)])
+    assert result.exit_code == 1
+    assert 'import with --replace' in result.output
+
+
+def test_import_invalidates_etags_and_cached_pages(source, tmp_path):
+    with source.app_context():
+        export_dataset(tmp_path, log=lambda line: None)
+    path = tmp_path / 'guests.ndjson'
+    renamed = [{**json.loads(line), 'name': f'Renamed {i}'} for i, line in enumerate(path.read_text().splitlines())]
+    path.write_text(''.join(json.dumps(row) + '\n' for row in renamed))
+    client = source.test_client()
+    etag = client.get('/guests').headers['ETag']
+    before = client.get('/episodes/1').get_json()
+    assert before['appearances'] and not before['appearances'][0]['guest']['name'].startswith('Renamed')
+
+    with source.app_context():
+        import_dataset(tmp_path, replace=True, log=lambda line: None)
+    rv = client.get('/guests', headers={'If-None-Match': etag})
+    assert rv.status_code == 200
+    assert rv.get_json()[0]['name'] == 'Renamed 0'
+    after = client.get('/episodes/1').get_json()
+    assert after['appearances'][0]['guest']['name'].startswith('Renamed')
+
+
+def test_export_is_one_snapshot(tmp_path, app):
+    path = tmp_path / 'live.db'
+    live = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    with live.app_context():
+        db.create_all()
+        seed_generated()
+        db.session.commit()
+
+    def write_between_tables(line):
+        # another process adds an episode and its appearance after the
+        # episodes were dumped but before the appearances are
+        if line.lstrip().startswith('episodes'):
+            with sqlite3.connect(path) as conn:
+                episode_id = conn.execute("INSERT INTO episodes (date, number) VALUES ('2001-01-01', 999)").lastrowid
+                conn.execute('INSERT INTO appearances (rating, episode_id, guest_id) VALUES (5, ?, 1)', (episode_id,))
+
+    with live.app_context():
+        counts = export_dataset(tmp_path / 'dump', log=write_between_tables)
+        db.engine.dispose()
+    assert (counts['episodes'], counts['appearances']) == (20, 90)
+    with app.app_context():
+        assert import_dataset(tmp_path / 'dump', log=lambda line: None) == counts
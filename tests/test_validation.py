@@ -0,0 +1,95 @@
+import pytest
+
+from app.models import Appearance, Pizza, Restaurant, RestaurantPizza
+from app.validation import APPEARANCE, MAX_ID, RESTAURANT_PIZZA, Int, Schema, Str
+
+
+def test_valid_bodies_pass_through():
+    assert APPEARANCE({'rating': 5, 'episode_id': 1, 'guest_id': 2, 'extra': 'x'}) == (
+        {'rating': 5, 'episode_id': 1, 'guest_id': 2}, []
+    )
+
+
+def test_numeric_strings_are_coerced():
+    assert RESTAURANT_PIZZA({'price': '12', 'restaurant_id': 3.0, 'pizza_id': '1'}) == (
+        {'price': 12, 'restaurant_id': 3, 'pizza_id': 1}, []
+    )
+
+
+@pytest.mark.parametrize('rating', [True, 4.9, float('inf'), float('nan'), '4.9', [4]])
+def test_non_integers_are_rejected(rating):
+    assert APPEARANCE({'rating': rating, 'episode_id': 1, 'guest_id': 1})[1] == ['rating must be an integer']
+
+
+@pytest.mark.parametrize('rating', ['1e400', 'Infinity', '-Infinity', 'NaN', 'true', '4.9'])
+def test_stdlib_json_non_integers_are_422s(clone_app, rating):
+    client = clone_app(config={'JSON_BACKEND': 'stdlib'}).test_client()
+    body = f'{{"rating": {rating}, "episode_id": 1, "guest_id": 1}}'
+    for method, path in ((client.post, '/appearances'), (client.put, '/appearances'),
+                         (client.post, '/appearances/bulk')):
+        data = f'[{body}]' if path.endswith('bulk') else body
+        rv = method(path, data=data, content_type='application/json')
+        assert rv.status_code == 422, (path, rv.get_data(as_text=True))
+
+
+def test_every_error_is_reported_at_once():
+    values, errors = APPEARANCE({'rating': 0, 'episode_id': 'x'})
+    assert values == {'rating': None, 'episode_id': None, 'guest_id': None}
+    assert errors == ['rating must be between 1 and 5', 'episode_id must be an integer', 'guest_id is required']
+
+
+def test_ids_fit_sqlite_integers():
+    assert APPEARANCE({'rating': 1, 'episode_id': MAX_ID, 'guest_id': 1})[1] == []
+    assert APPEARANCE({'rating': 1, 'episode_id': 2 ** 63, 'guest_id': 0})[1] == [
+        f'episode_id must be between 1 and {MAX_ID}', f'guest_id must be between 1 and {MAX_ID}',
+    ]
+
+
+@pytest.mark.parametrize('path', ['/appearances', '/restaurant_pizzas'])
+def test_oversized_ids_are_422s(app, path):
+    client = app.test_client()
+    body = {'rating': 5, 'price': 5, 'episode_id': 2 ** 63, 'guest_id': 1, 'restaurant_id': 2 ** 63, 'pizza_id': 1}
+    for method in (client.post, client.put):
+        rv = method(path, json=body)
+        assert rv.status_code == 422
+    rv = client.post(f'{path}/bulk', json=[body])
+    assert rv.status_code == 422
+    assert 'must be between 1 and' in rv.get_json()['errors'][0]['errors'][0]
+
+
+@pytest.mark.parametrize('body', [None, [], 'appearance', 4])
+def test_non_objects_are_rejected(body):
+    assert APPEARANCE(body) == (None, ['appearance must be an object'])
+
+
+@pytest.mark.parametrize('body, error', [
+    ({'name': None, 'count': 1}, 'name is required'),
+    ({'name': 4, 'count': 1}, 'name must be a string'),
+    ({'name': ' ', 'count': 1}, 'name must not be blank'),
+    ({'name': 'abcd', 'count': 1}, 'name must be at most 3 characters'),
+    ({'name': 'abc', 'count': -1}, 'count must be at least 0'),
+])
+def test_field_messages(body, error):
+    schema = Schema('thing', name=Str(max_length=3), count=Int(low=0))
+    assert schema(body)[1] == [error]
+    assert Schema('thing', count=Int(high=2))({'count': 3})[1] == ['count must be at most 2']
+
+
+def test_model_hooks_share_the_schema_rules():
+    assert RestaurantPizza(price='12').price == 12
+    with pytest.raises(ValueError, match='price must be between 1 and 1000'):
+        RestaurantPizza(price=0)
+    with pytest.raises(ValueError, match='rating must be between 1 and 5'):
+        Appearance(rating=6)
+    with pytest.raises(ValueError, match='capacity must be at least 0'):
+        Restaurant(name='Downtown Pizza', capacity=-1)
+    with pytest.raises(ValueError, match='name must be at most 80 characters'):
+        Pizza(name='x' * 81, ingredients='tomato')
+    with pytest.raises(ValueError, match='ingredients must not be blank'):
+        Pizza(name='Margherita', ingredients='  ')
+
+
+def test_menu_item_errors_are_422s(app):
+    rv = app.test_client().post('/restaurant_pizzas', json={'price': 'free', 'restaurant_id': 1})
+    assert rv.status_code == 422
+    assert rv.get_json() == {'errors': ['price must be an integer', 'pizza_id is required']}
@@ -0,0 +1,196 @@
+import queue
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import Appearance, Episode, Guest, Pizza, Restaurant, RestaurantPizza
+
+ASYNC = {'Prefer': 'respond-async'}
+
+
+def seed_parents():
+    db.session.add_all([
+        Episode(date='1/11/99', number=1),
+        Guest(name='Michael J. Fox', occupation='actor'),
+        Guest(name='Sandra Bernhard', occupation='Comedian'),
+        Guest(name='Tracey Ullman', occupation='television actress'),
+        Restaurant(name='Downtown Pizza', capacity=80),
+        Pizza(name='Margherita', ingredients='tomato,basil'),
+    ])
+
+
+@pytest.fixture
+def make_client(clone_app):
+    apps = []
+
+    def make(**config):
+        app = clone_app(seed_parents, {'WRITE_QUEUE': 'prefer', 'WRITE_QUEUE_MAX_DELAY_MS': 50, **config})
+        apps.append(app)
+        return app.test_client()
+
+    yield make
+    for app in apps:
+        app.extensions['write_queue'].close()
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client()
+
+
+def _flush(client):
+    client.application.extensions['write_queue'].flush()
+
+
+def _count(app, model):
+    with app.app_context():
+        return db.session.query(model).count()
+
+
+def test_queue_is_off_by_default(app):
+    assert 'write_queue' not in app.extensions
+    assert app.test_client().get('/writes/abc').status_code == 404
+
+
+def test_inline_writes_stay_available(client):
+    rv = client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 1})
+    assert rv.status_code == 201
+    assert rv.get_json()['guest']['name'] == 'Michael J. Fox'
+
+
+def test_queued_write_is_accepted_then_committed(client):
+    rv = client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 1}, headers=ASYNC)
+    assert rv.status_code == 202
+    write = rv.get_json()
+    assert write['status'] == 'queued'
+    assert rv.headers['Location'] == f'/writes/{write["id"]}'
+
+    _flush(client)
+    status = client.get(rv.headers['Location']).get_json()
+    assert status['status'] == 'committed'
+    with client.application.app_context():
+        row = db.session.get(Appearance, status['row_id'])
+        assert (row.episode_id, row.guest_id, row.rating) == (1, 1, 4)
+    # the commit drops cached responses and bumps ETags like an inline write
+    assert client.get('/episodes/1').get_json()['appearances'][0]['rating'] == 4
+
+
+def test_batch_commits_once_and_rejected_rows_fail_alone(client):
+    commits = []
+
+    def count_commit(session):
+        commits.append(session)
+
+    event.listen(db.session, 'after_commit', count_commit)
+    try:
+        payloads = [
+            {'rating': 4, 'episode_id': 1, 'guest_id': 1},
+            {'rating': 2, 'episode_id': 1, 'guest_id': 1},
+            {'rating': 3, 'episode_id': 1, 'guest_id': 9},
+            {'rating': 5, 'episode_id': 1, 'guest_id': 2},
+        ]
+        ids = [client.post('/appearances', json=p, headers=ASYNC).get_json()['id'] for p in payloads]
+        _flush(client)
+    finally:
+        event.remove(db.session, 'after_commit', count_commit)
+
+    statuses = [client.get(f'/writes/{i}').get_json() for i in ids]
+    assert [s['status'] for s in statuses] == ['committed', 'failed', 'failed', 'committed']
+    assert statuses[1]['errors'] == ['guest already appears in this episode']
+    assert statuses[2]['errors'] == ['guest not found']
+    assert len(commits) == 1
+    assert _count(client.application, Appearance) == 2
+
+
+def test_invalid_rows_are_rejected_before_queueing(client):
+    rv = client.post('/appearances', json={'rating': 9, 'episode_id': 1, 'guest_id': 1}, headers=ASYNC)
+    assert rv.status_code == 422
+    assert 'id' not in rv.get_json()
+
+
+def test_queued_upsert(client):
+    payload = {'price': 9, 'restaurant_id': 1, 'pizza_id': 1}
+    first = client.put('/restaurant_pizzas', json=payload, headers=ASYNC).get_json()
+    second = client.put('/restaurant_pizzas', json={**payload, 'price': 12}, headers=ASYNC).get_json()
+    _flush(client)
+    first, second = (client.get(f'/writes/{w["id"]}').get_json() for w in (first, second))
+    assert first['row_id'] == second['row_id']
+    with client.application.app_context():
+        assert db.session.get(RestaurantPizza, first['row_id']).price == 12
+
+
+def test_committed_ack_answers_with_the_outcome(make_client):
+    client = make_client(WRITE_QUEUE_ACK='committed', WRITE_QUEUE_MAX_DELAY_MS=0)
+    rv = client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 1}, headers=ASYNC)
+    assert rv.status_code == 201
+    assert rv.get_json()['status'] == 'committed'
+    rv = client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 1}, headers=ASYNC)
+    assert rv.status_code == 422
+    assert rv.get_json()['errors'] == ['guest already appears in this episode']
+    rv = client.put('/appearances', json={'rating': 1, 'episode_id': 1, 'guest_id': 1}, headers=ASYNC)
+    assert rv.status_code == 200
+
+
+def test_always_mode_queues_without_prefer(make_client):
+    client = make_client(WRITE_QUEUE='always')
+    assert client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 1}).status_code == 202
+
+
+def test_full_queue_answers_503(client, monkeypatch):
+    def full(*args):
+        raise queue.Full
+
+    monkeypatch.setattr(client.application.extensions['write_queue'], 'submit', full)
+    rv = client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 1}, headers=ASYNC)
+    assert rv.status_code == 503
+    assert rv.headers['Retry-After'] == '1'
+
+
+def test_finished_statuses_are_bounded(make_client):
+    client = make_client(WRITE_QUEUE_STATUS_LIMIT=1)
+    first = client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 1}, headers=ASYNC)
+    _flush(client)
+    second = client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 2}, headers=ASYNC)
+    _flush(client)
+    assert client.get(first.headers['Location']).status_code == 404
+    assert client.get(second.headers['Location']).get_json()['status'] == 'committed'
+
+
+def test_synchronous_applies_to_batches_only(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "queue.db"}',
+        'WRITE_QUEUE': 'always', 'WRITE_QUEUE_SYNCHRONOUS': 'FULL',
+    })
+    with app.app_context():
+        db.create_all()
+        seed_parents()
+        db.session.commit()
+        engine = db.engine
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        client = app.test_client()
+        assert client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 1}).status_code == 202
+        _flush(client)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+        app.extensions['write_queue'].close()
+    assert 'PRAGMA synchronous=FULL' in statements
+    with app.app_context():
+        # 1 is NORMAL, from SQLITE_PRAGMAS
+        assert db.session.connection().exec_driver_sql('PRAGMA synchronous').scalar() == 1
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_unknown_settings_are_rejected():
+    with pytest.raises(ValueError, match='WRITE_QUEUE'):
+        create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'WRITE_QUEUE': 'sometimes'})
+    with pytest.raises(ValueError, match='WRITE_QUEUE_ACK'):
+        create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'WRITE_QUEUE': 'prefer',
+                    'WRITE_QUEUE_ACK': 'never'})
@@ -0,0 +1,90 @@
+import pytest
+
+from app import db
+from app.models import Appearance, Episode, Guest, Pizza, Restaurant, RestaurantPizza
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        db.session.add_all([
+            Episode(date='1/11/99', number=1),
+            Guest(name='Michael J. Fox', occupation='actor'),
+            Guest(name='Sandra Bernhard', occupation='Comedian'),
+            Restaurant(name='Downtown Pizza', capacity=80),
+            Pizza(name='Margherita', ingredients='tomato,basil'),
+        ])
+        db.session.commit()
+    return app.test_client()
+
+
+def _count(app, model):
+    with app.app_context():
+        return db.session.query(model).count()
+
+
+def test_create_is_one_insert_without_lookups(client, count_queries):
+    with count_queries() as counter:
+        rv = client.post('/appearances', json={'rating': 4, 'episode_id': 1, 'guest_id': 1})
+    assert rv.status_code == 201
+    assert rv.get_json()['guest']['name'] == 'Michael J. Fox'
+    assert rv.get_json()['episode']['date'] == '1999-01-11'
+    verbs = [s.split(None, 1)[0].upper() for s in counter.statements]
+    # the table_versions bump, the row (a Core insert, no flush), then the response read
+    assert verbs == ['INSERT', 'INSERT', 'SELECT']
+
+
+def test_duplicate_pairs_are_rejected(client):
+    payload = {'rating': 4, 'episode_id': 1, 'guest_id': 1}
+    assert client.post('/appearances', json=payload).status_code == 201
+    rv = client.post('/appearances', json={**payload, 'rating': 2})
+    assert rv.status_code == 422
+    assert rv.get_json() == {'errors': ['guest already appears in this episode']}
+
+    payload = {'price': 9, 'restaurant_id': 1, 'pizza_id': 1}
+    assert client.post('/restaurant_pizzas', json=payload).status_code == 201
+    rv = client.post('/restaurant_pizzas', json=payload)
+    assert rv.get_json() == {'errors': ['restaurant already serves this pizza']}
+    assert _count(client.application, Appearance) == _count(client.application, RestaurantPizza) == 1
+
+
+@pytest.mark.parametrize('path, payload, errors', [
+    ('/appearances', {'rating': 3, 'episode_id': 9, 'guest_id': 1}, ['episode not found']),
+    ('/appearances', {'rating': 3, 'episode_id': 9, 'guest_id': 9}, ['episode not found', 'guest not found']),
+    ('/restaurant_pizzas', {'price': 9, 'restaurant_id': 1, 'pizza_id': 9}, ['pizza not found']),
+])
+@pytest.mark.parametrize('method', ['post', 'put'])
+def test_missing_references_come_from_the_foreign_keys(client, method, path, payload, errors):
+    rv = getattr(client, method)(path, json=payload)
+    assert rv.status_code == 422
+    assert rv.get_json() == {'errors': errors}
+
+
+def test_put_inserts_then_updates_in_place(client):
+    rv = client.put('/appearances', json={'rating': 2, 'episode_id': 1, 'guest_id': 2})
+    assert rv.status_code == 200
+    first = rv.get_json()
+    assert first['rating'] == 2 and first['guest']['name'] == 'Sandra Bernhard'
+
+    rv = client.put('/appearances', json={'rating': 5, 'episode_id': 1, 'guest_id': 2})
+    assert rv.get_json()['id'] == first['id']
+    assert rv.get_json()['rating'] == 5
+    assert _count(client.application, Appearance) == 1
+    # the summary triggers see the update
+    assert client.get('/guests/2/stats').get_json()['average_rating'] == 5.0
+
+
+def test_put_reprices_and_refreshes_cached_reads(client):
+    client.post('/restaurant_pizzas', json={'price': 9, 'restaurant_id': 1, 'pizza_id': 1})
+    etag = client.get('/restaurants/1').headers['ETag']
+    rv = client.put('/restaurant_pizzas', json={'price': 11, 'restaurant_id': 1, 'pizza_id': 1})
+    assert rv.status_code == 200
+    assert rv.get_json()['restaurant']['name'] == 'Downtown Pizza'
+    fresh = client.get('/restaurants/1', headers={'If-None-Match': etag})
+    assert fresh.status_code == 200
+    assert client.get('/restaurants/1/stats').get_json()['average_price'] == 11.0
+
+
+def test_put_validates_like_post(client):
+    rv = client.put('/appearances', json={'rating': 7, 'episode_id': 1})
+    assert rv.get_json() == {'errors': ['rating must be between 1 and 5', 'guest_id is required']}